@@ -3,17 +3,24 @@ This module contains the functions and classes that analyze
 the code or directly help in the analysis.
 """
 import ast
+import errno
 from sets import Set
 import json
 import os.path
 import consts
-from datastructures import STable, DTable, Stack
+from datastructures import STable, DTable, Stack, NodeInfo, LookupCounts
 import sys
 import pdb
 from collections import namedtuple
-import importlib
+import argparse
 
-from utils import get_module, pretty_print, unique_id, node_type, scopes_to_str
+from utils import get_module, read_source, pretty_print, unique_id, node_type, scopes_to_str
+from cache import ModuleCache
+from exports import locate, candidate_paths, module_exports
+import stats
+from graphfile import GraphFile, is_graph_file
+from store import DependencyStore, is_store_file
+from imports import absolute_name
 
 
 class NodeVisitor(ast.NodeVisitor):
@@ -91,13 +98,12 @@ def symbolic_pretty_print(nodes):
 def is_load(children):
     """
     Returns whether children has Load op
-    Note: children[0] indexes to first child, 
-    children[0][0] indexes to node 
+    Note: children[0] is the first child node
     """
-    return children and node_type(children[0][0]) == "Load"
+    return children and children[0].__class__ is ast.Load
 
 def is_store(children):
-    return children and node_type(children[0][0]) == "Store"
+    return children and children[0].__class__ is ast.Store
 
 
 
@@ -124,61 +130,229 @@ def is_store(children):
 
 """
 These setters and getter exists
-in case the data structure of node is changed
+in case the data structure of node is changed.
+They operate on the NodeInfo of nodes, rather than the nodes themselves
 """
-def set_depth(node, depth):
-    """Set the depth of an AST node
+def children_info(info, children):
     """
-    setattr(node[0], "depth", depth)
-
-def set_lineno(node, children):
-    """
-    Sets lineno and lineno_end of all children of node.
+    Returns list of the NodeInfo of each of `children`,
+    given the NodeInfo `info` of their parent.
+    Sets depth, and lineno and lineno_end of all children.
     Assigns lineno_end of ith child as the
     the lineno of i+1 th child. 
     
     Some AST nodes don't have a `lineno` property;
-    in these cases sets it based on the following algorithm.
+    in these cases uses the lineno of the parent.
     """
+    infos = []
+    depth = info.depth + 1
+    last = len(children) - 1
     for i, child in enumerate(children):
-        child = child[0]
-        #if child does not have lineno, add it 
-        if not hasattr(child, "lineno"):
-            setattr(child, "lineno", node.lineno)
+        lineno = getattr(child, "lineno", info.lineno)
 
-        if i == len(children) - 1:
+        if i == last:
             #set child's lineno_end to node's lineno    
-            setattr(child, "lineno_end", node.lineno_end)
+            lineno_end = info.lineno_end
         else:
-            sibling = children[i+1][0]
-            #if next sibling does not have lineno, add it
-            if not hasattr(sibling, "lineno"):
-                setattr(sibling, "lineno", node.lineno)
-
+            sibling_lineno = getattr(children[i+1], "lineno", info.lineno)
             #set child's lineno_end to next sibling's lineno-1
             #unless that would make it less than child's lineno
-            setattr(child, "lineno_end", max(child.lineno, sibling.lineno - 1))
+            lineno_end = max(lineno, sibling_lineno - 1)
+
+        infos.append(NodeInfo(depth, lineno, lineno_end))
+    return infos
 
-def set_globals(node, names):
+def set_globals(info, names):
     """
-    sets global names. Lazily adds property
+    sets global names. Lazily creates the list
     """
-    if not hasattr(node, "globals"):
-        setattr(node, "globals", [])
+    if info.globals is None:
+        info.globals = []
 
-    node.globals.extend(names)
+    info.globals.extend(names)
 
-def has_global(node, name):
+def has_global(info, name):
     """
     check whether node has name in its globals list
     """
-    return hasattr(node, "globals") and name in node.globals
+    return info.globals is not None and name in info.globals
 
-#These are the node types that create a scope
-#global and nonlocal vars need to tracked separately
-scoping_nodes = ["Module", "ClassDef", "FunctionDef"]
+class SymbolTableBuilder(object):
+    """
+    Creates the symbol table of a module in a single pass over
+    its AST; see create_symbol_table.
 
-def create_symbol_table(root):
+    The logic specific to each type of node is in the handle_* methods.
+    These are dispatched on the node's class through HANDLERS, which is
+    built once, rather than by comparing the name of each node's type.
+    """
+    def __init__(self, root, module_path=None, sources=None, references=None):
+        self.root = root
+        self.module_path = module_path
+        self.sources = sources
+        self.references = references
+
+        #the symbol table maps the name to the scope.
+        #Any node can belong to multiple scopes, therefore this
+        #is a list of scope
+        #The scopes are interned, i.e. stored as ids of their dotted names
+        self.symbol_table = STable()
+
+        #Initialize the stack, with the AST root
+        self.stack = Stack(root, NodeInfo(0, root.lineno, root.lineno_end), self.symbol_table.names)
+
+        #depth of the Attribute node being walked, if any.
+        #Names loaded within attributes are not references, since e.g. in `x.y.z`,
+        #x would be resolved on its own, and not the attribute chain
+        self.attribute_depth = None
+
+    def build(self):
+        """
+        Walks the AST and returns the symbol table
+        """
+        stack = self.stack
+        handlers = HANDLERS
+        #number of nodes visited
+        visited = 0
+
+        for node, info, children in stack:
+            visited += 1
+            if self.attribute_depth is not None and info.depth <= self.attribute_depth:
+                self.attribute_depth = None
+
+            handler = handlers.get(node.__class__)
+            if handler is not None:
+                handler(self, node, children)
+
+            #depth and lineno of children nodes
+            infos = children_info(info, children)
+
+            for i in xrange(len(children) - 1, -1, -1):
+                #Add children to stack
+                stack.append(children[i], infos[i])
+
+            #Add any new scopes
+            #Need to do it here since scoping_nodes are defined in their parent scope
+            stack.check_and_push_scope()
+
+        stats.count("nodes", visited)
+        return self.symbol_table
+
+    def handle_attribute(self, node, children):
+        if self.attribute_depth is None:
+            #TODO: attribute chains can be arbitrarily long
+            #and would need to be resolved as a whole
+            self.attribute_depth = self.stack.info.depth
+
+    def handle_import(self, node, children):
+        #Import object has names prop which
+        #is an array of names
+        for name in node.names:
+            #name can be the name or an alias   
+            name_val = name.asname or name.name
+            #`import foo.bar` binds foo, `import foo.bar as baz` binds foo.bar
+            src_module = name.name if name.asname else name.name.split('.')[0]
+            #insert in symbol_table                
+            self.symbol_table[name_val] = self.stack.get_scopes(src_module=src_module)
+
+    def handle_import_from(self, node, children):
+        #relative imports are qualified by the package they are relative to,
+        #e.g. `from .foo import x` in pkg/mod.py imports from pkg.foo
+        src_module = "." * (node.level or 0) + (node.module or "")
+        if node.level:
+            src_module = self.absolute_module(src_module)
+        if node.names[0].name == '*':
+            #the exported names are determined from the source of the module
+            #rather than by importing it, which would execute it
+            root = self.root
+            importer_path = self.module_path or root.name + ".py"
+            with stats.timer("star_imports"):
+                path = locate(node.module, node.level, importer_path, root.name)
+                try:
+                    names = module_exports(path) if path else None
+                except (IOError, OSError, SyntaxError):
+                    names = None
+            stats.count("star_imports")
+
+            if self.sources is not None:
+                #the tables are stale once the module changes, or is created if it is missing
+                if path:
+                    self.sources.append(path)
+                else:
+                    self.sources.extend(candidate_paths(node.module, node.level, importer_path, root.name))
+
+            if names is None:
+                print >>sys.stderr, "Error: local system does not have {}. Skipping!".format(src_module)
+            else:
+                for name in names:
+                    self.symbol_table[name] = self.stack.get_scopes(src_module=src_module, src_name=name)
+        else:
+            for name in node.names:
+                name_val = name.asname or name.name
+                self.symbol_table[name_val] = self.stack.get_scopes(src_module=src_module, src_name=name.name)
+
+    def absolute_module(self, src_module):
+        """
+        Returns the relative module `src_module`, e.g. ..foo, qualified by the package
+        it is relative to. A module analyzed on its own is named by its path, so
+        it has no package, and its relative imports keep their leading dots.
+        """
+        name = self.root.name
+        if os.sep in name or name.endswith("__init__"):
+            return src_module
+        is_package = os.path.basename(self.module_path or "") == "__init__.py"
+        return absolute_name(src_module, name, is_package)
+
+    def handle_definition(self, node, children):
+        "Handles ClassDef, FunctionDef and AsyncFunctionDef"
+        self.symbol_table[node.name] = self.stack.get_scopes()
+
+    def handle_name(self, node, children):
+        if not is_load(children):
+            #NOTE: if a name is being loaded then it already exists and doesn't need
+            #to be added to symbol_table
+            if not has_global(self.stack.scope_tail(), node.id):
+                self.symbol_table[node.id] = self.stack.get_scopes()
+
+        #A Name is being loaded, so it must be resolved once the table is complete
+        elif self.references is not None and self.attribute_depth is None:
+            self.references.append((self.stack.scope_name(), node.id, node.lineno))
+
+    def handle_arguments(self, node, children):
+        #in python 3, vararg and kwarg are arg nodes, handled by handle_arg
+        if isinstance(node.vararg, str): 
+            self.symbol_table[node.vararg] = self.stack.get_scopes()
+        if isinstance(node.kwarg, str):
+            self.symbol_table[node.kwarg] = self.stack.get_scopes()
+
+    def handle_arg(self, node, children):
+        "Handles python 3 parameters; in python 2 these are Name nodes"
+        self.symbol_table[node.arg] = self.stack.get_scopes()
+
+    def handle_global(self, node, children):
+        #add a list global vars on node on the top of  
+        #the stack
+        #nonlocal could be handled in similar way
+        set_globals(self.stack.scope_tail(), node.names)
+
+#Maps AST node class to its handler
+HANDLERS = {
+    ast.Attribute:   SymbolTableBuilder.handle_attribute,
+    ast.Import:      SymbolTableBuilder.handle_import,
+    ast.ImportFrom:  SymbolTableBuilder.handle_import_from,
+    ast.ClassDef:    SymbolTableBuilder.handle_definition,
+    ast.FunctionDef: SymbolTableBuilder.handle_definition,
+    ast.Name:        SymbolTableBuilder.handle_name,
+    ast.arguments:   SymbolTableBuilder.handle_arguments,
+    ast.Global:      SymbolTableBuilder.handle_global,
+}
+#python 3 only
+if hasattr(ast, "AsyncFunctionDef"):
+    HANDLERS[ast.AsyncFunctionDef] = SymbolTableBuilder.handle_definition
+if hasattr(ast, "arg"):
+    HANDLERS[ast.arg] = SymbolTableBuilder.handle_arg
+
+def create_symbol_table(root, module_path=None, sources=None, references=None):
     """
     Creates a symbols table that maps each
     symbol to the scope within which it occurs.
@@ -186,9 +360,9 @@ def create_symbol_table(root):
     first, since entities (e.g. functions, classes) can be 
     referenced before being defined.
 
-    Similar to find_dependencies in terms of traversing
-    the AST.
-    TODO: refactor common stuff into separate function
+    Therefore, the names being loaded are only recorded while
+    the table is created, i.e. in the same pass, and are resolved
+    against the finished table afterwards by find_dependencies.
 
     The data structure used is a hashtable where 
     names are mapped to list of scopes, i.e. a hashlist. 
@@ -201,91 +375,24 @@ def create_symbol_table(root):
     of siblings which can lead to a larger range than actually is 
     due to whitespaces. This gets tricky because functions can 
     be used before they are defined, but not variables.  
-    """
-
-    set_depth(root, 0)
-    #Initialize the stack, with the AST root
-    stack = Stack(root)
-
-    #the symbol table maps the name to the scope.
-    #Any node can belong to multiple scopes, therefore this
-    #is a list of scope
-    symbol_table = STable()
-    
-    #this represents objects imported from
-    #other modules
-    other_modules = {}
-
-    for node, children, ntype in stack:
-
-        if ntype == "Import":
-            #Import object has names prop which
-            #is an array of names
-            for name in node.names:
-                #name can be the name or an alias   
-                name_val = name.asname or name.name
-                #insert in symbol_table                
-                symbol_table[name_val] = ()
 
-        elif ntype == "ImportFrom":
-            if node.names[0].name == '*':
-                try:
-                    imp_mod = importlib.import_module(node.module)
-                    #Add all names in imported module, except those
-                    #starting with '_'
-                    for name in dir(imp_mod):
-                        if name[0] != '_':
-                            symbol_table[name] = stack_top(scopes)
-
-                except ImportError:
-                    print "Error: local system does not have {}. Skipping!".format(node.module)
-                    pass
-            else:
-                #TODO: store node.module
-                for name in node.names:
-                    #TODO: store name.name even if name.asname defined    
-                    name_val = name.asname or name.name
-                    symbol_table[name_val] = stack.get_scopes(src_module=node.module)
-
-        elif ntype == "ClassDef" or ntype == "FunctionDef":   
-            symbol_table[node.name] = stack.get_scopes()
-        
-        #NOTE: if a name is being loaded then it already exists and doesn't need
-        #to be added to symbol_table
-        elif ntype == "Name" and not is_load(children) and not has_global(stack.scope_tail(), node.id): 
-            symbol_table[node.id] = stack.get_scopes()
-
-        elif ntype == "arguments":
-            if node.vararg: 
-                symbol_table[node.vararg] = stack.get_scopes()
-            if node.kwarg:
-                symbol_table[node.kwarg] = stack.get_scopes()
-
-        elif ntype == "Global":
-            #add a list global vars on node on the top of  
-            #the stack
-            #nonlocal could be handled in similar way
-            set_globals(scopes[-1], node.names)
-
-        #set lineno property of children nodes
-        set_lineno(node, children)
-
-        for child in children[::-1]:
-            #set depth of child
-            set_depth(child, node.depth + 1)
-            #Add children to stack
-            stack.append(child)
-
-        #Add any new scopes
-        #Need to do it here since scoping_nodes are defined in their parent scope
-        stack.check_and_push_scope()
+    Arguments:
+        root:- the root of the AST being analyzed, i.e. the module node
+        module_path:- path of the module; star-imports are resolved relative to it
+        sources:- if passed, a list that the paths of star-imported modules are
+            appended to, or the paths they would be found at if they are missing
+        references:- if passed, a list that the names being loaded
+            are appended to, as (scopes id, name, lineno) 3-tuples
+    """
 
-    print "Symbol table is "
-    print symbol_table
+    symbol_table = SymbolTableBuilder(root, module_path=module_path, sources=sources,
+                                      references=references).build()
+    if stats.current is not None:
+        stats.count("symbols", len(symbol_table))
+        stats.count("symbol_scopes", sum(len(scopes) for scopes in symbol_table.itervalues()))
     return symbol_table
-    
 
-def find_dependencies(root):
+def find_dependencies(root, symbol_table=None, references=None):
     """
     Finds all dependencies in root object based on symbol table. 
     Consider a dependecy as containing a source and a destination.
@@ -317,60 +424,55 @@ def find_dependencies(root):
     There are a lot of cases to be handled
 
     Arguments:
-        root:- the root of the AST being analyzed
-            stored as (2-tuple) with (root node, array of children )
+        root:- the root of the AST being analyzed, i.e. the module node
+        symbol_table:- the symbol table of root
+        references:- the names loaded in root, as collected by create_symbol_table.
+            If either is not passed, both are created by walking root
+
+    Returns the dependency table
     """
     
-    symbol_table = create_symbol_table(root)
+    if symbol_table is None or references is None:
+        references = []
+        symbol_table = create_symbol_table(root, references=references)
 
-    names = []
-    #Set the depth of the root node
-    set_depth(root, 0)
-    #Stack of nodes to visit
-    stack = Stack(root)
-    
     #List of (src, dest) of dependencies
+    #references are resolved in the order they occur
     dependency_table = DTable(symbol_table=symbol_table)
+    #the lookups are counted as they are made, if instrumentation is enabled
+    counts = LookupCounts() if stats.current is not None else None
+    for reference in references:
+        dependency_table.append(reference, counts)
 
-    for node, children, ntype in stack:
-        
-        stack.check_and_push_scope()
-
-        #A Name is being loaded, therefore 
-        if ntype == "Name" and is_load(children):
-            """
-            """
-            dependency_table.append( (stack.scopes, node))
-        
-        elif ntype == "Assign":
-            #TODO need to add assignments and then revoke them
-            #for child in children:
-            #print children
-            pass
+    if counts is not None:
+        counts.add_to(stats.current)
+    return dependency_table
 
-            
-        elif ntype == "Attribute":
-            #TODO: attribute chains can be arbitrarily long
-            #dep_dest = "{}.{}".format(node.value.id, node.attr)
-            #print "{} => {}".format(scopes_to_str(scopes), dep_dest)
-
-            #TODO: Can't just do dependency_table.append( (scopes, node))
-            #since the unique_id function won't match the create the dep string like 
-            #{node.value.id}.{node.attr}.
-            #Either generalize unique_id or something else.
-            
-            #Don't add children
-            continue
-            
-        set_lineno(node, children)
-        #Add children to stack
-        #This musn't always be performed
-        for child in children[::-1]:
-            set_depth(child, node.depth + 1)
-            stack.append(child)
+def iter_dependencies(root, symbol_table=None, references=None):
+    """
+    Yields the dependencies in root as they are resolved, as
+    (src, dest, lineno) 3-tuples with src and dest as dotted names.
+    Unlike find_dependencies, no dependency table is built.
 
-    print "dependency table is "
-    print dependency_table 
+    Arguments are as for find_dependencies.
+    """
+    if symbol_table is None or references is None:
+        references = []
+        symbol_table = create_symbol_table(root, references=references)
+
+    #the table is only used to resolve the references; nothing is added to it
+    resolve = DTable(symbol_table=symbol_table).resolve
+    to_str = symbol_table.names.to_str
+    counts = LookupCounts() if stats.current is not None else None
+    try:
+        for reference in references:
+            edge = resolve(reference, counts)
+            if edge is not None:
+                src, dest, lineno = edge
+                yield to_str(src), to_str(dest), lineno
+    finally:
+        if counts is not None and stats.current is not None:
+            counts.add_to(stats.current)
 
 #TODO: Inner dependencies, i.e generalize check_dependency so as not to only check top level objs
 #TODO: Name store vs name load, i.e. scoping
@@ -378,31 +480,502 @@ def find_dependencies(root):
 #TODO: from `module name` import * 
 #TODO: show dependency destination path
 
-def analyze(module_path):
+def analyze_module(module_path, module_name=None, cache=None, source=None):
     """
-    Analyze dependencies starting at `module_path`
+    Analyze the module at `module_path`.
+    Returns its (symbol table, dependency table) pair.
+
+    Arguments:
+        module_path:- path to the module
+        module_name:- name of the module, i.e. the outermost scope;
+            defaults to the path without the '.py'
+        cache:- a ModuleCache; if the module is unchanged since it
+            was cached, the tables are loaded instead of recomputed
+        source:- the contents of the module, if they were already read, e.g. prefetched
     """
-    #view the module as a AST node object
-    module = get_module(module_path) 
+    if module_name is None:
+        module_name = name_from_path(module_path)
+    stats.count("modules")
+    if source is None:
+        with stats.timer("read"):
+            source = read_source(module_path)
+
+    if cache:
+        with stats.timer("cache_get"):
+            key = cache.key(module_name, source)
+            cached = cache.get(key)
+        if cached:
+            stats.count("cache_hits")
+            return cached
 
-    nodes = []
-    NodeVisitor().visit(module, nodes)
+    #view the module as a AST node object
+    with stats.timer("parse"):
+        module = get_module(module_path, source=source)
     
     #Modify main module node to give it a name attr
-    if not hasattr(nodes[0][0], "name"):
-        nodes[0][0].name = name_from_path(module_path)
+    if not hasattr(module, "name"):
+        module.name = module_name
+
+    #paths of star-imported modules; the cached tables are only valid while these are unchanged
+    sources = []
+    #names loaded in the module, collected in the same pass as the symbol table
+    references = []
+    with stats.timer("symbol_table"):
+        symbol_table = create_symbol_table(module, module_path=module_path, sources=sources,
+                                           references=references)
+    #the tables don't reference the AST, so it can be freed before the references are resolved
+    del module
+    with stats.timer("resolve"):
+        dependency_table = find_dependencies(None, symbol_table, references)
+
+    if cache:
+        with stats.timer("cache_put"):
+            cache.put(key, symbol_table, dependency_table, sources=sources)
+
+    return symbol_table, dependency_table
+
+def iter_module_dependencies(module_path, module_name=None, cache=None):
+    """
+    Yields the dependencies of the module at `module_path` as 
+    (src, dest, lineno) 3-tuples, as they are resolved.
+    Arguments are as for analyze_module.
+    """
+    if cache:
+        #the cache stores whole tables, so these are built anyway
+        _, dependency_table = analyze_module(module_path, module_name=module_name, cache=cache)
+        for row in dependency_table.rows():
+            yield row
+        return
+
+    if module_name is None:
+        module_name = name_from_path(module_path)
+    stats.count("modules")
+    with stats.timer("parse"):
+        module = get_module(module_path)
+    module.name = module_name
+
+    references = []
+    with stats.timer("symbol_table"):
+        symbol_table = create_symbol_table(module, module_path=module_path, references=references)
+    del module
+    #the references are resolved as the consumer iterates, so that time isn't recorded
+    for row in iter_dependencies(None, symbol_table, references):
+        yield row
+
+def analyze(module_path, cache=None):
+    """
+    Analyze dependencies starting at `module_path`
+    """
+    symbol_table, dependency_table = analyze_module(module_path, cache=cache)
+
+    print "Symbol table is "
+    print symbol_table
+    print "dependency table is "
+    print dependency_table
 
-    #symbolic_pretty_print(nodes)
-    #pretty_print(nodes)
+    if cache:
+        cache.prune()
 
-    #create_symbol_table(nodes[0])
-    find_dependencies(nodes[0])
 
+def analyze_directory(root, processes=None, cache=None):
+    """
+    Analyze dependencies of all modules under the directory `root`
+    """
+    from project import analyze_project
 
-if __name__ == '__main__':
-    if len(sys.argv) == 1 or not os.path.isfile(sys.argv[1]):
-        print "Usage: python analyze.py <<path to starting module>>"
+    graph, errors = analyze_project(root, processes=processes, cache=cache)
+
+    for path, error in sorted(errors.items()):
+        print "Error: unable to analyze {}: {}. Skipping!".format(path, error)
+    print "dependency table is "
+    print sorted(graph.edges())
+
+def analyze_jsonl(path, output, processes=None, cache=None):
+    """
+    Writes the dependencies of the module, or of all modules under the
+    directory, at `path` as JSON lines to `output`, as they are resolved.
+    `output` is a file path, or '-' for stdout.
+    """
+    from jsonl import open_output, write_dependencies
+
+    if os.path.isdir(path):
+        from project import iter_project_dependencies
+
+        errors = {}
+        dependencies = iter_project_dependencies(path, processes=processes, cache=cache, errors=errors)
     else:
-        analyze(sys.argv[1])
+        module_name = name_from_path(path)
+        errors = None
+        dependencies = ((module_name, src, dest, lineno) for src, dest, lineno
+                        in iter_module_dependencies(path, module_name=module_name, cache=cache))
+
+    fileptr = open_output(output)
+    try:
+        write_dependencies(dependencies, fileptr)
+    except IOError as error:
+        if error.errno != errno.EPIPE:
+            raise
+        #the reader closed the pipe, e.g. head; the rest of the dependencies aren't wanted.
+        #What's left in the buffer can't be flushed at exit either, so it's discarded
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, fileptr.fileno())
+        os.close(devnull)
+        return
+    finally:
+        #stops the analysis, i.e. the worker pool and the readers, if writing failed
+        dependencies.close()
+        if fileptr is not sys.stdout:
+            fileptr.close()
+
+    #errors are reported on stderr, since the dependencies may be written to stdout
+    for path, error in sorted((errors or {}).items()):
+        print >>sys.stderr, "Error: unable to analyze {}: {}. Skipping!".format(path, error)
+
+    if cache:
+        cache.prune()
+
+def load_graph(path, processes=None, cache=None, lines=False):
+    """
+    Returns the DependencyGraph of the modules at `path`, i.e.
+    a module, or a directory/package root. Errors are reported on stderr.
+    If `lines` is True, the graph keeps the line number of each edge.
+    """
+    if os.path.isdir(path):
+        from project import analyze_project
+
+        graph, errors = analyze_project(path, processes=processes, cache=cache, lines=lines)
+        for module_path, error in sorted(errors.items()):
+            print >>sys.stderr, "Error: unable to analyze {}: {}. Skipping!".format(module_path, error)
+    else:
+        from graph import DependencyGraph
+
+        graph = DependencyGraph(lines=lines)
+        module_name = name_from_path(path)
+        _, dependency_table = analyze_module(path, module_name=module_name, cache=cache)
+        graph.add_module(module_name, path, dependency_table)
+        if cache:
+            cache.prune()
+    return graph
+
+def query(path, dependents=None, dependencies=None, depth=None, processes=None, cache=None):
+    """
+    Prints the names that depend on `dependents`, and that `dependencies`
+    depends on, directly or transitively, among the modules at `path`.
+    Arguments:-
+        path: a module, a directory/package root, a graph file written by save,
+            or a store written by update_store
+        dependents, dependencies: dotted names, e.g. pkg.mod.func
+        depth: max number of edges followed; unlimited if None
+    """
+    if is_graph_file(path):
+        with GraphFile(path) as graph:
+            print_transitive(graph, dependents, dependencies, depth)
+    elif is_store_file(path):
+        with DependencyStore(path) as graph:
+            print_transitive(graph, dependents, dependencies, depth)
+    else:
+        print_transitive(load_graph(path, processes=processes, cache=cache), dependents, dependencies, depth)
+
+def print_transitive(graph, dependents=None, dependencies=None, depth=None):
+    """
+    Prints the names that depend on `dependents`, and that `dependencies`
+    depends on, in `graph`, i.e. a DependencyGraph, GraphFile or DependencyStore.
+    Arguments are as for query.
+    """
+    if dependents:
+        print "dependents of {} are ".format(dependents)
+        print sorted(graph.transitive_dependents(dependents, depth=depth))
+    if dependencies:
+        print "dependencies of {} are ".format(dependencies)
+        print sorted(graph.transitive_dependencies(dependencies, depth=depth))
+
+def lazy_query(path, dependencies, depth=None, cache=None):
+    """
+    Prints the names that `dependencies` depends on, directly or transitively,
+    analyzing only the modules under the directory `path` that are reached from it
+    """
+    from lazy import LazyAnalyzer
+
+    analyzer = LazyAnalyzer(path, cache=cache)
+    names = analyzer.transitive_dependencies(dependencies, depth=depth)
+    for module_path, error in sorted(analyzer.errors.items()):
+        print >>sys.stderr, "Error: unable to analyze {}: {}. Skipping!".format(module_path, error)
+    print "dependencies of {} are ".format(dependencies)
+    print sorted(names)
+    if cache:
+        cache.prune()
+
+def print_imports(root):
+    """
+    Prints the module level import graph of the modules under the directory `root`,
+    as `module -> imported module` lines, from their import statements only
+    """
+    from imports import scan_project
+
+    edges, errors = scan_project(root)
+    for path, error in sorted(errors.items()):
+        print >>sys.stderr, "Error: unable to scan {}: {}. Skipping!".format(path, error)
+    for module, imported in sorted(set((module, imported) for module, imported, _ in edges)):
+        print "{} -> {}".format(module, imported)
+
+def save(path, output, processes=None, cache=None):
+    """
+    Analyzes the modules at `path`, and writes the graph to a graph file
+    at `output`, so it can be queried later without re-analyzing.
+    """
+    from graphfile import save_graph
+
+    graph = load_graph(path, processes=processes, cache=cache, lines=True)
+    with stats.timer("save"):
+        count = save_graph(graph, output)
+    print >>sys.stderr, "Wrote {} dependencies to {}".format(count, output)
+
+def update_store(root, output, processes=None, cache=None):
+    """
+    Brings the store at `output` up to date with the modules under the directory `root`.
+    Only the modules that were added or modified since the last update are analyzed,
+    along with the modules with edges into them, since e.g. the names a star-import
+    binds depend on the imported module; removed modules are deleted.
+    """
+    from project import iter_results, module_name
+    from watch import snapshot
+
+    #paths are stored absolute, so the store can be queried from anywhere
+    root = os.path.abspath(root)
+    store = DependencyStore(output)
+    stamps = snapshot(root)
+    stored = store.stamps()
+    changed = set(path for path, stamp in stamps.iteritems() if stored.get(path) != stamp)
+    deleted = [path for path in stored if path not in stamps]
+
+    names = store.module_names(deleted)
+    for path in changed:
+        names[path] = module_name(root, path)
+    for name in names.values():
+        for path in store.importers(name):
+            if path in stamps:
+                changed.add(path)
+    store.remove_modules(store.module_names(deleted).values())
+
+    errors = {}
+    def results():
+        for path, name, result, error in iter_results(root, processes, cache, paths=sorted(changed)):
+            if error:
+                errors[path] = error
+                #stale rows would outlive the module's last good analysis
+                store.remove_modules([name])
+                continue
+            yield (name, path, stamps[path]) + tuple(result)
+
+    with stats.timer("store"):
+        count = store.put_modules(results())
+    store.close()
+    for path, error in sorted(errors.items()):
+        print >>sys.stderr, "Error: unable to analyze {}: {}. Skipping!".format(path, error)
+    print >>sys.stderr, "Updated {} modules and removed {} in {}".format(count, len(deleted), output)
+    if cache:
+        cache.prune()
+
+def print_symbols(path, module_path):
+    """
+    Prints the symbols defined in the module at `module_path`,
+    as recorded in the store at `path`
+    """
+    with DependencyStore(path) as store:
+        print "symbols in {} are ".format(module_path)
+        for name, lineno, lineno_end, scope in store.symbols_in_file(os.path.abspath(module_path)):
+            print "{}:{}-{} {}".format(name, lineno, lineno_end, scope)
+
+def write_closure(path, output, level="module", processes=None, cache=None):
+    """
+    Writes the transitive closure of the modules at `path` to `output` as JSON,
+    i.e. each module (or name) mapped to everything it depends on, directly
+    or transitively, e.g. to check layering rules.
+    Arguments:-
+        path: a module, or a directory/package root
+        output: path of the output file; '-' for stdout
+        level: "module" or "symbol", i.e. the vertices of the closure
+    """
+    from closure import module_closure, symbol_closure
+    from jsonl import open_output
+
+    graph = load_graph(path, processes=processes, cache=cache)
+    with stats.timer("closure"):
+        closure = module_closure(graph) if level == "module" else symbol_closure(graph)
+    stats.count("closure_vertices", len(closure.names))
+    stats.count("closure_components", len(closure.components))
+
+    fileptr = open_output(output)
+    try:
+        closure.write_json(fileptr)
+    finally:
+        if fileptr is not sys.stdout:
+            fileptr.close()
+
+def print_cycles(path, level="module", processes=None, cache=None):
+    """
+    Prints the dependency cycles among the modules at `path`, i.e. each
+    strongly connected component and a shortest cycle through it.
+    Arguments:-
+        path: a module, or a directory/package root
+        level: "module" or "symbol", i.e. import cycles or cycles of dotted names
+    """
+    from cycles import module_cycles, symbol_cycles
+
+    graph = load_graph(path, processes=processes, cache=cache)
+    with stats.timer("cycles"):
+        cycles = module_cycles(graph) if level == "module" else symbol_cycles(graph)
+    stats.count("cycles", len(cycles))
+
+    print "{} cycles of {}s".format(len(cycles), level)
+    for members, witness in cycles:
+        print "cycle of {}: {}".format(len(members), ", ".join(members))
+        print "  " + " -> ".join(witness)
+
+def print_delta(added, removed):
+    """
+    Prints the added and removed dependencies
+    """
+    for src, dest in sorted(removed):
+        print "- {} -> {}".format(src, dest)
+    for src, dest in sorted(added):
+        print "+ {} -> {}".format(src, dest)
+    sys.stdout.flush()
+
+def watch_directory(root, processes=None, cache=None):
+    """
+    Analyze dependencies of all modules under the directory `root`, and
+    then keep re-analyzing modules as they change, printing the changed dependencies
+    """
+    from watch import Watcher
+
+    watcher = Watcher(root, processes=processes, cache=cache)
+    for path, error in sorted(watcher.errors.items()):
+        print "Error: unable to analyze {}: {}. Skipping!".format(path, error)
+    print "dependency table is "
+    print sorted(watcher.graph.edges())
+
+    print "Watching {} for changes".format(root)
+    sys.stdout.flush()
+    watcher.run(print_delta)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Statically determine the dependencies of a module")
+    parser.add_argument("path", 
+        help="path to starting module, or to a directory/package root to analyze all modules under it")
+    parser.add_argument("--processes", type=int, 
+        help="number of worker processes when analyzing a directory (default: number of cores)")
+    parser.add_argument("--watch", action="store_true",
+        help="when analyzing a directory, keep running and re-analyze modules as they change")
+    parser.add_argument("--jsonl", metavar="PATH",
+        help="write the dependencies as JSON lines to PATH ('-' for stdout) as they are found")
+    parser.add_argument("--dependents", metavar="NAME",
+        help="print the names that depend on dotted name NAME, directly or transitively")
+    parser.add_argument("--dependencies", metavar="NAME",
+        help="print the names that dotted name NAME depends on, directly or transitively")
+    parser.add_argument("--lazy", action="store_true",
+        help="with --dependencies on a directory, only analyze the modules reached from NAME")
+    parser.add_argument("--depth", type=int,
+        help="max number of edges followed by --dependents/--dependencies (default: unlimited)")
+    parser.add_argument("--save-graph", metavar="PATH",
+        help="write the graph to a binary graph file at PATH, which can be given "
+             "instead of a path to query it with --dependents/--dependencies")
+    parser.add_argument("--store", metavar="PATH",
+        help="when analyzing a directory, update the SQLite store at PATH, re-analyzing only "
+             "changed modules; the store can be given instead of a path to query it")
+    parser.add_argument("--symbols-in", metavar="FILE",
+        help="print the symbols defined in module FILE; the path must be a store")
+    parser.add_argument("--imports", action="store_true",
+        help="print the module level import graph of a directory, from the import statements only")
+    parser.add_argument("--closure", metavar="PATH",
+        help="write the transitive closure, i.e. everything each module depends on, "
+             "as JSON to PATH ('-' for stdout)")
+    parser.add_argument("--closure-level", choices=["module", "symbol"], default="module",
+        help="vertices of --closure, i.e. modules or dotted names (default: module)")
+    parser.add_argument("--cycles", nargs="?", const="module", choices=["module", "symbol"],
+        help="print the dependency cycles, i.e. import cycles (default) or cycles of dotted names, "
+             "with a shortest cycle through each")
+    parser.add_argument("--stats", nargs="?", const="human", choices=["human", "json"],
+        help="report the time of each phase and counters, e.g. of nodes visited, on stderr, "
+             "as a human readable summary (default) or JSON")
+    parser.add_argument("--cache-dir", 
+        help="directory of the on-disk cache of analyzed modules; no caching if omitted")
+    parser.add_argument("--cache-max-size", type=int, default=64, 
+        help="max size of the cache, in MB (default: 64)")
+    parser.add_argument("--cache-max-age", type=int, default=30,
+        help="max age of cache entries, in days (default: 30)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.path):
+        parser.error("{} does not exist".format(args.path))
+    if args.watch and not os.path.isdir(args.path):
+        parser.error("--watch requires a directory")
+    if args.jsonl and args.watch:
+        parser.error("--jsonl can't be combined with --watch")
+    if args.stats and args.watch:
+        parser.error("--stats can't be combined with --watch")
+    querying = args.dependents or args.dependencies
+    if querying and (args.jsonl or args.watch):
+        parser.error("--dependents/--dependencies can't be combined with --jsonl or --watch")
+    if args.closure and (querying or args.jsonl or args.watch):
+        parser.error("--closure can't be combined with --dependents/--dependencies, --jsonl or --watch")
+    if args.lazy and (not args.dependencies or args.dependents or not os.path.isdir(args.path)):
+        parser.error("--lazy requires --dependencies on a directory, without --dependents")
+    if args.imports and (querying or args.store or args.jsonl or args.watch or not os.path.isdir(args.path)):
+        parser.error("--imports requires a directory, and can't be combined with other modes")
+    if args.save_graph and (querying or args.closure or args.cycles or args.jsonl or args.watch):
+        parser.error("--save-graph can't be combined with other modes")
+    if is_graph_file(args.path) and not querying:
+        parser.error("a graph file can only be queried with --dependents/--dependencies")
+    if args.store and (querying or args.save_graph or args.closure or args.cycles
+                       or args.jsonl or args.watch or not os.path.isdir(args.path)):
+        parser.error("--store requires a directory, and can't be combined with other modes")
+    if args.symbols_in and not is_store_file(args.path):
+        parser.error("--symbols-in requires the path of a store")
+    if is_store_file(args.path) and not (querying or args.symbols_in):
+        parser.error("a store can only be queried with --dependents/--dependencies/--symbols-in")
+    if args.cycles and (querying or args.closure or args.jsonl or args.watch):
+        parser.error("--cycles can't be combined with --dependents/--dependencies, --closure, --jsonl or --watch")
+
+    cache = None
+    if args.cache_dir:
+        cache = ModuleCache(args.cache_dir, 
+                            max_size=args.cache_max_size * 1024 * 1024,
+                            max_age=args.cache_max_age * 24 * 3600)
+
+    if args.stats:
+        stats.enable()
+
+    with stats.timer("total"):
+        if querying or args.symbols_in:
+            if args.symbols_in:
+                print_symbols(args.path, args.symbols_in)
+            if args.lazy:
+                lazy_query(args.path, args.dependencies, depth=args.depth, cache=cache)
+            elif querying:
+                query(args.path, dependents=args.dependents, dependencies=args.dependencies,
+                      depth=args.depth, processes=args.processes, cache=cache)
+        elif args.imports:
+            print_imports(args.path)
+        elif args.store:
+            update_store(args.path, args.store, processes=args.processes, cache=cache)
+        elif args.save_graph:
+            save(args.path, args.save_graph, processes=args.processes, cache=cache)
+        elif args.cycles:
+            print_cycles(args.path, level=args.cycles, processes=args.processes, cache=cache)
+        elif args.closure:
+            write_closure(args.path, args.closure, level=args.closure_level,
+                          processes=args.processes, cache=cache)
+        elif args.jsonl:
+            analyze_jsonl(args.path, args.jsonl, processes=args.processes, cache=cache)
+        elif args.watch:
+            watch_directory(args.path, processes=args.processes, cache=cache)
+        elif os.path.isdir(args.path):
+            analyze_directory(args.path, processes=args.processes, cache=cache)
+        else:
+            analyze(args.path, cache=cache)
 
+    if args.stats:
+        print >>sys.stderr, stats.current.report(args.stats)
 
@@ -0,0 +1,304 @@
+"""
+This module benchmarks the phases of the analyzer on synthetic modules.
+
+The generated modules are tunable, so the time and peak memory of each
+phase can be tracked against e.g. the number of nodes, or the number of
+name collisions, and compared across changes to the analyzer.
+
+Usage:
+    python benchmark.py --vary defs --values 5,10,20,40
+    python benchmark.py --vary names --values 1,4,16 --json
+"""
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+import analyze
+from utils import get_module
+
+#Default parameters of the generated modules
+DEFAULTS = {
+    #number of modules in the generated package
+    "modules": 4,
+    #depth of nested function/class definitions
+    "depth": 2,
+    #number of definitions in each scope
+    "defs": 8,
+    #number of distinct local variable names; fewer names means more collisions
+    "names": 8,
+    #number of attributes in each attribute chain, e.g. 3 is x.a1.a2.a3
+    "chain": 3,
+    #number of sibling modules each module star-imports
+    "stars": 1,
+}
+
+#Phases that are benchmarked, in order
+PHASES = ["get_module", "create_symbol_table", "find_dependencies", "take3.create_dependency_tree"]
+
+
+##################################################
+############# Module generator ###################
+##################################################
+
+def generate_scope(lines, prefix, indent, level, params, imported):
+    """
+    Appends the source of the definitions of a single scope to `lines`.
+
+    Arguments:-
+        lines: list of lines of source
+        prefix: prefix of the names defined in this scope, so they are unique
+        indent: indentation of this scope
+        level: nesting level of this scope; nested scopes are generated up to params["depth"]
+        params: the generator parameters
+        imported: list of names bound by star-imports, which are loaded
+    """
+    pad = "    " * indent
+    defs = params["defs"]
+    #parameters and locals are suffixed by the level, since take3 can't resolve
+    #a name that shadows the same name in an enclosing scope
+    p0, p1 = "p{}_0".format(level), "p{}_1".format(level)
+    for i in range(defs):
+        name = "{}{}".format(prefix, i)
+        #alternate between functions and classes with methods
+        if i % 4 == 3:
+            lines.append("{}class {}:".format(pad, name))
+            lines.append("{}    def {}_m(self, {}):".format(pad, name, p0))
+            lines.append("{}        v{}_0 = self".format(pad, level))
+            lines.append("{}        return {}".format(pad, p0))
+            continue
+
+        lines.append("{}def {}({}, {}):".format(pad, name, p0, p1))
+        body = pad + "    "
+        for j in range(max(defs // 2, 1)):
+            #local names are drawn from a pool of params["names"], so they collide across scopes
+            local = "v{}_{}".format(level, j % params["names"])
+            if j % 3 == 0:
+                lines.append("{}{} = {}".format(body, local, p0))
+            elif j % 3 == 1:
+                #load a name from an enclosing scope, or one that was star-imported
+                if imported and j % 2:
+                    value = imported[(i + j) % len(imported)]
+                else:
+                    value = "{}{}".format(prefix, (i + j) % defs)
+                lines.append("{}{} = {}".format(body, local, value))
+            else:
+                chain = "".join(".a{}".format(k) for k in range(params["chain"]))
+                lines.append("{}{} = {}{}".format(body, local, p1, chain))
+
+        if level < params["depth"]:
+            generate_scope(lines, name + "_", indent + 1, level + 1,
+                           dict(params, defs=max(defs // 2, 1)), imported)
+        lines.append("{}return {}".format(body, p0))
+
+def generate_module(index, params):
+    """
+    Returns the source of module `index` of the generated package
+    """
+    lines = []
+    imported = []
+    #star-import the preceding modules, so the imports don't form cycles
+    for offset in range(1, params["stars"] + 1):
+        if index - offset < 0:
+            break
+        lines.append("from .mod{} import *".format(index - offset))
+        imported.extend("m{}_{}".format(index - offset, i) for i in range(params["defs"]))
+    generate_scope(lines, "m{}_".format(index), 0, 1, params, imported)
+    lines.append("")
+    return "\n".join(lines)
+
+def generate_package(directory, **params):
+    """
+    Writes a package of generated modules under `directory`.
+    Returns list of the paths of its modules.
+    Arguments:-
+        directory: directory the package is written in
+        params: the generator parameters; see DEFAULTS
+    """
+    params = dict(DEFAULTS, **params)
+    package = os.path.join(directory, "pkg")
+    os.mkdir(package)
+    with open(os.path.join(package, "__init__.py"), "w") as fileptr:
+        fileptr.write("")
+
+    paths = []
+    for index in range(params["modules"]):
+        path = os.path.join(package, "mod{}.py".format(index))
+        with open(path, "w") as fileptr:
+            fileptr.write(generate_module(index, params))
+        paths.append(path)
+    return paths
+
+def count_nodes(paths):
+    "Returns the number of AST nodes in the modules at `paths`"
+    total = 0
+    for path in paths:
+        with open(path, "r") as fileptr:
+            total += sum(1 for _ in ast.walk(ast.parse(fileptr.read())))
+    return total
+
+
+##################################################
+################# Harnesses ######################
+##################################################
+
+def setup_phase(phase, paths):
+    """
+    Returns a function that runs `phase` on each module at `paths`;
+    the inputs of the phase are prepared here, so they aren't part of the measurement.
+    """
+    if phase == "take3.create_dependency_tree":
+        import take3.analyze as take3
+
+    modules = []
+    for path in paths:
+        name = "pkg." + os.path.basename(path)[:-3]
+        if phase == "get_module":
+            modules.append((path,))
+            continue
+
+        if phase == "take3.create_dependency_tree":
+            root = take3.get_module(path)
+            root.name = name
+            events = []
+            symtable = take3.create_symbol_table(root, filepath=path, events=events)
+            modules.append((root, symtable, events))
+            continue
+
+        root = get_module(path)
+        root.name = name
+        if phase == "create_symbol_table":
+            modules.append((root, path))
+        else:
+            references = []
+            symbol_table = analyze.create_symbol_table(root, module_path=path, references=references)
+            modules.append((symbol_table, references))
+
+    if phase == "get_module":
+        run = lambda path: get_module(path)
+    elif phase == "create_symbol_table":
+        run = lambda root, path: analyze.create_symbol_table(root, module_path=path, references=[])
+    elif phase == "find_dependencies":
+        run = lambda symbol_table, references: analyze.find_dependencies(None, symbol_table, references)
+    else:
+        run = take3.create_dependency_tree
+
+    def run_all():
+        return [run(*args) for args in modules]
+    return run_all
+
+def measure_worker(phase, paths, repeat, queue):
+    """
+    Measures `phase` in a fresh process, so the peak memory of
+    the phases is measured independently; puts the
+    (seconds, peak memory in KB) pair, or the error, on `queue`
+    """
+    try:
+        run = setup_phase(phase, paths)
+        #ru_maxrss is a high-water mark, so the growth past the setup is the peak of the phase
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        best = None
+        for _ in range(repeat):
+            start = time.time()
+            results = run()
+            elapsed = time.time() - start
+            best = elapsed if best is None else min(best, elapsed)
+            del results
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - baseline
+        queue.put((best, peak, None))
+    except Exception as error:
+        #e.g. take3 can't resolve some constructs
+        queue.put((None, None, "{}: {}".format(error.__class__.__name__, error)))
+
+def measure(phase, paths, repeat=3):
+    """
+    Returns 3-tuple of (best time in seconds, peak memory in KB, error)
+    of running `phase` on the modules at `paths`
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=measure_worker, args=(phase, paths, repeat, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+def benchmark(params, phases=PHASES, repeat=3):
+    """
+    Generates a package with `params`, and benchmarks each of `phases` on it.
+    Returns a dict of the params, the number of nodes, and the
+    results of each phase, as a dict of seconds, peak_kb and error
+    """
+    directory = tempfile.mkdtemp(prefix="benchmark")
+    try:
+        paths = generate_package(directory, **params)
+        row = {"params": dict(DEFAULTS, **params), "nodes": count_nodes(paths), "phases": {}}
+        for phase in phases:
+            seconds, peak, error = measure(phase, paths, repeat=repeat)
+            row["phases"][phase] = {"seconds": seconds, "peak_kb": peak, "error": error}
+        return row
+    finally:
+        shutil.rmtree(directory)
+
+def print_rows(vary, rows, phases):
+    """
+    Prints the results as a table, with a time (ms) and
+    peak memory (KB) column for each phase
+    """
+    header = [vary, "nodes"]
+    for phase in phases:
+        header.extend([phase + " ms", "KB"])
+    print "\t".join(header)
+    for row in rows:
+        cells = [str(row["params"][vary]), str(row["nodes"])]
+        for phase in phases:
+            result = row["phases"][phase]
+            if result["error"]:
+                cells.extend(["error", "-"])
+            else:
+                cells.extend(["{:.1f}".format(result["seconds"] * 1000), str(result["peak_kb"])])
+        print "\t".join(cells)
+
+    for row in rows:
+        for phase in phases:
+            if row["phases"][phase]["error"]:
+                print >>sys.stderr, "{}={}: {} failed with {}".format(vary, row["params"][vary], phase,
+                                                                      row["phases"][phase]["error"])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the analyzer on generated modules")
+    parser.add_argument("--vary", choices=sorted(DEFAULTS), default="defs",
+        help="the generator parameter that is varied (default: defs)")
+    parser.add_argument("--values", default="4,8,16,32",
+        help="comma separated values of the varied parameter (default: 4,8,16,32)")
+    for name, value in sorted(DEFAULTS.items()):
+        parser.add_argument("--" + name, type=int, default=value,
+            help="generator parameter {} (default: {})".format(name, value))
+    parser.add_argument("--phases", default=",".join(PHASES),
+        help="comma separated phases to benchmark (default: all)")
+    parser.add_argument("--repeat", type=int, default=3,
+        help="number of runs of each phase; the fastest is reported (default: 3)")
+    parser.add_argument("--json", action="store_true",
+        help="print the results as JSON, e.g. to compare across changes")
+    args = parser.parse_args()
+
+    phases = args.phases.split(",")
+    for phase in phases:
+        if phase not in PHASES:
+            parser.error("unknown phase {}".format(phase))
+
+    base = dict((name, getattr(args, name)) for name in DEFAULTS)
+    rows = []
+    for value in args.values.split(","):
+        rows.append(benchmark(dict(base, **{args.vary: int(value)}), phases=phases, repeat=args.repeat))
+
+    if args.json:
+        print json.dumps(rows, indent=2, sort_keys=True)
+    else:
+        print_rows(args.vary, rows, phases)
@@ -0,0 +1,174 @@
+"""
+This module implements a persistent, on-disk cache of analysis results.
+
+Each entry stores the symbol table and dependency table of one module.
+Entries are keyed by a hash of the module's content, its name and
+the analyzer version, so an unchanged module can be loaded from the
+cache instead of being parsed and walked again.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+import consts
+from datastructures import STable, DTable, Scopes
+
+#Suffix of the cache entry files
+ENTRY_SUFFIX = ".json"
+
+
+def to_str(value):
+    """
+    json decodes strings as unicode; converts `value` back
+    to str so cached and fresh results are indistinguishable
+    """
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    return value
+
+
+def file_stamp(path):
+    """
+    Returns [mtime, size] of file at `path`, or None if it doesn't exist
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime, stat.st_size]
+
+
+class ModuleCache(object):
+    """
+    A directory of cache entries, one file per (module, content) pair.
+
+    The cache is kept bounded; entries older than `max_age` seconds are
+    evicted, and then the least recently used entries are evicted until
+    the total size is at most `max_size` bytes. The mtime of an entry
+    is refreshed whenever it is read, so it reflects the last use.
+    """
+    def __init__(self, directory, max_size=64 * 1024 * 1024, max_age=30 * 24 * 3600):
+        self.directory = directory
+        self.max_size = max_size
+        self.max_age = max_age
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self, module_name, source):
+        """
+        Returns the cache key for module `module_name` with contents `source`.
+        The module name is part of the key, since the scopes stored
+        in the symbol table are prefixed with it.
+        """
+        digest = hashlib.sha1()
+        digest.update(consts.ANALYZER_VERSION)
+        digest.update("\0")
+        digest.update(module_name)
+        digest.update("\0")
+        digest.update(source)
+        return digest.hexdigest()
+
+    def path(self, key):
+        "Returns the path of the entry for `key`"
+        return os.path.join(self.directory, key + ENTRY_SUFFIX)
+
+    def get(self, key):
+        """
+        Returns the (symbol table, dependency table) pair stored under `key`,
+        or None if there is no such (readable) entry.
+        """
+        path = self.path(key)
+        try:
+            with open(path, "r") as fileptr:
+                entry = json.load(fileptr)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if entry.get("version") != consts.ANALYZER_VERSION:
+            return None
+
+        #the symbol table also depends on the modules that were star-imported
+        for source, stamp in entry["sources"]:
+            if file_stamp(source) != stamp:
+                return None
+
+        #mark entry as recently used
+        try:
+            os.utime(path, None)
+        except OSError:
+            pass
+
+        symbol_table = STable()
+        names = symbol_table.names
+        for name, scopes in entry["symbols"].items():
+            for scope in scopes:
+                lineno, lineno_end, scope_name, src_module, src_name = map(to_str, scope)
+                symbol_table[to_str(name)] = Scopes(lineno, lineno_end, names.intern(scope_name),
+                                                    src_module, src_name)
+
+        dependency_table = DTable(symbol_table=symbol_table)
+        for src, dest, lineno in entry["edges"]:
+            dependency_table.add(to_str(src), to_str(dest), lineno)
+
+        return symbol_table, dependency_table
+
+    def put(self, key, symbol_table, dependency_table, sources=()):
+        """
+        Stores the symbol table and dependency table under `key`.
+        The entry is written to a temp file first and then renamed,
+        so readers never see a partially written entry.
+
+        `sources` are the paths of other modules the tables were derived from,
+        i.e. star-imported modules; the entry is stale once any of them change.
+        The paths of missing modules are stamped None, so the entry is also
+        stale once any of them are created.
+        """
+        entry = {
+            "version": consts.ANALYZER_VERSION,
+            "sources": [(path, file_stamp(path)) for path in sources],
+            "symbols": dict((name, [list(scope._replace(scopes=symbol_table.names.to_str(scope.scopes)))
+                                    for scope in scopes])
+                            for name, scopes in symbol_table.items()),
+            "edges": list(dependency_table.rows()),
+        }
+
+        fd, tmppath = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w") as fileptr:
+            json.dump(entry, fileptr)
+        os.rename(tmppath, self.path(key))
+
+    def prune(self):
+        """
+        Evicts entries older than `max_age`, and then the least recently
+        used entries until the cache is at most `max_size` bytes.
+        Returns the number of evicted entries.
+        """
+        now = time.time()
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(ENTRY_SUFFIX):
+                continue
+            path = os.path.join(self.directory, filename)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        #oldest first
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        evicted = 0
+        for mtime, size, path in entries:
+            if now - mtime <= self.max_age and total <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        return evicted
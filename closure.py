@@ -0,0 +1,254 @@
+"""
+This module computes the transitive closure of the dependency graph,
+i.e. which names (or modules) each name depends on, directly or not.
+
+The graph is condensed into its strongly connected components, which
+are processed in reverse topological order, so the reachable set of each
+component is the union of the reachable sets of its successors. The sets
+are bitsets, held as python ints while they are built, since the OR of
+two ints is a single C loop over machine words.
+"""
+import binascii
+import json
+from array import array
+
+
+def strongly_connected_components(size, successors):
+    """
+    Returns the strongly connected components of a graph, in reverse
+    topological order, i.e. a component comes after all components it has
+    edges into. Uses Tarjan's algorithm, iteratively, so deep graphs
+    don't overflow the stack.
+
+    Arguments:-
+        size: number of vertices, which are 0..size-1
+        successors: list of the iterable of successors of each vertex
+
+    Returns 2-tuple of (list of components, each a list of vertices,
+    array of the index of the component of each vertex)
+    """
+    UNVISITED = -1
+    index = array('i', [UNVISITED]) * size
+    lowlink = array('i', [0]) * size
+    on_stack = bytearray(size)
+    component = array('i', [0]) * size
+    stack = []
+    components = []
+    counter = 0
+
+    for root in xrange(size):
+        if index[root] != UNVISITED:
+            continue
+
+        #each frame is the vertex and the iterator over its remaining successors
+        index[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+        frames = [(root, iter(successors[root]))]
+
+        while frames:
+            vertex, children = frames[-1]
+            for child in children:
+                if index[child] == UNVISITED:
+                    index[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack[child] = 1
+                    frames.append((child, iter(successors[child])))
+                    break
+                elif on_stack[child]:
+                    lowlink[vertex] = min(lowlink[vertex], index[child])
+            else:
+                #all successors are visited
+                frames.pop()
+                if frames:
+                    parent = frames[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[vertex])
+
+                if lowlink[vertex] == index[vertex]:
+                    members = []
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = 0
+                        component[member] = len(components)
+                        members.append(member)
+                        if member == vertex:
+                            break
+                    components.append(members)
+
+    return components, component
+
+def module_graph(graph, external=False):
+    """
+    Returns the module level graph of DependencyGraph `graph`, where a module
+    depends on another if any name in it has an edge into the other.
+    Returns 2-tuple of (list of module names, list of the set of successors of each module)
+
+    Arguments:-
+        graph: a DependencyGraph
+        external: if True, the top-level packages outside the graph that
+            are depended on, e.g. os, are included as modules
+    """
+    names = sorted(graph.modules)
+    indexes = dict((name, i) for i, name in enumerate(names))
+    #id of module name -> its index
+    module_ids = {}
+    for name, i in indexes.iteritems():
+        ident = graph.names.find(name)
+        if ident is not None:
+            module_ids[ident] = i
+
+    #dest id -> index of the module it is in, or None; dests are shared by many edges
+    owners = {}
+    def owner(dest):
+        if dest in owners:
+            return owners[dest]
+        found = None
+        #the longest prefix of dest that names a module
+        for prefix in graph.names.ancestors(dest):
+            if prefix in module_ids:
+                found = module_ids[prefix]
+                break
+            top = prefix
+        if found is None and external:
+            package = graph.names.to_str(top)
+            if package not in indexes:
+                indexes[package] = len(names)
+                names.append(package)
+                successors.append(set())
+            found = indexes[package]
+        owners[dest] = found
+        return found
+
+    successors = [set() for _ in names]
+    for name in sorted(graph.modules):
+        src = indexes[name]
+        edges = graph.modules[name].edges
+        for i in xrange(1, len(edges), 2):
+            dest = owner(edges[i])
+            if dest is not None and dest != src:
+                successors[src].add(dest)
+    return names, successors
+
+def symbol_graph(graph):
+    """
+    Returns the name level graph of DependencyGraph `graph`, as
+    2-tuple of (list of names, list of the set of successors of each name)
+    """
+    ids = set(graph.forward)
+    for dests in graph.forward.itervalues():
+        ids.update(dests)
+    ids = sorted(ids)
+    indexes = dict((ident, i) for i, ident in enumerate(ids))
+    successors = [set(indexes[dest] for dest in graph.forward.get(ident, ())) for ident in ids]
+    return [graph.names.to_str(ident) for ident in ids], successors
+
+def to_bytes(bits, size):
+    """
+    Returns the bitset int `bits` of `size` bits as a little-endian bytearray,
+    so a bit can be tested in constant time
+    """
+    length = (size + 7) // 8
+    digits = '%x' % bits
+    packed = binascii.unhexlify(digits.zfill(len(digits) + len(digits) % 2))
+    return bytearray(packed[::-1]).ljust(length, '\0')
+
+
+class Closure(object):
+    """
+    The transitive closure of a graph, i.e. for each vertex
+    the set of vertices it depends on, directly or not.
+
+    Vertices in the same strongly connected component reach the same
+    vertices, so a single bitset row is kept per component.
+    """
+    def __init__(self, names, successors):
+        """
+        Arguments:-
+            names: list of the name of each vertex
+            successors: list of the iterable of successors of each vertex
+        """
+        self.names = names
+        self.indexes = dict((name, i) for i, name in enumerate(names))
+        size = len(names)
+
+        components, self.component = strongly_connected_components(size, successors)
+        #reverse topological order, so the rows of successor components are complete
+        rows = []
+        for members in components:
+            c = len(rows)
+            bits = 0
+            cyclic = len(members) > 1
+            for vertex in members:
+                for child in successors[vertex]:
+                    d = self.component[child]
+                    if d == c:
+                        #a self loop, or an edge within the component
+                        cyclic = True
+                    else:
+                        bits |= rows[d] | (1 << child)
+            if cyclic:
+                #the members of a cycle depend on each other, and themselves
+                for vertex in members:
+                    bits |= 1 << vertex
+            rows.append(bits)
+
+        self.components = components
+        self.rows = [to_bytes(bits, size) for bits in rows]
+
+    def depends(self, src, dest):
+        """
+        Returns True if `src` depends on `dest`, directly or transitively.
+        Names that aren't in the graph don't depend on anything.
+        """
+        i = self.indexes.get(src)
+        j = self.indexes.get(dest)
+        if i is None or j is None:
+            return False
+        return bool(self.rows[self.component[i]][j >> 3] >> (j & 7) & 1)
+
+    def dependencies(self, src):
+        """
+        Returns list of the names `src` depends on, directly or transitively
+        """
+        i = self.indexes.get(src)
+        if i is None:
+            return []
+        row = self.rows[self.component[i]]
+        names = self.names
+        found = []
+        for byte_index, byte in enumerate(row):
+            while byte:
+                #lowest set bit
+                low = byte & -byte
+                found.append(names[byte_index * 8 + low.bit_length() - 1])
+                byte ^= low
+        return found
+
+    def cycles(self):
+        "Returns list of the components of more than one vertex, as lists of names"
+        return [sorted(self.names[vertex] for vertex in members)
+                for members in self.components if len(members) > 1]
+
+    def write_json(self, fileptr):
+        """
+        Writes the closure to `fileptr` as a JSON object mapping each
+        name to the sorted list of names it depends on; one name per line
+        """
+        encode = json.JSONEncoder().encode
+        fileptr.write("{")
+        separator = "\n"
+        for name in sorted(self.names):
+            fileptr.write("{}{}: {}".format(separator, encode(name), encode(sorted(self.dependencies(name)))))
+            separator = ",\n"
+        fileptr.write("\n}\n")
+
+
+def module_closure(graph, external=False):
+    "Returns the Closure of the modules of DependencyGraph `graph`; see module_graph"
+    return Closure(*module_graph(graph, external=external))
+
+def symbol_closure(graph):
+    "Returns the Closure of the names of DependencyGraph `graph`"
+    return Closure(*symbol_graph(graph))
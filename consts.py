@@ -1,3 +1,8 @@
+#Version of the analyzer. Bump this whenever the structure of the
+#symbol table or dependency table changes, so that stale cache
+#entries are not reused.
+ANALYZER_VERSION = "0.5.0"
+
 #A list representing all the unique entity types in python
 ENTITY_LIST = ["function",
  "class",
@@ -0,0 +1,74 @@
+"""
+This module finds the dependency cycles of the dependency graph, at
+the level of modules (i.e. import cycles) or of dotted names.
+
+A cycle is a strongly connected component of more than one vertex;
+for each, a shortest cycle through one of its vertices is found as a
+witness, i.e. a concrete chain of dependencies to break.
+Both passes are iterative and linear in the number of edges.
+"""
+from collections import deque
+
+from closure import strongly_connected_components, module_graph, symbol_graph
+
+
+def witness_cycle(start, component, successors):
+    """
+    Returns list of the vertices of a shortest cycle through `start`,
+    beginning and ending with it. The search doesn't leave the
+    strongly connected component of `start`, since the cycle can't.
+    Self loops are skipped, since they don't witness the component.
+
+    Arguments:-
+        start: vertex in a component of more than one vertex
+        component: array of the index of the component of each vertex
+        successors: list of the iterable of successors of each vertex
+    """
+    target = component[start]
+    parents = {start: None}
+    queue = deque([start])
+    while queue:
+        vertex = queue.popleft()
+        for child in successors[vertex]:
+            if child == start and vertex != start:
+                cycle = [start]
+                while vertex is not None:
+                    cycle.append(vertex)
+                    vertex = parents[vertex]
+                cycle.reverse()
+                return cycle
+            if component[child] == target and child not in parents:
+                parents[child] = vertex
+                queue.append(child)
+    #unreachable for a strongly connected component
+    return [start]
+
+def find_cycles(names, successors):
+    """
+    Returns list of the cycles of a graph, as 2-tuples of (sorted list of the names
+    in the strongly connected component, witness cycle as list of names), largest first
+
+    Arguments:-
+        names: list of the name of each vertex
+        successors: list of the iterable of successors of each vertex
+    """
+    components, component = strongly_connected_components(len(names), successors)
+    cycles = []
+    for members in components:
+        if len(members) < 2:
+            continue
+        #start from the first name, so the witness is stable across runs
+        start = min(members, key=lambda vertex: names[vertex])
+        witness = witness_cycle(start, component, successors)
+        cycles.append((sorted(names[vertex] for vertex in members),
+                       [names[vertex] for vertex in witness]))
+    cycles.sort(key=lambda cycle: (-len(cycle[0]), cycle[0]))
+    return cycles
+
+def module_cycles(graph):
+    "Returns the import cycles of DependencyGraph `graph`; see find_cycles"
+    return find_cycles(*module_graph(graph))
+
+def symbol_cycles(graph):
+    "Returns the cycles of the dotted names of DependencyGraph `graph`; see find_cycles"
+    return find_cycles(*symbol_graph(graph))
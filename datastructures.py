@@ -1,103 +1,407 @@
-from utils import unique_id, scopes_to_str, node_type
+import ast
+import sys
+from array import array
+from bisect import bisect_left
+from itertools import izip
+from utils import unique_id
 from collections import namedtuple
 
+class Interner(object):
+    """
+    Maps each qualified (dotted) name to a small integer id, so that names
+    can be stored and compared as ints, and only built as strings for output.
+
+    The names are stored as a trie; each id corresponds to a
+    (parent id, component) pair, e.g. pkg.mod.foo is the component `foo`
+    under the id of pkg.mod. This way, qualifying a name with a scope
+    doesn't build a new string, and the prefixes of a name are its ancestors.
+    """
+    #parent id of top-level names
+    ROOT = -1
+
+    def __init__(self):
+        #(parent id, component) -> id
+        self.ids = {}
+        #id -> parent id
+        self.parents = array('i')
+        #id -> component
+        self.components = []
+
+    def __len__(self):
+        return len(self.components)
+
+    def qualify(self, parent, component):
+        """
+        Returns id of `component` within the name with id `parent`
+        """
+        key = (parent, component)
+        ident = self.ids.get(key)
+        if ident is None:
+            ident = len(self.components)
+            self.ids[key] = ident
+            self.parents.append(parent)
+            self.components.append(component)
+        return ident
+
+    def intern(self, dotted):
+        """
+        Returns id of the dotted name `dotted`
+        """
+        ident = Interner.ROOT
+        for component in dotted.split('.'):
+            ident = self.qualify(ident, component)
+        return ident
+
+    def find(self, dotted):
+        """
+        Returns id of the dotted name `dotted`, or None if it was never interned
+        """
+        ident = Interner.ROOT
+        for component in dotted.split('.'):
+            ident = self.ids.get((ident, component))
+            if ident is None:
+                return None
+        return ident
+
+    def ancestors(self, ident):
+        """
+        Yields `ident` and the ids of all its prefixes, e.g. for
+        pkg.mod.foo, the ids of pkg.mod.foo, pkg.mod and pkg
+        """
+        while ident != Interner.ROOT:
+            yield ident
+            ident = self.parents[ident]
+
+    def translate(self, other, ident, memo):
+        """
+        Returns the id in this interner of the name with id `ident` in interner `other`.
+        `memo` maps ids in other to ids in self; share it between calls.
+        """
+        if ident == Interner.ROOT:
+            return ident
+        translated = memo.get(ident)
+        if translated is None:
+            parent = self.translate(other, other.parents[ident], memo)
+            translated = self.qualify(parent, other.components[ident])
+            memo[ident] = translated
+        return translated
+
+    def to_str(self, ident):
+        """
+        Returns the dotted name with id `ident`
+        """
+        components = [self.components[i] for i in self.ancestors(ident)]
+        return '.'.join(reversed(components))
+
+
+def bisect_probes(size, index):
+    """
+    Returns the number of elements bisect_left probes in a list of `size`
+    elements to return `index`; the element at mid is less than the
+    value being searched for exactly when mid < index
+    """
+    low, high = 0, size
+    probes = 0
+    while low < high:
+        mid = (low + high) // 2
+        probes += 1
+        if mid < index:
+            low = mid + 1
+        else:
+            high = mid
+    return probes
+
+
+class ScopeList(list):
+    """
+    The list of scopes of a single name in the symbol table, sorted
+    by (lineno, lineno_end), along with an index over these line ranges.
+
+    `keys` holds the (lineno, lineno_end) of each scope, so the insertion
+    point of a scope is found by bisection. `max_ends[i]` is the largest
+    lineno_end of the first i+1 scopes; it is non-decreasing, so the first
+    scope that contains a lineno is also found by bisection.
+    """
+    def __init__(self, *args):
+        super(ScopeList, self).__init__(*args)
+        self.keys = [(value[0], value[1]) for value in self]
+        #built lazily on the first lookup after an insertion, since all
+        #scopes are typically inserted before any are looked up
+        self.max_ends = None
+
+    def add(self, value):
+        """
+        Inserts scope `value` in sorted position, unless a scope
+        with the same lineno and lineno_end already exists
+        """
+        key = (value[0], value[1])
+        i = bisect_left(self.keys, key)
+        if i < len(self.keys) and self.keys[i] == key:
+            #Don't insert duplicates
+            return
+        self.keys.insert(i, key)
+        self.insert(i, value)
+        self.max_ends = None
+
+    def find(self, lineno, counts=None):
+        """
+        Returns the first scope that (inclusively) contains `lineno`, or None.
+        If `counts` is passed, i.e. a LookupCounts, the scopes examined are added to it.
+        """
+        if self.max_ends is None:
+            self.max_ends = []
+            max_end = None
+            for _, lineno_end in self.keys:
+                max_end = max(max_end, lineno_end)
+                self.max_ends.append(max_end)
+
+        #the first scope that ends at or after lineno; no earlier scope can contain
+        #lineno, and if this one starts after lineno, then so do all later ones
+        i = bisect_left(self.max_ends, lineno)
+        if counts is not None:
+            #the probes of the bisection, and the scope it then checks
+            counts.candidates += bisect_probes(len(self.max_ends), i) + (i < len(self.keys))
+        if i < len(self.keys) and self.keys[i][0] <= lineno:
+            return self[i]
+        return None
+
+
 class STable(dict):
     """
     Implements a hashmap like data structure, where keys 
-    are mapped to a list of sorted items. Alternatively, a
-    priority queue could be used to order the values, albeit
+    are mapped to a list of sorted items, i.e. a ScopeList.
+    Alternatively, a priority queue could be used to order the values, albeit
     with higher memory usage.
 
     This is custom datastructure intended to be used as a symbol table on
     account of things like comparing only first 2 entries of 
     val
 
+    The scopes of the entries are ids in the interner `names`.
+
     TODO: __delitem__
     """
     def __init__(self, *args, **kw):
+        self.names = kw.pop("names", None) or Interner()
         super(STable, self).__init__(*args, **kw)
 
     def __setitem__(self, key, value):
         if not key in self: 
             #new entry, create a mapping from key to 
             #list of value
-            super(STable, self).__setitem__(key, [value])
+            super(STable, self).__setitem__(key, ScopeList([value]))
         else:
-            #val
-            for i, val in enumerate(self[key]):
-                #The comparison is only based on the
-                #first 2 elements, i.e. lineno and lineno_end
-                if val[:2] == value[:2]: 
-                    #Don't insert duplicates
-                    break 
-                elif val[:2] > value[:2]: 
-                    #should be okay to modify, since we will break
-                    self[key].insert(i, value)
-                    break
-            else:
-                #Append at tail
-                self[key].append(value)
+            #The comparison is only based on the
+            #first 2 elements, i.e. lineno and lineno_end
+            self[key].add(value)
+
+    def __reduce__(self):
+        """
+        Pickles as a plain mapping, since unpickling would otherwise call
+        __setitem__ with the whole list of values
+        """
+        return (STable, (dict(self),), {"names": self.names})
+
+    def __setstate__(self, state):
+        self.names = state["names"]
+
+    def __repr__(self):
+        """
+        Shows the scopes as dotted names rather than their ids. The names are
+        sorted, so the output doesn't depend on the order they were added in,
+        e.g. when the table is loaded from the cache
+        """
+        to_str = self.names.to_str
+        return "{{{}}}".format(", ".join(
+            "{!r}: {!r}".format(key, [scope._replace(scopes=to_str(scope.scopes)) for scope in self[key]])
+            for key in sorted(self)))
                 
-class DTable(list):
+class DTable(object):
     """
     A list like data structure. 
 
-    Specifically intended to store dependencies
+    Specifically intended to store dependencies. The (src, dest) pairs,
+    along with the lineno they occur on, are stored as parallel arrays of
+    ids in the interner of the symbol table; iterating the table yields
+    the pairs as dotted names.
     """
     def __init__(self, symbol_table=None):
-        super(DTable, self).__init__()
         self.symbol_table = symbol_table
+        self.names = symbol_table.names if symbol_table is not None else Interner()
+        self.src = array('i')
+        self.dest = array('i')
+        self.lines = array('i')
+        #src module -> id, since the same modules are imported from repeatedly
+        self.modules = {}
+
+    def append(self, value, counts=None):
+        """
+        Adds a value, i.e. a reference, to the datastructure, once it
+        has been resolved; see resolve. Unresolved references are skipped.
+        """
+        edge = self.resolve(value, counts)
+        if edge is not None:
+            src, dest, lineno = edge
+            self.src.append(src)
+            self.dest.append(dest)
+            self.lines.append(lineno)
 
-    def append(self, value):
+    def resolve(self, value, counts=None):
         """
-        Adds a value to the datastructure.
+        Resolves a value against the symbol table, without adding it.
+        Returns the (src id, dest id, lineno) 3-tuple, or None if
+        the name can't be resolved. If `counts` is passed, i.e. a LookupCounts,
+        the lookup is counted in it.
 
-        The value is a dependency pair, i.e. (src, dest). 
-        e.g. `y = x`, here value would be ('y', 'x'), since y is the 
+        The value is a reference, i.e. (src, name, lineno), where `name` is
+        loaded on line `lineno` within the scopes with id `src`.
+        e.g. `y = x`, here the dependency would be ('y', 'x'), since y is the 
         src of the dependency (here src should be interpreted as the progenitor, 
         since without y, x would just be and there would be no dependency.
 
         We know `y`'s context, since this method is called from y`s context.
         But what about x. Here, we use the symbol table to resolve `x`'s context. 
         """
-        #value is a 2-tuple of dependency src (scopes) and dest (node)
-        src, dest = value
+        #value is a 3-tuple of dependency src (scopes id), and the dest name and lineno
+        src, name, lineno = value
         
+        if counts is not None:
+            counts.lookups += 1
+
+        #names that are not in the symbol table, e.g. builtins, are unresolved
+        scopes = self.symbol_table.get(name)
+        if not scopes:
+            if counts is not None:
+                counts.unresolved += 1
+            return None
+
         #find first entry in symbol_table that
-        #(inclusively) contains node.lineno
-        for i, scope in enumerate(self.symbol_table[unique_id(dest)]):
-            #TODO: make sure the following makes sense    
-            if dest.lineno >= scope[0] and dest.lineno <= scope[1]:
-                #check if type is a module import
-                if scope.src_module:
-                    dest = "{}.{}".format(scope.src_module, unique_id(dest))
-                else:
-                    dest = "{}.{}".format(scope.scopes, unique_id(dest))
-                src = scopes_to_str(src)
-                super(DTable, self).append((src, dest))
-                break
-        
+        #(inclusively) contains lineno
+        #TODO: make sure the following makes sense    
+        scope = scopes.find(lineno, counts)
+        if scope is None:
+            if counts is not None:
+                counts.unresolved += 1
+            return None
+
+        #check if type is a module import
+        if scope.src_module:
+            dest = self.modules.get(scope.src_module)
+            if dest is None:
+                dest = self.modules[scope.src_module] = self.names.intern(scope.src_module)
+            if scope.src_name:
+                #the name was imported from another module
+                dest = self.names.qualify(dest, scope.src_name)
+            #else the name is the module itself
+        else:
+            dest = self.names.qualify(scope.scopes, name)
 
-Scopes = namedtuple('scopes', ['lineno', 'lineno_end', 'scopes', 'src_module' ])
+        return src, dest, lineno
+
+    def add(self, src, dest, lineno=0):
+        """
+        Adds an already resolved (src, dest) pair of dotted names, e.g. one
+        loaded from the cache, without consulting the symbol table.
+        """
+        self.src.append(self.names.intern(src))
+        self.dest.append(self.names.intern(dest))
+        self.lines.append(lineno)
+
+    def edges(self):
+        """
+        Returns iterator over (src id, dest id, lineno) 3-tuples
+        """
+        return izip(self.src, self.dest, self.lines)
+
+    def rows(self):
+        """
+        Yields (src, dest, lineno) 3-tuples, with src and dest as dotted names
+        """
+        to_str = self.names.to_str
+        for src, dest, lineno in self.edges():
+            yield to_str(src), to_str(dest), lineno
+
+    def __iter__(self):
+        "Yields (src, dest) pairs of dotted names"
+        to_str = self.names.to_str
+        for src, dest in izip(self.src, self.dest):
+            yield to_str(src), to_str(dest)
+
+    def __len__(self):
+        return len(self.src)
+
+    def __repr__(self):
+        return repr(list(self))
+
+
+class LookupCounts(object):
+    """
+    The counts of the symbol table lookups made to resolve references, i.e.
+    the lookups, the candidate scopes they examined and the unresolved names.
+    These are kept as ints while resolving, and added to the stats once per module.
+    """
+    __slots__ = ('lookups', 'candidates', 'unresolved')
+
+    def __init__(self):
+        self.lookups = 0
+        self.candidates = 0
+        self.unresolved = 0
+
+    def add_to(self, stats):
+        "Adds the counts to the counters of `stats`, i.e. a stats.Stats"
+        stats.count("lookups", self.lookups)
+        stats.count("candidates", self.candidates)
+        stats.count("unresolved", self.unresolved)
+
+
+#src_module and src_name are only set for imported names; src_name is the
+#name in src_module, or None if the name is bound to src_module itself
+Scopes = namedtuple('Scopes', ['lineno', 'lineno_end', 'scopes', 'src_module', 'src_name'])
+
+class NodeInfo(object):
+    """
+    The metadata of an AST node needed while walking it, i.e. its depth
+    in the tree, its line range and, for scoping nodes, the names declared global.
+    These are kept by the walk, rather than set as attributes of the nodes,
+    so the AST isn't modified and can be freed as soon as it has been walked.
+    """
+    __slots__ = ('depth', 'lineno', 'lineno_end', 'globals')
+
+    def __init__(self, depth, lineno, lineno_end):
+        self.depth = depth
+        self.lineno = lineno
+        self.lineno_end = lineno_end
+        #list of names declared global; created lazily
+        self.globals = None
 
 #These are the node types that create a scope
 #global and nonlocal vars need to tracked separately
-scoping_nodes = ["Module", "ClassDef", "FunctionDef"]
+#lambdas and generator expressions (and in python 3, all comprehensions)
+#have their own scope, so e.g. their parameters don't leak into the enclosing one
+scoping_nodes = frozenset([ast.Module, ast.ClassDef, ast.FunctionDef, ast.Lambda,
+                           ast.GeneratorExp, ast.SetComp, ast.DictComp] + 
+                          ([ast.ListComp] if sys.version_info[0] >= 3 else []) +
+                          ([ast.AsyncFunctionDef] if hasattr(ast, "AsyncFunctionDef") else []))
 
 class Stack(object):
     """
-    A class for representing a stack as used in create_symbol_table
-    and find_dependencies.
+    A class for representing a stack as used in create_symbol_table.
+    The stack holds (AST node, NodeInfo) pairs; the children of
+    nodes are found as they are popped.
     """
-    def __init__(self, root):
+    def __init__(self, root, info, names):
         #the stack itself
-        self.stack = [root]
+        self.stack = [(root, info)]
+        #interner of scope names
+        self.interner = names
 
         #stack representing the geneology of scopes that apply to the
         #current context with the highest scope being
-        #the smallest. Individual scopes are defined as the triple (lineno, lineno_end, scope_string).
-        #if the node.depth exceeds scope depth, pop the element
+        #the smallest. Individual scopes are the NodeInfo of the scoping node.
+        #if the node's depth exceeds scope depth, pop the element
         self.scopes = []
+        #the id of the dotted name of each scope on `scopes`
+        self.names = []
 
     def __iter__(self):
         return self
@@ -106,48 +410,61 @@ class Stack(object):
         if not self.stack:
             raise StopIteration
         else:
-            self.node, self.children = self.stack.pop()
-            self.ntype = node_type(self.node)
+            self.node, self.info = self.stack.pop()
+            self.children = list(ast.iter_child_nodes(self.node))
     
             #remove any stale scopes
             while self.scopes:
                 #check `depth` of closest scope    
-                if self.node.depth <= self.scopes[-1].depth:
+                if self.info.depth <= self.scopes[-1].depth:
                     self.scopes.pop()
+                    self.names.pop()
                 else:
                     break
             
-            return self.node, self.children, self.ntype
+            return self.node, self.info, self.children
 
-    def append(self, child):
-        "Append a node onto the stack"
-        self.stack.append(child)
+    def append(self, child, info):
+        "Append a node, and its NodeInfo, onto the stack"
+        self.stack.append((child, info))
 
-    def get_scopes(self, src_module=None):
+    def get_scopes(self, src_module=None, src_name=None):
         """
-        Returns a 4-tuple representing the top of the stack
-        consists of (lineno, lineno_end, str of scopes, src module)
-        src_module only applies when modules are imported and properties 
+        Returns a 5-tuple representing the top of the stack
+        consists of (lineno, lineno_end, id of scopes, src module, src name)
+        src_module and src_name only apply when names are imported and properties 
         must be correctly resolved.
         """
         return Scopes(lineno     = self.scopes[-1].lineno, 
                       lineno_end = self.scopes[-1].lineno_end, 
-                      scopes     = scopes_to_str(self.scopes),
-                      src_module = src_module)
+                      scopes     = self.names[-1],
+                      src_module = src_module,
+                      src_name   = src_name)
 
     def scope_tail(self):
         """
-        Returns the tail of the scopes
+        Returns the NodeInfo of the tail of the scopes
         """
         return self.scopes[-1]
 
+    def scope_name(self):
+        """
+        Returns the id of the dotted name of the scopes, e.g. module.Class.method
+        """
+        return self.names[-1]
+
     def check_and_push_scope(self):
         """
         pushes node on `scopes` stack if it is a
         scoping node
         """
-        if self.ntype in scoping_nodes:
-            self.scopes.append(self.node)
+        if self.node.__class__ in scoping_nodes:
+            if self.names:
+                self.names.append(self.interner.qualify(self.names[-1], unique_id(self.node)))
+            else:
+                #the module name may be dotted
+                self.names.append(self.interner.intern(unique_id(self.node)))
+            self.scopes.append(self.info)
          
 
 if __name__ == "__main__":
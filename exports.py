@@ -0,0 +1,232 @@
+"""
+This module statically determines the names a module exports, i.e.
+the names bound by `from <module> import *`, without importing it.
+"""
+import ast
+import os
+import sys
+
+import resolver
+
+#path -> ((mtime, size), list of exported names)
+#memoized so each module is resolved once, no matter how many modules star-import it
+_exports = {}
+
+
+def package_dir(importer_path, level):
+    """
+    Returns the directory a relative import of `level` dots is resolved against,
+    e.g. level 1 is the directory containing the importing module
+    """
+    directory = os.path.dirname(os.path.abspath(importer_path))
+    for _ in range(level - 1):
+        directory = os.path.dirname(directory)
+    return directory
+
+def search_dirs(importer_path, importer_name):
+    """
+    Returns list of directories that absolute imports are searched in, i.e. the
+    directory the importing module's top-level package lives in, the importing
+    module's own directory, and then sys.path
+    """
+    directory = os.path.dirname(os.path.abspath(importer_path))
+    dirs = [directory]
+    #e.g. pkg.sub.mod lives 2 directories below the base directory
+    for _ in range(importer_name.count('.')):
+        directory = os.path.dirname(directory)
+    if directory != dirs[0]:
+        dirs.insert(0, directory)
+    return dirs + [path or os.curdir for path in sys.path]
+
+def find_module(module, dirs):
+    """
+    Returns path of the source of dotted `module`, searching in `dirs`,
+    or None if no source exists (e.g. it is a builtin or C extension).
+    An empty `module` refers to the package in dirs[0].
+    """
+    return resolver.default.find(module or "", dirs)
+
+def bound_names(target):
+    """
+    Returns list of names bound by assignment target `target`
+    """
+    if isinstance(target, ast.Name):
+        return [target.id]
+    elif isinstance(target, (ast.Tuple, ast.List)):
+        names = []
+        for elt in target.elts:
+            names.extend(bound_names(elt))
+        return names
+    return []
+
+def literal_strings(node):
+    """
+    Returns list of strings in list/tuple literal `node`, or None if it isn't one
+    """
+    if not isinstance(node, (ast.List, ast.Tuple)):
+        return None
+    if not all(isinstance(elt, ast.Str) for elt in node.elts):
+        return None
+    return [elt.s for elt in node.elts]
+
+def top_level_bindings(module_path, body, seen):
+    """
+    Returns 2-tuple of (list of names bound at the top-level of `body`, __all__ or None).
+    Blocks that don't create a scope, e.g. if/try/for, are descended into, since e.g.
+    `try: import json except ImportError: json = None` binds at the top level.
+    """
+    names = []
+    dunder_all = None
+    for stmt in body:
+        if isinstance(stmt, (ast.FunctionDef, ast.ClassDef)):
+            names.append(stmt.name)
+        elif isinstance(stmt, ast.Assign):
+            for target in stmt.targets:
+                bound = bound_names(target)
+                if bound == ["__all__"]:
+                    dunder_all = literal_strings(stmt.value)
+                names.extend(bound)
+        elif isinstance(stmt, ast.AugAssign):
+            if bound_names(stmt.target) == ["__all__"] and dunder_all is not None:
+                extra = literal_strings(stmt.value)
+                if extra is not None:
+                    dunder_all = dunder_all + extra
+        elif isinstance(stmt, ast.Import):
+            for alias in stmt.names:
+                names.append(alias.asname or alias.name.split('.')[0])
+        elif isinstance(stmt, ast.ImportFrom):
+            if stmt.names[0].name == '*':
+                names.extend(star_import_names(stmt.module, stmt.level, module_path, seen=seen) or [])
+            else:
+                names.extend(alias.asname or alias.name for alias in stmt.names)
+        else:
+            #if/while/for/with/try; orelse, finalbody and handlers all bind at this level
+            for field in ("body", "orelse", "finalbody"):
+                block = getattr(stmt, field, None)
+                if block:
+                    more, more_all = top_level_bindings(module_path, block, seen)
+                    names.extend(more)
+                    dunder_all = more_all if more_all is not None else dunder_all
+            for handler in getattr(stmt, "handlers", None) or []:
+                more, more_all = top_level_bindings(module_path, handler.body, seen)
+                names.extend(more)
+                dunder_all = more_all if more_all is not None else dunder_all
+
+            if isinstance(stmt, ast.For):
+                names.extend(bound_names(stmt.target))
+
+    return names, dunder_all
+
+class Resolving(dict):
+    """
+    The paths of the modules whose exports are being resolved, mapped to their
+    depth in the chain of star-imports. `cycle` is the shallowest depth that a
+    star-import cycle returned to, since the current module started being resolved.
+    """
+    def __init__(self):
+        super(Resolving, self).__init__()
+        self.cycle = None
+
+def module_exports(path, seen=None):
+    """
+    Returns list of names exported by the module at `path`, i.e.
+    its __all__ if it is a literal, otherwise its public top-level names.
+    Results are memoized per path, and invalidated if the file changes.
+
+    Arguments:-
+        path: path to module source
+        seen: Resolving of the paths being resolved; guards against star-import cycles
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime, stat.st_size)
+    memo = _exports.get(path)
+    if memo and memo[0] == stamp:
+        return memo[1]
+
+    if seen is None:
+        seen = Resolving()
+    if path in seen:
+        #a star-import cycle; the names of path aren't known until it is resolved
+        if seen.cycle is None or seen[path] < seen.cycle:
+            seen.cycle = seen[path]
+        return []
+
+    depth = seen[path] = len(seen)
+    outer_cycle, seen.cycle = seen.cycle, None
+    try:
+        with open(path, "r") as fileptr:
+            root = ast.parse(fileptr.read())
+        names, dunder_all = top_level_bindings(path, root.body, seen)
+    finally:
+        del seen[path]
+        cycle, seen.cycle = seen.cycle, outer_cycle
+
+    if dunder_all is not None:
+        exports = dunder_all
+    else:
+        exports = sorted(set(name for name in names if name[0] != '_'))
+
+    if cycle is None or cycle >= depth:
+        _exports[path] = (stamp, exports)
+    else:
+        #a cycle returned to a module that star-imports this one, so the names this one
+        #star-imported from it are missing; only the complete result is memoized
+        if outer_cycle is None or cycle < outer_cycle:
+            seen.cycle = cycle
+    return exports
+
+def locate(module, level, importer_path, importer_name=None):
+    """
+    Returns path of the source of the module imported by `from <module> import ...`,
+    or None if it can't be found.
+
+    Arguments:-
+        module: dotted name of the imported module; None for e.g. `from . import *`
+        level: number of leading dots of a relative import
+        importer_path: path of the importing module
+        importer_name: dotted name of the importing module;
+            used to locate the base directory of absolute imports
+    """
+    return find_module(module, import_dirs(level, importer_path, importer_name))
+
+def import_dirs(level, importer_path, importer_name=None):
+    """
+    Returns list of directories the module of an import is searched in.
+    Arguments are as for `locate`.
+    """
+    if level:
+        return [package_dir(importer_path, level)]
+    return search_dirs(importer_path, importer_name or "")
+
+def candidate_paths(module, level, importer_path, importer_name=None):
+    """
+    Returns list of the paths the source of the imported module would be found at,
+    i.e. a module or package __init__.py in each directory searched, e.g. to
+    tell whether a module that couldn't be located has since been created.
+    Arguments are as for `locate`.
+    """
+    dirs = [os.path.abspath(directory) for directory in import_dirs(level, importer_path, importer_name)]
+    if not module:
+        return [os.path.join(dirs[0], "__init__.py")]
+
+    relpath = os.path.join(*module.split('.'))
+    paths = []
+    for directory in dirs:
+        paths.append(os.path.join(directory, relpath + ".py"))
+        paths.append(os.path.join(directory, relpath, "__init__.py"))
+    return paths
+
+def star_import_names(module, level, importer_path, importer_name=None, seen=None):
+    """
+    Returns list of names bound by `from <module> import *`, or None
+    if the source of `module` can't be found or parsed.
+    Arguments are as for `locate`.
+    """
+    path = locate(module, level, importer_path, importer_name)
+    if path is None:
+        return None
+
+    try:
+        return module_exports(path, seen=seen)
+    except (IOError, OSError, SyntaxError):
+        return None
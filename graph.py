@@ -0,0 +1,232 @@
+"""
+This module contains the project level dependency graph, i.e.
+the merged results of analyzing many modules.
+"""
+from array import array
+from collections import namedtuple, deque
+
+from datastructures import Interner
+
+#The analysis results of a single module
+#`edges` is a flat array of the module's (src, dest) pairs as ids in the graph's interner,
+#and `lines` the line number of each pair, or None if the graph doesn't keep them
+ModuleResult = namedtuple('ModuleResult', ['path', 'edges', 'lines'])
+
+
+class DependencyGraph(object):
+    """
+    The dependencies of a set of modules.
+
+    The edges of each module are kept, so a module can be replaced
+    when it is re-analyzed, along with the merged forward edges,
+    which map a src to the set of its dests. Names are stored as ids
+    in the graph's interner, and are only built as strings for output.
+
+    In addition, every prefix of every dest (i.e. its ancestors in the
+    interner) is mapped to the modules with edges into it, so the dependents
+    of a module can be found without knowing which prefix of a dest names a module.
+
+    The reverse edges, which map a dest to the set of its srcs, are kept
+    next to the forward edges, so the dependents of a name can be found
+    without a scan. The results of transitive queries are memoized until
+    the edges change.
+    """
+    def __init__(self, lines=False):
+        """
+        Arguments:-
+            lines: if True, the line number of each edge is kept, e.g. to save the graph
+        """
+        self.lines = lines
+        #module name -> ModuleResult
+        self.modules = {}
+        #interner of all names in the graph
+        self.names = Interner()
+        #src id -> set of dest ids
+        self.forward = {}
+        #dest id -> set of src ids
+        self.reverse = {}
+        #incremented whenever the edges change; memoized results of an older version are stale
+        self.version = 0
+        #(direction, id, depth) -> frozenset of names, and the version it was computed at
+        self.memo = {}
+        self.memo_version = 0
+        #dest prefix id -> set of names of modules with edges into it
+        self.importers = {}
+
+    def add_module(self, name, path, dependency_table):
+        """
+        Adds the dependencies of module `name`, replacing any previous ones.
+        Only the edges are kept, as ids in the graph's interner, so the module's
+        tables can be freed once it has been added.
+        """
+        if name in self.modules:
+            self.remove_module(name)
+
+        #the module's names are interned separately; translate them into the graph's ids
+        memo = {}
+        translate = self.names.translate
+        edges = array('i')
+        for src, dest, _ in dependency_table.edges():
+            edges.append(translate(dependency_table.names, src, memo))
+            edges.append(translate(dependency_table.names, dest, memo))
+        lines = array('i', dependency_table.lines) if self.lines else None
+
+        self.modules[name] = ModuleResult(path, edges, lines)
+        for i in xrange(0, len(edges), 2):
+            self.add_edge(edges[i], edges[i + 1])
+
+        for prefix in self.dest_prefixes(edges):
+            if prefix not in self.importers:
+                self.importers[prefix] = set()
+            self.importers[prefix].add(name)
+
+    def remove_module(self, name):
+        """
+        Removes module `name` and the edges originating in it.
+        Since srcs are prefixed by the name of their module, edges
+        are never shared between modules.
+        """
+        result = self.modules.pop(name)
+        edges = result.edges
+        for i in xrange(0, len(edges), 2):
+            self.remove_edge(edges[i], edges[i + 1])
+
+        for prefix in self.dest_prefixes(edges):
+            importers = self.importers[prefix]
+            importers.discard(name)
+            if not importers:
+                del self.importers[prefix]
+
+    def dest_prefixes(self, edges):
+        """
+        Returns set of ids of all prefixes of the dests in flat (src, dest) array `edges`,
+        e.g. pkg.mod.foo gives pkg, pkg.mod and pkg.mod.foo
+        """
+        prefixes = set()
+        for i in xrange(1, len(edges), 2):
+            prefixes.update(self.names.ancestors(edges[i]))
+        return prefixes
+
+    def module_edges(self, name):
+        "Returns set of (src, dest) pairs originating in module `name`"
+        if name not in self.modules:
+            return set()
+        edges = self.modules[name].edges
+        to_str = self.names.to_str
+        return set((to_str(edges[i]), to_str(edges[i + 1])) for i in xrange(0, len(edges), 2))
+
+    def module_rows(self, name):
+        """
+        Yields (src, dest, lineno) 3-tuples of the edges originating in module `name`,
+        with src and dest as dotted names; the graph must keep the line numbers
+        """
+        result = self.modules[name]
+        to_str = self.names.to_str
+        for i, lineno in enumerate(result.lines):
+            yield to_str(result.edges[2 * i]), to_str(result.edges[2 * i + 1]), lineno
+
+    def dependents(self, name):
+        """
+        Returns set of names of the other modules with edges into module `name`
+        """
+        ident = self.names.find(name)
+        if ident is None:
+            return set()
+        return self.importers.get(ident, set()) - set([name])
+
+    def add_edge(self, src, dest):
+        "Adds a dependency from id `src` to id `dest`"
+        if src not in self.forward:
+            self.forward[src] = set()
+        self.forward[src].add(dest)
+        if dest not in self.reverse:
+            self.reverse[dest] = set()
+        self.reverse[dest].add(src)
+        self.version += 1
+
+    def remove_edge(self, src, dest):
+        "Removes the dependency from id `src` to id `dest`, if it exists"
+        dests = self.forward.get(src)
+        if dests is None:
+            return
+        dests.discard(dest)
+        if not dests:
+            del self.forward[src]
+
+        srcs = self.reverse.get(dest)
+        if srcs is not None:
+            srcs.discard(src)
+            if not srcs:
+                del self.reverse[dest]
+        self.version += 1
+
+    def direct_dependents(self, name):
+        """
+        Returns set of names with an edge into `name`, i.e. that use it directly
+        """
+        return self.transitive(self.reverse, name, 1)
+
+    def transitive_dependents(self, name, depth=None):
+        """
+        Returns set of names that depend on `name`, directly or through
+        other names, i.e. what may break if `name` changes.
+        Arguments:-
+            name: dotted name
+            depth: max number of edges followed; unlimited if None
+        """
+        return self.transitive(self.reverse, name, depth)
+
+    def transitive_dependencies(self, name, depth=None):
+        """
+        Returns set of names that `name` depends on, directly or
+        through other names. Arguments are as for transitive_dependents.
+        """
+        return self.transitive(self.forward, name, depth)
+
+    def transitive(self, edges, name, depth=None):
+        """
+        Returns frozenset of the names reachable from `name`, excluding itself, by following
+        at most `depth` of `edges`, i.e. self.forward or self.reverse.
+        Results are memoized until the edges change.
+        """
+        if self.memo_version != self.version:
+            self.memo = {}
+            self.memo_version = self.version
+
+        ident = self.names.find(name)
+        if ident is None:
+            return frozenset()
+
+        key = (edges is self.forward, ident, depth)
+        result = self.memo.get(key)
+        if result is not None:
+            return result
+
+        #breadth first, so each name is reached in the fewest edges
+        seen = set([ident])
+        queue = deque([(ident, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            if depth is not None and distance == depth:
+                continue
+            for neighbor in edges.get(current, ()):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append((neighbor, distance + 1))
+        seen.discard(ident)
+
+        to_str = self.names.to_str
+        result = self.memo[key] = frozenset(to_str(neighbor) for neighbor in seen)
+        return result
+
+    def edges(self):
+        "Yields all (src, dest) pairs, as dotted names"
+        to_str = self.names.to_str
+        for src, dests in self.forward.iteritems():
+            src = to_str(src)
+            for dest in dests:
+                yield src, to_str(dest)
+
+    def __len__(self):
+        "Returns the number of edges"
+        return sum(len(dests) for dests in self.forward.itervalues())
@@ -0,0 +1,209 @@
+"""
+This module saves the dependency graph in a compact binary file, which
+is opened with mmap, so it can be queried without re-analyzing, or
+even deserializing, the graph; pages are only read as they are touched.
+
+Layout, all integers are little-endian unsigned 32 bit:
+    header: magic, format version, number of names, number of edges, size of the string blob
+    string offsets: (names + 1) offsets into the blob; name i is blob[offsets[i]:offsets[i + 1]]
+    string blob: the dotted names, utf-8, in sorted order, so a name is found by binary search
+    forward index: (names + 1) offsets; the edges from name i are edges[index[i]:index[i + 1]]
+    forward dests, forward linenos: (edges) ids of the dests of each edge, and its line number
+    reverse index, reverse srcs, reverse linenos: as above, for the edges into each name
+"""
+import mmap
+import struct
+import sys
+from array import array
+from collections import deque
+
+#First bytes of a graph file
+MAGIC = "DEPG"
+
+#Version of the layout; bump it whenever the layout changes
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sIIII")
+UINT = struct.Struct("<I")
+
+
+def is_graph_file(path):
+    "Returns True if the file at `path` is a graph file"
+    try:
+        with open(path, "rb") as fileptr:
+            return fileptr.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+def write_uints(values, fileptr):
+    "Writes iterable of ints `values` to `fileptr` as little-endian unsigned 32 bit integers"
+    values = array('I', values)
+    if sys.byteorder == "big":
+        values.byteswap()
+    values.tofile(fileptr)
+
+def write_csr(size, edges, fileptr):
+    """
+    Writes the index, the targets and the linenos of `edges`, i.e. list
+    of (from id, to id, lineno) 3-tuples sorted by from id, to `fileptr`
+    """
+    index = array('I', [0]) * (size + 1)
+    for start, _, _ in edges:
+        index[start + 1] += 1
+    for i in xrange(size):
+        index[i + 1] += index[i]
+    write_uints(index, fileptr)
+    write_uints((end for _, end, _ in edges), fileptr)
+    write_uints((lineno for _, _, lineno in edges), fileptr)
+
+def save_graph(graph, path):
+    """
+    Writes the edges of DependencyGraph `graph`, with the line number
+    of each, to a graph file at `path`; the graph must have been created with
+    lines=True. Returns the number of edges.
+    """
+    if not graph.lines:
+        raise ValueError("the graph doesn't keep the line numbers of its edges")
+    rows = []
+    for name in graph.modules:
+        rows.extend(graph.module_rows(name))
+
+    names = set()
+    for src, dest, _ in rows:
+        names.add(src)
+        names.add(dest)
+    names = sorted(names)
+    ids = dict((name, i) for i, name in enumerate(names))
+    edges = sorted(set((ids[src], ids[dest], lineno) for src, dest, lineno in rows))
+
+    offsets = array('I', [0])
+    for name in names:
+        offsets.append(offsets[-1] + len(name))
+    blob = "".join(names)
+
+    with open(path, "wb") as fileptr:
+        fileptr.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(names), len(edges), len(blob)))
+        write_uints(offsets, fileptr)
+        fileptr.write(blob)
+        #pad, so the arrays are aligned
+        fileptr.write("\0" * (-len(blob) % UINT.size))
+        write_csr(len(names), edges, fileptr)
+        edges.sort(key=lambda edge: (edge[1], edge[0], edge[2]))
+        write_csr(len(names), [(dest, src, lineno) for src, dest, lineno in edges], fileptr)
+    return len(edges)
+
+
+class GraphFile(object):
+    """
+    A graph file, opened with mmap. Names are looked up by binary search
+    over the sorted string table, and edges are read from the CSR arrays
+    in place, so opening a graph file costs the same no matter its size.
+    """
+    def __init__(self, path):
+        with open(path, "rb") as fileptr:
+            self.buffer = mmap.mmap(fileptr.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.size, self.edge_count, blob_size = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.buffer.close()
+            raise ValueError("{} is not a graph file of version {}".format(path, FORMAT_VERSION))
+
+        #byte offsets of the sections
+        word = UINT.size
+        self.string_offsets = HEADER.size
+        self.blob = self.string_offsets + (self.size + 1) * word
+        csr = self.blob + blob_size + (-blob_size % word)
+        sections = []
+        for _ in range(2):
+            index = csr
+            targets = index + (self.size + 1) * word
+            linenos = targets + self.edge_count * word
+            csr = linenos + self.edge_count * word
+            sections.append((index, targets, linenos))
+        self.forward, self.reverse = sections
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.buffer.close()
+
+    def __len__(self):
+        "Returns the number of edges"
+        return self.edge_count
+
+    def uint(self, offset, i):
+        "Returns the `i`th integer of the array at byte offset `offset`"
+        return UINT.unpack_from(self.buffer, offset + i * UINT.size)[0]
+
+    def name(self, ident):
+        "Returns the dotted name with id `ident`"
+        start = self.uint(self.string_offsets, ident)
+        end = self.uint(self.string_offsets, ident + 1)
+        return self.buffer[self.blob + start:self.blob + end]
+
+    def find(self, name):
+        "Returns the id of dotted name `name`, or None if it isn't in the graph"
+        low, high = 0, self.size
+        while low < high:
+            middle = (low + high) // 2
+            if self.name(middle) < name:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.size and self.name(low) == name:
+            return low
+        return None
+
+    def neighbors(self, section, ident):
+        "Yields (id, lineno) of the edges from id `ident` in `section`, i.e. self.forward or self.reverse"
+        index, targets, linenos = section
+        for i in xrange(self.uint(index, ident), self.uint(index, ident + 1)):
+            yield self.uint(targets, i), self.uint(linenos, i)
+
+    def dependencies(self, name):
+        "Returns list of (dest, lineno) of the edges from dotted name `name`"
+        ident = self.find(name)
+        if ident is None:
+            return []
+        return [(self.name(dest), lineno) for dest, lineno in self.neighbors(self.forward, ident)]
+
+    def dependents(self, name):
+        "Returns list of (src, lineno) of the edges into dotted name `name`"
+        ident = self.find(name)
+        if ident is None:
+            return []
+        return [(self.name(src), lineno) for src, lineno in self.neighbors(self.reverse, ident)]
+
+    def transitive_dependents(self, name, depth=None):
+        "Returns frozenset of the names that depend on `name`; as DependencyGraph.transitive_dependents"
+        return self.transitive(self.reverse, name, depth)
+
+    def transitive_dependencies(self, name, depth=None):
+        "Returns frozenset of the names `name` depends on; as DependencyGraph.transitive_dependencies"
+        return self.transitive(self.forward, name, depth)
+
+    def transitive(self, section, name, depth=None):
+        """
+        Returns frozenset of the names reachable from `name`, excluding itself, by following
+        at most `depth` of the edges of `section`, i.e. self.forward or self.reverse
+        """
+        ident = self.find(name)
+        if ident is None:
+            return frozenset()
+
+        seen = set([ident])
+        queue = deque([(ident, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            if depth is not None and distance == depth:
+                continue
+            for neighbor, _ in self.neighbors(section, current):
+                if neighbor not in seen:
+                    seen.add(neighbor)
+                    queue.append((neighbor, distance + 1))
+        seen.discard(ident)
+        return frozenset(self.name(neighbor) for neighbor in seen)
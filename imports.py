@@ -0,0 +1,152 @@
+"""
+This module scans modules for their import statements only, to build
+the module level import graph, e.g. for build ordering, without the
+symbol table or the resolution of names.
+
+Rather than parsing the whole module, the lines that start an import
+statement are found with a regex, and only those statements (with their
+continuation lines) are parsed. Lines within triple-quoted strings, e.g.
+docstrings, are skipped; the strings are found by a second regex that matches
+comments and string literals left to right, as the tokenizer would.
+"""
+import ast
+import os
+import re
+from bisect import bisect_right
+
+import stats
+
+#Lines that start an import statement
+IMPORT_LINE = re.compile(r"^[ \t]*(?:import|from)[ \t(\\]", re.MULTILINE)
+
+#Comments and string literals; only triple-quoted strings are captured (as group 1),
+#the others are matched so that quotes within them, or within comments, are skipped
+STRINGS = re.compile(r"""
+    \#[^\n]*
+  | ( \"\"\"(?:[^"\\]|\\.|"(?!""))*\"\"\"
+    | '\''(?:[^'\\]|\\.|'(?!''))*'\'' )
+  | "(?:[^"\\\n]|\\.)*"
+  | '(?:[^'\\\n]|\\.)*'
+""", re.VERBOSE | re.DOTALL)
+
+
+def absolute_name(dest, module, is_package):
+    """
+    Returns relative dotted name `dest`, e.g. .decoder.JSONDecoder,
+    qualified by the package it is relative to, or `dest` if it is absolute.
+    Arguments:-
+        module: name of the module the dest is in
+        is_package: whether the module is a package, i.e. an __init__.py
+    """
+    if not dest.startswith('.'):
+        return dest
+    stripped = dest.lstrip('.')
+    level = len(dest) - len(stripped)
+    parts = module.split('.')
+    #a package's relative imports are relative to itself
+    drop = level - 1 if is_package else level
+    if drop >= len(parts):
+        return dest
+    return '.'.join(parts[:len(parts) - drop] + ([stripped] if stripped else []))
+
+def string_spans(source):
+    """
+    Returns 2-tuple of sorted lists of the (starts, ends) offsets
+    of the triple-quoted strings of `source`
+    """
+    starts, ends = [], []
+    if '"""' not in source and "'''" not in source:
+        return starts, ends
+    for match in STRINGS.finditer(source):
+        if match.group(1):
+            starts.append(match.start())
+            ends.append(match.end())
+    return starts, ends
+
+def import_statements(source):
+    """
+    Yields (lineno, source) of the statements of `source` that start with
+    import or from, including their continuation lines, dedented
+    """
+    starts, ends = string_spans(source)
+    lineno, counted = 1, 0
+    for match in IMPORT_LINE.finditer(source):
+        start = match.start()
+        #within the last string that starts before it
+        i = bisect_right(starts, start) - 1
+        if i >= 0 and start < ends[i]:
+            continue
+        #the newlines are counted from the previous match
+        lineno += source.count("\n", counted, start)
+        counted = start
+        end = source.find("\n", start)
+        end = len(source) if end == -1 else end
+        statement = source[start:end]
+        #continued by a backslash, or within parentheses
+        while end < len(source) and (statement.rstrip().endswith("\\") or
+                                     statement.count("(") > statement.count(")")):
+            next_end = source.find("\n", end + 1)
+            next_end = len(source) if next_end == -1 else next_end
+            statement = source[start:next_end]
+            end = next_end
+        yield lineno, statement.strip()
+
+def scan_imports(source, module, is_package, known=()):
+    """
+    Returns list of (imported module, lineno) of the import statements in `source`.
+    For `from <module> import <name>`, the imported module is <module>.<name> if that's one of
+    `known`, i.e. <name> is a submodule, and <module> otherwise.
+
+    Arguments:-
+        source: the source of the module
+        module: dotted name of the module
+        is_package: whether the module is a package, i.e. an __init__.py
+        known: set of the dotted names of the modules of the project
+    """
+    if "import" not in source:
+        return []
+
+    imports = []
+    for lineno, statement in import_statements(source):
+        try:
+            body = ast.parse(statement).body
+        except SyntaxError:
+            continue
+        for node in body:
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports.append((alias.name, lineno))
+            elif isinstance(node, ast.ImportFrom):
+                imported = absolute_name('.' * node.level + (node.module or ''), module, is_package)
+                for alias in node.names:
+                    submodule = "{}.{}".format(imported, alias.name)
+                    imports.append((submodule if submodule in known else imported, lineno))
+    return imports
+
+def scan_project(root):
+    """
+    Returns list of (module, imported module, lineno) of the import statements
+    of all modules under `root`, and dict of path -> error message of the modules
+    that couldn't be parsed
+    """
+    #project imports analyze, which imports this module
+    from project import discover_modules, module_name
+
+    paths = dict((module_name(root, path), path) for path in discover_modules(root))
+    known = frozenset(paths)
+    edges = []
+    errors = {}
+    for name, path in sorted(paths.items()):
+        stats.count("modules")
+        try:
+            with stats.timer("read"):
+                with open(path, "r") as fileptr:
+                    source = fileptr.read()
+            with stats.timer("scan"):
+                imports = scan_imports(source, name, os.path.basename(path) == "__init__.py", known)
+        except (IOError, OSError, SyntaxError, TypeError) as error:
+            #TypeError is raised for sources with null bytes
+            errors[path] = "{}: {}".format(error.__class__.__name__, error)
+            continue
+        edges.extend((name, imported, lineno) for imported, lineno in imports)
+    return edges, errors
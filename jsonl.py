@@ -0,0 +1,54 @@
+"""
+This module writes dependencies as newline-delimited JSON,
+i.e. one JSON object per dependency, so they can be consumed
+as they are written rather than once the analysis is complete.
+"""
+import json
+import sys
+
+#Size of the buffer of the output file, in bytes
+BUFFER_SIZE = 1024 * 1024
+
+#Number of records formatted before they are handed to the file as a single write
+BATCH_SIZE = 512
+
+#The JSON object of a single dependency
+RECORD = '{{"module":{},"src":{},"dest":{},"lineno":{}}}'
+
+
+def open_output(path):
+    """
+    Returns file object for `path`, with a large write buffer.
+    '-' refers to stdout.
+    """
+    if path == '-':
+        return sys.stdout
+    return open(path, "w", BUFFER_SIZE)
+
+def write_dependencies(dependencies, fileptr):
+    """
+    Writes each dependency as a JSON object on its own line, and
+    returns the number written.
+
+    Arguments:-
+        dependencies: iterable of (module, src, dest, lineno) 4-tuples
+        fileptr: file object to write to
+    """
+    #the fields are formatted directly, rather than dumping a dict, so they are in a fixed order
+    encode = json.JSONEncoder().encode
+    count = 0
+    batch = []
+    for module, src, dest, lineno in dependencies:
+        batch.append(RECORD.format(encode(module), encode(src), encode(dest), lineno))
+        if len(batch) == BATCH_SIZE:
+            batch.append("")
+            fileptr.write("\n".join(batch))
+            count += BATCH_SIZE
+            batch = []
+
+    if batch:
+        batch.append("")
+        fileptr.write("\n".join(batch))
+        count += len(batch) - 1
+    fileptr.flush()
+    return count
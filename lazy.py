@@ -0,0 +1,96 @@
+"""
+This module implements demand-driven analysis, i.e. the dependencies
+of a single name are found by analyzing only the modules its edges reach,
+rather than every module under the root up front.
+
+The module of a name is the longest prefix of it with a source under the
+root; a dest of an imported name is qualified by the module it was
+imported from (its src_module), so the edge leads to the next module to analyze.
+"""
+import os
+from collections import deque
+
+import stats
+from analyze import analyze_module
+from imports import absolute_name
+from resolver import ModuleResolver
+
+
+class LazyAnalyzer(object):
+    """
+    Analyzes the modules under `root` as their names are reached.
+
+    Each module is analyzed at most once; its edges are kept indexed by src,
+    and the module a name lives in is memoized by prefix, so both the
+    analysis and the file system lookups are proportional to the reachable names.
+    """
+    def __init__(self, root, cache=None):
+        root = os.path.abspath(root)
+        self.root = root
+        self.cache = cache
+        #module names are relative to the directory containing root, if root is a package
+        self.base = os.path.dirname(root) if os.path.isfile(os.path.join(root, "__init__.py")) else root
+        #resolves names to the modules under base; memoizes them by prefix
+        self.resolver = ModuleResolver([self.base])
+        #module name -> dict of src -> list of dests
+        self.modules = {}
+        #path -> error message of modules that couldn't be analyzed
+        self.errors = {}
+
+    def find_path(self, name):
+        "Returns path of the source of module `name` under root, or None"
+        path = self.resolver.find(name)
+        if path is not None and not path.startswith(self.root + os.sep):
+            return None
+        return path
+
+    def locate(self, name):
+        "Returns name of the module that dotted name `name` lives in, or None"
+        module, path = self.resolver.locate(name)
+        if path is None or not path.startswith(self.root + os.sep):
+            return None
+        return module
+
+    def load(self, module):
+        "Returns the edges of `module`, as a dict of src -> list of dests, analyzing it if needed"
+        if module in self.modules:
+            return self.modules[module]
+
+        path = self.find_path(module)
+        edges = self.modules[module] = {}
+        try:
+            _, dependency_table = analyze_module(path, module_name=module, cache=self.cache)
+        except Exception as error:
+            self.errors[path] = "{}: {}".format(error.__class__.__name__, error)
+            return edges
+
+        is_package = os.path.basename(path) == "__init__.py"
+        for src, dest in dependency_table:
+            edges.setdefault(src, []).append(absolute_name(dest, module, is_package))
+        stats.count("lazy_modules")
+        return edges
+
+    def dependencies(self, name):
+        "Returns list of the dests of the edges from dotted name `name`"
+        module = self.locate(name)
+        if module is None:
+            return []
+        return self.load(module).get(name, [])
+
+    def transitive_dependencies(self, name, depth=None):
+        """
+        Returns frozenset of the names `name` depends on, directly or transitively,
+        following at most `depth` edges; as DependencyGraph.transitive_dependencies
+        """
+        seen = set([name])
+        queue = deque([(name, 0)])
+        while queue:
+            current, distance = queue.popleft()
+            if depth is not None and distance == depth:
+                continue
+            for dest in self.dependencies(current):
+                if dest not in seen:
+                    seen.add(dest)
+                    queue.append((dest, distance + 1))
+        seen.discard(name)
+        return frozenset(seen)
@@ -0,0 +1,87 @@
+"""
+This module reads the sources of modules ahead of their analysis, in a
+pool of threads, so the latency of the reads, e.g. on a network mounted
+checkout, overlaps with the parsing and analysis of the modules already read.
+
+The read sources are handed over through a bounded queue, so at most
+`depth` sources are held at a time, however far ahead the readers are.
+"""
+import threading
+from Queue import Queue, Empty, Full
+
+from utils import read_source
+
+#Number of threads reading sources
+READ_THREADS = 4
+
+#Max number of sources read but not yet consumed
+QUEUE_DEPTH = 32
+
+#Seconds a reader waits on a full queue before checking whether the consumer stopped
+PUT_TIMEOUT = 0.1
+
+#Put on the queue by each reader once there are no more paths
+_DONE = object()
+
+
+def prefetch(paths, threads=READ_THREADS, depth=QUEUE_DEPTH):
+    """
+    Reads the files at `paths` in a pool of threads, yielding
+    (path, source, error) 3-tuples in the order the reads complete,
+    where source is None and error is the error message if the read failed
+
+    Arguments:-
+        paths: list of paths of the files to read
+        threads: number of reader threads
+        depth: max number of sources read ahead of the consumer
+    """
+    pending = Queue()
+    for path in paths:
+        pending.put(path)
+    done = Queue(depth)
+    stopped = threading.Event()
+
+    def put(item):
+        #a consumer that stops early would leave the reader blocked on a full queue
+        while not stopped.is_set():
+            try:
+                done.put(item, True, PUT_TIMEOUT)
+                return
+            except Full:
+                continue
+
+    def reader():
+        while not stopped.is_set():
+            try:
+                path = pending.get_nowait()
+            except Empty:
+                break
+            try:
+                put((path, read_source(path), None))
+            except (IOError, OSError) as error:
+                put((path, None, "{}: {}".format(error.__class__.__name__, error)))
+        put(_DONE)
+
+    readers = [threading.Thread(target=reader) for _ in range(max(1, min(threads, len(paths))))]
+    for thread in readers:
+        thread.daemon = True
+        thread.start()
+
+    try:
+        finished = 0
+        while finished < len(readers):
+            item = done.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            yield item
+    finally:
+        #the consumer may have stopped early; stop the readers, then unblock and wait for them
+        stopped.set()
+        while any(thread.is_alive() for thread in readers):
+            try:
+                done.get(True, PUT_TIMEOUT)
+            except Empty:
+                pass
+        for thread in readers:
+            thread.join()
@@ -0,0 +1,186 @@
+"""
+This module analyzes all the modules under a directory (or package) root,
+farming the per module analysis out to a pool of worker processes.
+"""
+import os
+import multiprocessing
+
+import stats
+from analyze import analyze_module
+from graph import DependencyGraph
+from pipeline import prefetch
+
+#Number of modules a worker process analyzes before it is replaced;
+#this caps the memory held by any single worker
+MAX_TASKS_PER_CHILD = 200
+
+
+def discover_modules(root):
+    """
+    Returns sorted list of paths of all python modules under `root`.
+    Hidden directories, e.g. .git, are skipped.
+    """
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        #prune hidden directories in place, so os.walk skips them
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+        for filename in filenames:
+            if filename.endswith(".py"):
+                paths.append(os.path.join(dirpath, filename))
+    return sorted(paths)
+
+def module_name(root, path):
+    """
+    Returns the dotted name of the module at `path`.
+    If `root` is itself a package, its name is the first component,
+    e.g. root=src/pkg, path=src/pkg/sub/mod.py gives pkg.sub.mod
+    """
+    root = os.path.abspath(root)
+    if os.path.isfile(os.path.join(root, "__init__.py")):
+        base = os.path.dirname(root)
+    else:
+        base = root
+
+    relpath = os.path.relpath(os.path.abspath(path), base)
+    parts = relpath[:-3].split(os.sep)
+    if parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+def analyze_worker(task):
+    """
+    Analyzes a single module; this is the unit of work run in a worker process.
+    Arguments:-
+        task: 5-tuple of (path, module name, cache, whether to collect stats,
+            source, or None if the worker reads it)
+    Returns 5-tuple of (path, module name, results, error, stats)
+    where results is the (symbol table, dependency table) pair, or None on error,
+    and stats is the state of the Stats of analyzing the module, or None
+    """
+    path, name, cache, collect, source = task
+    #the stats of each module are collected separately, and merged by the parent,
+    #since a worker process may have inherited the parent's stats
+    previous = stats.current
+    if collect:
+        stats.enable()
+    else:
+        stats.disable()
+
+    try:
+        result, error = analyze_module(path, module_name=name, cache=cache, source=source), None
+    except Exception as exc:
+        #e.g. a SyntaxError in the module; one bad module shouldn't fail the run
+        result, error = None, "{}: {}".format(exc.__class__.__name__, exc)
+
+    state = stats.current.state() if collect else None
+    stats.current = previous
+    return path, name, result, error, state
+
+def iter_results(root, processes=None, cache=None, maxtasksperchild=MAX_TASKS_PER_CHILD, paths=None):
+    """
+    Analyzes all modules under `root`, yielding the results of each as
+    soon as they are available, i.e. not necessarily in order.
+    Arguments are as for analyze_project, and
+        paths: if passed, only the modules at these paths are analyzed
+
+    Yields 4-tuples of (path, module name, results, error), as returned by analyze_worker;
+    the stats of the workers are merged into the stats of this process
+
+    In this process, the sources are prefetched by a pool of threads, so reading
+    overlaps with the analysis. Worker processes read their own modules, so the
+    sources aren't sent to them, and their reads overlap with the other workers' analysis.
+    """
+    collect = stats.current is not None
+    if paths is None:
+        paths = discover_modules(root)
+    processes = processes or multiprocessing.cpu_count()
+    read_errors = []
+
+    if processes == 1:
+        prefetched = prefetch(paths)
+        def iter_tasks():
+            for path, source, error in prefetched:
+                if error:
+                    read_errors.append((path, error))
+                    continue
+                yield path, module_name(root, path), cache, collect, source
+        results = (analyze_worker(task) for task in iter_tasks())
+        pool = None
+    else:
+        prefetched = None
+        tasks = [(path, module_name(root, path), cache, collect, None) for path in paths]
+        pool = multiprocessing.Pool(processes=processes, maxtasksperchild=maxtasksperchild)
+        #a few chunks per worker amortizes the IPC, while still balancing the load
+        chunksize = max(1, len(tasks) // (processes * 4))
+        results = pool.imap_unordered(analyze_worker, tasks, chunksize)
+
+    completed = False
+    try:
+        for path, name, result, error, state in results:
+            if state:
+                stats.current.merge(state)
+            yield path, name, result, error
+        for path, error in read_errors:
+            yield path, module_name(root, path), None, error
+        completed = True
+    finally:
+        if prefetched is not None:
+            #stops the readers if the consumer stopped early
+            prefetched.close()
+        if pool:
+            if completed:
+                pool.close()
+            else:
+                #the consumer stopped early, or failed; the remaining modules aren't waited for
+                pool.terminate()
+            pool.join()
+
+def analyze_project(root, processes=None, cache=None, maxtasksperchild=MAX_TASKS_PER_CHILD, lines=False):
+    """
+    Analyzes all modules under `root` and merges their results.
+
+    Arguments:-
+        root: the directory or package root
+        processes: number of worker processes; defaults to number of cores.
+            With a single process, modules are analyzed in this process.
+        cache: a ModuleCache shared by the workers
+        maxtasksperchild: number of modules a worker analyzes before it is recycled
+        lines: if True, the graph keeps the line number of each edge
+
+    Returns 2-tuple of (DependencyGraph, dict of path -> error message)
+    """
+    graph = DependencyGraph(lines=lines)
+    errors = {}
+
+    for path, name, result, error in iter_results(root, processes, cache, maxtasksperchild):
+        if error:
+            errors[path] = error
+        else:
+            _, dependency_table = result
+            graph.add_module(name, path, dependency_table)
+
+    if cache:
+        cache.prune()
+
+    return graph, errors
+
+def iter_project_dependencies(root, processes=None, cache=None, errors=None,
+                              maxtasksperchild=MAX_TASKS_PER_CHILD):
+    """
+    Analyzes all modules under `root`, yielding their dependencies as each
+    module is analyzed, as (module name, src, dest, lineno) 4-tuples.
+    The results are not merged, so only a single module's results are held at a time.
+
+    Arguments are as for analyze_project, and
+        errors: if passed, a dict that the error message of each module
+            that couldn't be analyzed is added to, by path
+    """
+    for path, name, result, error in iter_results(root, processes, cache, maxtasksperchild):
+        if error:
+            if errors is not None:
+                errors[path] = error
+            continue
+
+        _, dependency_table = result
+        for src, dest, lineno in dependency_table.rows():
+            yield name, src, dest, lineno
@@ -0,0 +1,175 @@
+"""
+This module maps dotted module names to their files, e.g. pkg.mod to
+<root>/pkg/mod.py, without probing the file system for every import.
+
+Each directory that is searched is listed once, and its modules, packages
+and namespace packages (directories without an __init__.py) are indexed by
+name, so resolving a name is a dict lookup per component. A listing is
+kept until the mtime of its directory changes, which is checked by refresh.
+"""
+import os
+import sys
+
+#Kinds of the entries of a directory
+MODULE, PACKAGE, NAMESPACE = "module", "package", "namespace"
+
+
+def list_directory(directory):
+    """
+    Returns dict mapping the name of each module in `directory` to
+    its (kind, path), where the path of a package is its __init__.py
+    and the path of a namespace package is its directory
+    """
+    try:
+        filenames = os.listdir(directory)
+    except OSError:
+        return {}
+
+    entries = {}
+    for filename in filenames:
+        path = os.path.join(directory, filename)
+        if filename.endswith(".py"):
+            name = filename[:-3]
+            #as in CPython, a package takes precedence over a module of the
+            #same name, which takes precedence over a namespace package
+            if entries.get(name, (None,))[0] != PACKAGE:
+                entries[name] = (MODULE, path)
+        elif '.' not in filename and os.path.isdir(path):
+            init = os.path.join(path, "__init__.py")
+            if os.path.isfile(init):
+                entries[filename] = (PACKAGE, init)
+            elif filename not in entries:
+                entries[filename] = (NAMESPACE, path)
+    return entries
+
+def directory_mtime(directory):
+    "Returns the mtime of `directory`, or None if it doesn't exist"
+    try:
+        return os.stat(directory).st_mtime
+    except OSError:
+        return None
+
+
+class ModuleResolver(object):
+    """
+    Resolves dotted module names against a list of roots, i.e. directories
+    searched in order, as sys.path is.
+
+    Listings are shared by all roots, so a directory is listed once however
+    many roots, or importers, reach it; resolved names are memoized per roots.
+    """
+    def __init__(self, roots=None):
+        """
+        Arguments:-
+            roots: the directories searched; sys.path if None
+        """
+        self.roots = self.normalize(sys.path if roots is None else roots)
+        #directory -> (mtime, dict of name -> (kind, path))
+        self.listings = {}
+        #(roots, dotted name) -> path of its source, or None
+        self.memo = {}
+
+    def normalize(self, roots):
+        "Returns tuple of the absolute paths of the directories `roots`"
+        return tuple(os.path.abspath(root or os.curdir) for root in roots)
+
+    def listing(self, directory):
+        "Returns dict of name -> (kind, path) of the modules in `directory`"
+        entry = self.listings.get(directory)
+        if entry is None:
+            entry = self.listings[directory] = (directory_mtime(directory), list_directory(directory))
+        return entry[1]
+
+    def find_spec(self, name, roots=None):
+        """
+        Returns 2-tuple of (kind, list of paths) of module `name`, or None if it can't be found.
+        The paths of a namespace package are the directories of its portions,
+        which may be in several roots; otherwise there is a single path.
+
+        Arguments:-
+            name: dotted module name
+            roots: the directories searched; self.roots if None
+        """
+        dirs = self.roots if roots is None else self.normalize(roots)
+        spec = None
+        for component in name.split('.'):
+            portions = []
+            spec = None
+            for directory in dirs:
+                entry = self.listing(directory).get(component)
+                if entry is None:
+                    continue
+                kind, path = entry
+                if kind == NAMESPACE:
+                    #a regular module or package in a later directory takes precedence
+                    portions.append(path)
+                    continue
+                spec = (kind, [path])
+                break
+
+            if spec is None:
+                if not portions:
+                    return None
+                spec = (NAMESPACE, portions)
+
+            kind, paths = spec
+            if kind == MODULE:
+                dirs = ()
+            elif kind == PACKAGE:
+                dirs = (os.path.dirname(paths[0]),)
+            else:
+                dirs = tuple(paths)
+        return spec
+
+    def find(self, name, roots=None):
+        """
+        Returns path of the source of module `name`, i.e. its .py or __init__.py,
+        or None if it can't be found or has no source, e.g. a namespace package.
+        An empty `name` refers to the package in the first of the roots.
+        Arguments are as for find_spec.
+        """
+        dirs = self.roots if roots is None else self.normalize(roots)
+        key = (dirs, name)
+        if key in self.memo:
+            return self.memo[key]
+
+        if not name:
+            path = os.path.join(dirs[0], "__init__.py") if dirs else None
+            if path is not None and not os.path.isfile(path):
+                path = None
+        else:
+            spec = self.find_spec(name, dirs)
+            path = spec[1][0] if spec and spec[0] != NAMESPACE else None
+        self.memo[key] = path
+        return path
+
+    def locate(self, name, roots=None):
+        """
+        Returns 2-tuple of (module name, path) of the longest prefix of dotted `name`
+        that is a module with a source, or (None, None). Arguments are as for find_spec.
+        """
+        parts = name.split('.')
+        for end in xrange(len(parts), 0, -1):
+            prefix = '.'.join(parts[:end])
+            path = self.find(prefix, roots)
+            if path is not None:
+                return prefix, path
+        return None, None
+
+    def refresh(self):
+        """
+        Drops the listings of the directories that were modified since they
+        were listed, and the memoized names if any were.
+        Returns the number of stale listings.
+        """
+        stale = [directory for directory, (mtime, _) in self.listings.iteritems()
+                 if directory_mtime(directory) != mtime]
+        for directory in stale:
+            del self.listings[directory]
+        if stale:
+            self.memo = {}
+        return len(stale)
+
+
+#The resolver shared by the analysis in this process
+default = ModuleResolver()
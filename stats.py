@@ -0,0 +1,101 @@
+"""
+This module implements the instrumentation of the analyzer, i.e.
+the wall time of each phase, and counters, e.g. of nodes visited.
+
+Instrumentation is disabled unless `enable` is called. Instrumented
+code checks `current` once, e.g. per module rather than per node, so
+when it is disabled the cost is a global lookup.
+"""
+import json
+import time
+from contextlib import contextmanager
+
+#The Stats of this process, or None if instrumentation is disabled
+current = None
+
+
+class Stats(object):
+    """
+    The counters and the wall time of each phase of a run
+    """
+    def __init__(self):
+        #counter name -> count
+        self.counters = {}
+        #phase name -> seconds
+        self.seconds = {}
+
+    def count(self, name, value=1):
+        "Adds `value` to counter `name`"
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def add_time(self, phase, seconds):
+        "Adds `seconds` to the wall time of `phase`"
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+
+    def state(self):
+        "Returns the counters and times as a dict, e.g. to send it from a worker process"
+        return {"counters": self.counters, "seconds": self.seconds}
+
+    def merge(self, state):
+        "Adds the counters and times of `state`, as returned by `state`"
+        for name, value in state["counters"].iteritems():
+            self.count(name, value)
+        for phase, seconds in state["seconds"].iteritems():
+            self.add_time(phase, seconds)
+
+    def report(self, fmt="human"):
+        """
+        Returns the stats as a string, either a human readable summary or JSON
+        Arguments:-
+            fmt: "human" or "json"
+        """
+        if fmt == "json":
+            return json.dumps(self.state(), indent=2, sort_keys=True)
+
+        lines = ["Phase                    seconds"]
+        for phase, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            lines.append("{:<24} {:>8.3f}".format(phase, seconds))
+        lines.append("Counter                    count")
+        for name, value in sorted(self.counters.items()):
+            lines.append("{:<24} {:>8}".format(name, value))
+
+        lookups = self.counters.get("lookups")
+        if lookups:
+            lines.append("{:<24} {:>8.2f}".format("candidates per lookup",
+                                                  self.counters.get("candidates", 0) / float(lookups)))
+        return "\n".join(lines)
+
+
+def enable():
+    """
+    Enables instrumentation in this process, and returns its Stats
+    """
+    global current
+    current = Stats()
+    return current
+
+def disable():
+    "Disables instrumentation in this process"
+    global current
+    current = None
+
+def count(name, value=1):
+    "Adds `value` to counter `name`, if instrumentation is enabled"
+    if current is not None:
+        current.count(name, value)
+
+@contextmanager
+def timer(phase):
+    """
+    Context manager that adds the wall time of its body to
+    `phase`, if instrumentation is enabled
+    """
+    if current is None:
+        yield
+        return
+
+    start = time.time()
+    try:
+        yield
+    finally:
+        current.add_time(phase, time.time() - start)
@@ -0,0 +1,225 @@
+"""
+This module implements a persistent store of analysis results in an
+SQLite database, i.e. the modules, their symbols and their edges.
+
+A module's rows are replaced as a unit when it is re-analyzed, so the
+store can be kept up to date incrementally, and queries are served from
+indexes rather than by loading the whole graph.
+"""
+import sqlite3
+
+import consts
+
+#First bytes of an SQLite database file
+MAGIC = "SQLite format 3\0"
+
+#Number of modules written per transaction
+BATCH_SIZE = 64
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS modules (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL,
+    path TEXT NOT NULL,
+    mtime REAL,
+    size INTEGER
+);
+CREATE INDEX IF NOT EXISTS modules_path ON modules (path);
+CREATE TABLE IF NOT EXISTS symbols (
+    module_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    lineno INTEGER,
+    lineno_end INTEGER,
+    scope TEXT,
+    src_module TEXT,
+    src_name TEXT
+);
+CREATE INDEX IF NOT EXISTS symbols_module ON symbols (module_id);
+CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name);
+CREATE TABLE IF NOT EXISTS edges (
+    module_id INTEGER NOT NULL,
+    src TEXT NOT NULL,
+    dest TEXT NOT NULL,
+    lineno INTEGER
+);
+CREATE INDEX IF NOT EXISTS edges_module ON edges (module_id);
+CREATE INDEX IF NOT EXISTS edges_src ON edges (src);
+CREATE INDEX IF NOT EXISTS edges_dest ON edges (dest);
+"""
+
+#The names reachable from a name, following edges from `near` to `far`;
+#without a depth, UNION drops names already reached, so cycles terminate
+REACHABLE = """
+WITH RECURSIVE reach(name) AS (
+    SELECT ?
+    UNION
+    SELECT edges.{far} FROM edges JOIN reach ON edges.{near} = reach.name
+)
+SELECT name FROM reach
+"""
+
+REACHABLE_DEPTH = """
+WITH RECURSIVE reach(name, depth) AS (
+    SELECT ?, 0
+    UNION
+    SELECT edges.{far}, reach.depth + 1 FROM edges JOIN reach ON edges.{near} = reach.name
+    WHERE reach.depth < ?
+)
+SELECT DISTINCT name FROM reach
+"""
+
+
+def is_store_file(path):
+    "Returns True if the file at `path` is an SQLite database"
+    try:
+        with open(path, "rb") as fileptr:
+            return fileptr.read(len(MAGIC)) == MAGIC
+    except (IOError, OSError):
+        return False
+
+
+class DependencyStore(object):
+    """
+    An SQLite database of analysis results.
+
+    The database is tagged with the analyzer version; results
+    of another version are discarded when it is opened.
+    """
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        #names are str elsewhere, not unicode
+        self.connection.text_factory = str
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            row = self.connection.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+            if row is None or row[0] != consts.ANALYZER_VERSION:
+                for table in ("modules", "symbols", "edges"):
+                    self.connection.execute("DELETE FROM " + table)
+                self.connection.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)",
+                                        (consts.ANALYZER_VERSION,))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self.connection.close()
+
+    def stamps(self):
+        "Returns dict mapping the path of each stored module to its (mtime, size) stamp"
+        return dict((path, (mtime, size)) for path, mtime, size
+                    in self.connection.execute("SELECT path, mtime, size FROM modules"))
+
+    def module_names(self, paths):
+        "Returns dict mapping each of `paths` that is stored to the name of its module"
+        names = {}
+        for path in paths:
+            row = self.connection.execute("SELECT name FROM modules WHERE path = ?", (path,)).fetchone()
+            if row:
+                names[path] = row[0]
+        return names
+
+    def importers(self, name):
+        """
+        Returns dict mapping path to name of the other modules with edges
+        into module `name`, i.e. to it or to any name under it
+        """
+        #the dests under name are the range [name., name/), since '/' follows '.'
+        rows = self.connection.execute(
+            "SELECT DISTINCT modules.path, modules.name FROM edges JOIN modules ON edges.module_id = modules.id"
+            " WHERE (edges.dest = ? OR (edges.dest >= ? AND edges.dest < ?)) AND modules.name != ?",
+            (name, name + ".", name + "/", name))
+        return dict(rows)
+
+    def delete(self, name):
+        "Deletes the rows of module `name`; the caller commits"
+        row = self.connection.execute("SELECT id FROM modules WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return
+        for table in ("symbols", "edges"):
+            self.connection.execute("DELETE FROM {} WHERE module_id = ?".format(table), row)
+        self.connection.execute("DELETE FROM modules WHERE id = ?", row)
+
+    def remove_modules(self, names):
+        "Deletes the rows of the modules `names`, in a single transaction"
+        with self.connection:
+            for name in names:
+                self.delete(name)
+
+    def put_modules(self, results):
+        """
+        Replaces the rows of each module in `results`, committing every BATCH_SIZE modules.
+        Returns the number of modules written.
+
+        Arguments:-
+            results: iterable of (module name, path, (mtime, size) stamp,
+                symbol table, dependency table) 5-tuples
+        """
+        count = 0
+        cursor = self.connection.cursor()
+        for name, path, stamp, symbol_table, dependency_table in results:
+            self.delete(name)
+            mtime, size = stamp or (None, None)
+            cursor.execute("INSERT INTO modules (name, path, mtime, size) VALUES (?, ?, ?, ?)",
+                           (name, path, mtime, size))
+            module_id = cursor.lastrowid
+
+            to_str = symbol_table.names.to_str
+            cursor.executemany("INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?)",
+                               ((module_id, symbol, scope.lineno, scope.lineno_end, to_str(scope.scopes),
+                                 scope.src_module, scope.src_name)
+                                for symbol, scopes in symbol_table.iteritems() for scope in scopes))
+            cursor.executemany("INSERT INTO edges VALUES (?, ?, ?, ?)",
+                               ((module_id, src, dest, lineno) for src, dest, lineno in dependency_table.rows()))
+
+            count += 1
+            if count % BATCH_SIZE == 0:
+                self.connection.commit()
+        self.connection.commit()
+        return count
+
+    def put_module(self, name, path, stamp, symbol_table, dependency_table):
+        "Replaces the rows of module `name`; see put_modules"
+        self.put_modules([(name, path, stamp, symbol_table, dependency_table)])
+
+    def dependencies(self, name):
+        "Returns list of (dest, lineno) of the edges from dotted name `name`"
+        return self.connection.execute("SELECT dest, lineno FROM edges WHERE src = ?", (name,)).fetchall()
+
+    def dependents(self, name):
+        "Returns list of (src, lineno) of the edges into dotted name `name`"
+        return self.connection.execute("SELECT src, lineno FROM edges WHERE dest = ?", (name,)).fetchall()
+
+    def symbols_in_file(self, path):
+        """
+        Returns list of (name, lineno, lineno_end, scope) of the symbols
+        defined in the module at `path`, in line order
+        """
+        return self.connection.execute(
+            "SELECT symbols.name, lineno, lineno_end, scope FROM symbols"
+            " JOIN modules ON symbols.module_id = modules.id WHERE modules.path = ?"
+            " ORDER BY lineno, symbols.name", (path,)).fetchall()
+
+    def transitive_dependents(self, name, depth=None):
+        "Returns frozenset of the names that depend on `name`; as DependencyGraph.transitive_dependents"
+        return self.transitive("dest", "src", name, depth)
+
+    def transitive_dependencies(self, name, depth=None):
+        "Returns frozenset of the names `name` depends on; as DependencyGraph.transitive_dependencies"
+        return self.transitive("src", "dest", name, depth)
+
+    def transitive(self, near, far, name, depth=None):
+        """
+        Returns frozenset of the names reachable from `name`, excluding itself,
+        by following at most `depth` edges from their `near` to their `far` column
+        """
+        if depth is None:
+            rows = self.connection.execute(REACHABLE.format(near=near, far=far), (name,))
+        else:
+            rows = self.connection.execute(REACHABLE_DEPTH.format(near=near, far=far), (name, depth))
+        return frozenset(row[0] for row in rows) - frozenset([name])
@@ -1,11 +1,22 @@
 """
 Rewrite of analyze.py
+
+Run as `python -m take3.analyze` from the root of the repo; exports and
+stats are shared with the top-level analyzer.
 """
+from __future__ import absolute_import
 import ast
+import os
 import pdb
-from utils import get_module, node_type, pretty_print, unique_id, nodes_to_str
-from collections import namedtuple 
-import importlib
+from array import array
+from itertools import izip
+from bisect import bisect_right
+from .utils import get_module, node_type, pretty_print, unique_id, nodes_to_str
+from collections import namedtuple, deque
+import sys
+from exports import star_import_names
+import stats
+from .export import export as export_deptree
 
 ##################################################
 ############# Datastructures #####################
@@ -72,34 +83,144 @@ class Stack(list):
             return self.pop()
 
 
-class Vertex(object):
+class NodeInfo(object):
+    """
+    The metadata of an ast node, collected while analyzing it.
+    """
+    __slots__ = ("lineno", "lineno_end", "srcmodule", "is_src", "globals", "assignments")
+
+    def __init__(self):
+        self.lineno = None
+        self.lineno_end = None
+        self.srcmodule = None
+        self.is_src = False
+        #these are only used on scoping nodes, and are created lazily
+        self.globals = None
+        self.assignments = None
+
+class NodeTable(dict):
+    """
+    Maps ast nodes to their NodeInfo. This is owned by the analysis,
+    rather than setting attributes on the nodes themselves. 
+    Only nodes with metadata have an entry.
+    NOTE: nodes are keyed by id, which is only unique while the node is alive;
+    the nodes with metadata are all referenced by the symbol table.
     """
-    A node in a graph. Has two kinds of successor nodes, 
-    children and dependencies. 
+    def info(self, node):
+        "Returns the NodeInfo of `node`, creating it if needed"
+        key = id(node)
+        if key not in self:
+            super(NodeTable, self).__setitem__(key, NodeInfo())
+        return self[key]
+
+    def get_info(self, node):
+        "Returns the NodeInfo of `node`, or None if it has no metadata"
+        return self.get(id(node))
+
+class Scope(object):
     """
-    def __init__(self, value, parent=None):
-        self.value = value
-        self.parent = parent #this is the scope wise parent
-        self.children = {} 
-        self.dependencies = {}
+    A vertex of the lexical scope tree, i.e. of a Module, ClassDef or FunctionDef,
+    with a hash of its local bindings. A name can be bound many times in
+    a scope; its bindings are kept in order of lineno.
+    """
+    __slots__ = ("node", "parent", "is_class", "bindings")
+
+    def __init__(self, node, parent=None):
+        self.node = node
+        self.parent = parent
+        self.is_class = node.__class__ is ast.ClassDef
+        #name -> 2-tuple of (sorted list of linenos, list of scopemaps in the same order)
+        self.bindings = {}
+
+    def bind(self, name, entry):
+        "Adds the binding of `name`, described by scopemap `entry`"
+        if name not in self.bindings:
+            self.bindings[name] = ([entry.lineno], [entry])
+            return
+        linenos, entries = self.bindings[name]
+        #bindings are mostly added in order, so this is usually an append
+        i = bisect_right(linenos, entry.lineno)
+        linenos.insert(i, entry.lineno)
+        entries.insert(i, entry)
+
+    def find(self, name, lineno):
+        """
+        Returns the scopemap of the binding of `name` in effect at `lineno`, i.e. the last
+        one on or before it, or None if name isn't bound in this scope.
+        If name is only bound after lineno, e.g. a function calling one
+        defined below it, the first binding is returned.
+        """
+        binding = self.bindings.get(name)
+        if binding is None:
+            return None
+        linenos, entries = binding
+        return entries[max(bisect_right(linenos, lineno) - 1, 0)]
 
-    def __repr__(self):
-        return str(self.value)
+class SymbolTable(Multidict):
+    """
+    The symbol table, along with the NodeTable of the analyzed nodes,
+    and the tree of lexical scopes that names are resolved in
+    """
+    def __init__(self, *args, **kw):
+        super(SymbolTable, self).__init__(*args, **kw)
+        self.nodes = NodeTable()
+        #scoping node id -> Scope
+        #the Scope references its node, so the id isn't reused
+        self.scopes = {}
+
+    def __setitem__(self, key, value):
+        super(SymbolTable, self).__setitem__(key, value)
+        self.scopes[id(value.scope[-1])].bind(key, value)
 
-    #TODO: remove the following since sets suck
-    def __eq__(self, other):
+    def add_scope(self, node, parent=None):
+        "Adds the Scope of scoping node `node`, nested in scoping node `parent`"
+        parent = self.scopes[id(parent)] if parent is not None else None
+        self.scopes[id(node)] = Scope(node, parent)
+
+    def lookup(self, name, current, lineno):
         """
-        Two vertices are the same if their values are the same.
-        NOTE: __eq__, and __hash__ overidden so two objects get hashed to the same value
+        Returns the scopemap of the binding `name` refers to, when loaded at `lineno`
+        within the scopes `current`, or None if it is unbound, e.g. a builtin.
+        The innermost scope is searched first, and then its parents; as in python,
+        the bindings of an enclosing class aren't visible from within its methods.
         """
-        if isinstance(other, str):
-            return self.value == other
-        else: 
-            return self.value == other.value
+        scope = start = self.scopes[id(current[-1])]
+        examined = 0
+        entry = None
+        while scope is not None:
+            if scope is start or not scope.is_class:
+                examined += 1
+                entry = scope.find(name, lineno)
+                if entry is not None:
+                    break
+            scope = scope.parent
+
+        if stats.current is not None:
+            stats.current.count("lookups")
+            stats.current.count("candidates", examined)
+        return entry
+
+def build_csr(keys, targets, size):
+    """
+    Returns a CSR (compressed sparse row) index of `targets` grouped by `keys`,
+    as 2-tuple of arrays (offsets, items), where the targets of key k
+    are items[offsets[k]:offsets[k+1]], in the order they occur.
+    Arguments:-
+        keys, targets: parallel sequences of ints
+        size: number of keys, i.e. all keys are < size
+    """
+    offsets = array('i', [0]) * (size + 1)
+    for key in keys:
+        offsets[key + 1] += 1
+    for k in xrange(size):
+        offsets[k + 1] += offsets[k]
 
-    def __hash__(self):
-        return hash(self.value)
-        
+    items = array('i', [0]) * len(targets)
+    position = offsets[:-1]
+    for key, target in izip(keys, targets):
+        items[position[key]] = target
+        position[key] += 1
+    return offsets, items
 
 
 class DTree(object):
@@ -109,23 +230,54 @@ class DTree(object):
     through a "depends-on" relationship. Basically, there are two kinds of edges
     ones that represent parent-child relationship, and ones that represent a
     dependency relationship.
+
+    The tree is stored flat, as a trie: each vertex is an int id (the root is ROOT),
+    and its value and parent are stored in arrays indexed by id. The dependencies
+    are arrays of (src, dst) vertex ids. The children and dependencies of
+    vertices are looked up through CSR indexes, which are built when first needed
     """
+    ROOT = 0
+
     def __init__(self): 
-        self.root = Vertex(None) 
+        #each distinct value is stored once; value -> id, and id -> value
+        self.value_ids = {None: 0}
+        self.value_list = [None]
+        #vertex id -> id of its value, and id of its parent
+        self.values = array('i', [0])
+        self.parents = array('i', [-1])
+        #(value id << 32 | parent id) -> vertex id
+        self.index = {}
+        #dependencies, as parallel arrays of vertex ids, in the order they are added
+        self.src = array('i')
+        self.dst = array('i')
+        #CSR indexes of children, dependencies and dependents, or None if stale
+        self.children_index = None
+        self.dependency_index = None
+        self.dependent_index = None
     
     def add_path(self, path):
         """
         Adds path to the DAG
         Args:- 
-            path: list of nodes
-        Returns last node in `path`
+            path: list of values
+        Returns id of the vertex of the last value in `path`
         """
-        current = self.root
-        for node in path:
-            if node not in current.children:
+        current = self.ROOT
+        for value in path:
+            value_id = self.value_ids.get(value)
+            if value_id is None:
+                value_id = self.value_ids[value] = len(self.value_list)
+                self.value_list.append(value)
+
+            key = value_id << 32 | current
+            vertex = self.index.get(key)
+            if vertex is None:
                 #Lazily build 
-                current.children[node] = Vertex(node, parent=current)
-            current = current.children[node]
+                vertex = self.index[key] = len(self.values)
+                self.values.append(value_id)
+                self.parents.append(current)
+                self.children_index = None
+            current = vertex
         return current
 
     def add_link(self, src=None, dst=None):
@@ -134,54 +286,131 @@ class DTree(object):
         These are lists of strings, indicating absolute
         paths starting at roots.
         """
-        print "adding link = {}->{}".format(src, dst)
         srcleaf = self.add_path(src)
         dstleaf = self.add_path(dst)
-        srcleaf.dependencies[str(dstleaf)] = dstleaf
+        self.src.append(srcleaf)
+        self.dst.append(dstleaf)
+        self.dependency_index = None
+        self.dependent_index = None
+
+    def value(self, vertex):
+        "Returns the value of `vertex`"
+        return self.value_list[self.values[vertex]]
+
+    def path(self, vertex):
+        "Returns list of values from the root to `vertex`, i.e. as passed to add_path"
+        path = []
+        while vertex != self.ROOT:
+            path.append(self.value(vertex))
+            vertex = self.parents[vertex]
+        return path[::-1]
+
+    def children(self, vertex):
+        "Returns the ids of the children of `vertex`, in the order they were added"
+        if self.children_index is None:
+            #the root has no parent, so it isn't a child
+            self.children_index = build_csr(self.parents[1:], xrange(1, len(self.parents)),
+                                            len(self.parents))
+        offsets, items = self.children_index
+        return items[offsets[vertex]:offsets[vertex + 1]]
+
+    def dependencies(self, vertex):
+        "Returns the ids of the vertices `vertex` depends on, in the order they were added"
+        if self.dependency_index is None:
+            #drop duplicate links, keeping the first occurrence
+            seen = set()
+            src, dst = array('i'), array('i')
+            for link in izip(self.src, self.dst):
+                if link not in seen:
+                    seen.add(link)
+                    src.append(link[0])
+                    dst.append(link[1])
+            self.src, self.dst = src, dst
+            self.dependency_index = build_csr(src, dst, len(self.values))
+        offsets, items = self.dependency_index
+        return items[offsets[vertex]:offsets[vertex + 1]]
+
+    def dependents(self, vertex):
+        "Returns the ids of the vertices that depend on `vertex`"
+        if self.dependent_index is None:
+            #the reverse of the (deduplicated) dependencies
+            links = list(self.links())
+            self.dependent_index = build_csr([dst for _, dst in links], [src for src, _ in links],
+                                             len(self.values))
+        offsets, items = self.dependent_index
+        return items[offsets[vertex]:offsets[vertex + 1]]
+
+    def links(self):
+        "Returns iterator over the (src, dst) vertex ids of the dependencies, without duplicates"
+        if self.dependency_index is None:
+            #building the index drops the duplicates
+            self.dependencies(self.ROOT)
+        return izip(self.src, self.dst)
+
+    def vertices(self):
+        """
+        Returns iterator over the ids of all vertices, excluding the root.
+        A vertex is only added after its parent, so parents come before their children.
+        """
+        return iter(xrange(1, len(self.values)))
+
+    def bfs(self, start=ROOT):
+        """
+        Yields (vertex id, depth) of each vertex under `start`, inclusive, in breadth first order
+        """
+        queue = deque([(start, 0)])
+        while queue:
+            vertex, depth = queue.popleft()
+            yield vertex, depth
+            for child in self.children(vertex):
+                queue.append((child, depth + 1))
+
+    def dfs(self, start=ROOT):
+        """
+        Yields (vertex id, depth) of each vertex under `start`, inclusive, in depth first
+        preorder; children are visited in the order they were added
+        """
+        stack = [(start, 0)]
+        while stack:
+            vertex, depth = stack.pop()
+            yield vertex, depth
+            children = self.children(vertex)
+            for i in xrange(len(children) - 1, -1, -1):
+                stack.append((children[i], depth + 1))
+
+    def __len__(self):
+        "Returns the number of vertices, excluding the root"
+        return len(self.values) - 1
 
     def write(self):
         """
-        This method is a wrapper around incrementally increasing
-        BFS calls.
+        Prints the values of the vertices, one depth at a time
         Used for debugging
         """
-        def get_nodes(node, depth):
-            """
-            This is a helper method that gets nodes at specified depth.
-
-            Arguments:-
-            node:- the starting node
-            depth:- the number of generations down from `node`
-            """
-            if depth == 0:
-                return [node.value]
-            else:
-                nodes = []
-                for child in node.children.values():
-                    nodes.extend(get_nodes(child, depth-1))
-                return nodes
-
-        depth = 0
-        while True:
-            nodes = get_nodes(self.root, depth)
-            if not nodes: break
-            print nodes
-            depth += 1
-
+        level, values = 0, []
+        for vertex, depth in self.bfs():
+            if depth != level:
+                print values
+                level, values = depth, []
+            values.append(self.value(vertex))
+        print values
 
 
 #scopemap = namedtuple('Scopemap', ['scope', 'astnode'])
 class scopemap(object):
-    def __init__(self, scope=None, astnode=None, alias=None):
+    def __init__(self, scope=None, astnode=None, alias=None, lineno=0):
         self.scope = scope
         self.astnode = astnode
         self.alias = alias
+        #line the binding occurs on
+        self.lineno = lineno
         
 ##################################################
 ######### Utilities (General) ####################
 ##################################################
 #Types that create a scope
-scoping_types = ["Module", "ClassDef", "FunctionDef"]
+scoping_types = frozenset([ast.Module, ast.ClassDef, ast.FunctionDef] +
+                          ([ast.AsyncFunctionDef] if hasattr(ast, "AsyncFunctionDef") else []))
 
 def create_and_raise(exception_name, exception_msg):
     """
@@ -220,51 +449,51 @@ def precatenated(element, lst):
 ################ Utilities #######################
 ##################################################
 
-def set_depth(node, depth):
-    """Set the depth of an AST node
+def set_globals(nodes, node, identifiers):
     """
-    setattr(node, "depth", depth)
-
-def set_globals(node, identifiers):
-    """
-    set list of identifiers as 'globals' on node
+    set list of identifiers as 'globals' of node
+    Arguments:-
+        nodes: the NodeTable
     """
-    if not hasattr(node, "globals"):
-        setattr(node, "globals", [])
-    node.globals.append(identifiers)
+    info = nodes.info(node)
+    if info.globals is None:
+        info.globals = []
+    info.globals.extend(identifiers)
 
-def has_global(node, identifier):
+def has_global(nodes, node, identifier):
     """
     check whether node has identfier in its globals list
     """
-    return hasattr(node, "globals") and name in node.globals
+    info = nodes.get_info(node)
+    return info is not None and info.globals is not None and identifier in info.globals
 
-def set_src(node, srcmodule):
+def set_src(nodes, node, srcmodule):
     """
     sets src module of ast `node`
     """
-    setattr(node, "srcmodule", srcmodule)
+    nodes.info(node).srcmodule = srcmodule
 
-def get_src(node):
+def get_src(nodes, node):
     """
-    Returns src module of node, None if attr not defined
+    Returns src module of node, None if not defined
     """
-    return hasattr(node, "srcmodule") and getattr(node, "srcmodule") or None
+    info = nodes.get_info(node)
+    return info and info.srcmodule or None
 
-def set_is_src(node):
+def set_is_src(nodes, node):
     """
     sets True to is_src property, indicating
     that this node represents the module itself, rather than a property.
     This is to avoid dependencies like pdb.pdb
     """
-    setattr(node, "is_src", True)
+    nodes.info(node).is_src = True
 
-def is_src(node):
+def is_src(nodes, node):
     """
-    Returns True if node has attr 'is_src', as is thereby 
-    implicitly set
+    Returns True if is_src property of node has been set
     """
-    return hasattr(node, "is_src") 
+    info = nodes.get_info(node)
+    return info is not None and info.is_src
     
 
 def is_load(children):
@@ -272,55 +501,49 @@ def is_load(children):
     Called on the children nodes of "Name" node.
     Determines if node is being loaded
     """
-    return children and node_type(children[0]) == "Load"
+    return children and children[0].__class__ is ast.Load
 
 def is_store(children):
-    return children and node_type(children[0]) == "Store"
+    return children and children[0].__class__ is ast.Store
 
-def set_assignment(node, key, value):
+def set_assignment(nodes, node, identifier, value):
     """
-    Creates `assignment` dictionary property on `node` 
-    and adds the key-value pair.
-    wraps key in frozen set to hash it
+    Adds `identifier` as an alias of `value` to the alias index of scope `node`,
+    i.e. a dict of identifier -> value.
+    If the head of `value` is itself an alias in the scope, it is replaced by what
+    it aliases, so chains of aliases, e.g. x = pdb; y = x, are resolved
+    once, when they are assigned, rather than on every lookup.
     Arguments:-
+        nodes: the NodeTable
         node: the ast node that represent the tail of the scopestack
-        key: the identifier being assigned, i.e. a list of nodes
-        value: the value being assigned to key
+        identifier: the name being assigned
+        value: the value being assigned, as a list of identifiers,
+            i.e. a name followed by its attributes, e.g. ["os", "path"]
     """
-    if not hasattr(node, "assignments"):
-        setattr(node, "assignments", {})
-    
-    node.assignments[frozenset(key)] = value 
+    info = nodes.info(node)
+    if info.assignments is None:
+        info.assignments = {}
 
-def get_assignment(node, key):
+    aliased = info.assignments.get(value[0])
+    if aliased is not None:
+        value = aliased + value[1:]
+    info.assignments[identifier] = value
+
+def get_assignment(nodes, node, identifier):
     """
-    Returns the value associated with key or a Falsey value if key does not exist.
+    Returns the value `identifier` is an alias of, as a list of identifiers,
+    or None if it isn't an alias.
     Arguments:- 
+        nodes: the NodeTable
         node: scoping tail node  
-        key: the key to search for, ie. list of ast nodes
-
-    NOTE: The current solution is somewhat inefficient.
-    The tail node of key is the identifier. Here we can't do a set comparison on the
-    whole list. Instead, we must compare the tail node based on the value.
-    This can be made more efficient by storing the tail node as its value in `set_assignment`
-    i.e.
-        val = node.assignments.get(frozenset(key))
-        if val: 
-            return list(val)
-    """
-    if hasattr(node, "assignments"):
-        key = frozenset(key)
-        for k, val in node.assignments.items():
-            diff = key.symmetric_difference(k)
-            if len(diff) == 2:
-                item1, item2 = diff
-                if unique_id(item1) == unique_id(item2): 
-                    return val
-            
-    return None 
-    
+        identifier: the name to look up
+    """
+    info = nodes.get_info(node)
+    if info is None or info.assignments is None:
+        return None
+    return info.assignments.get(identifier)
 
-def set_lineno(node, children):
+def set_lineno(nodes, node, children):
     """
     Sets lineno and lineno_end of all children of `node`.
     Assigns lineno_end of ith child as the
@@ -329,32 +552,34 @@ def set_lineno(node, children):
     Some AST nodes don't have a `lineno` property;
     in these cases sets it based on the following algorithm.
     """
+    info = nodes.info(node)
+    lineno = getattr(node, "lineno", info.lineno)
     for i, child in enumerate(children):
-        #if child does not have lineno, add it 
-        if not hasattr(child, "lineno"):
-            setattr(child, "lineno", node.lineno)
+        childinfo = nodes.info(child)
+        #if child does not have lineno, use node's
+        childinfo.lineno = getattr(child, "lineno", lineno)
 
         if i == len(children) - 1:
             #set child's lineno_end to node's lineno    
-            setattr(child, "lineno_end", node.lineno_end)
+            childinfo.lineno_end = info.lineno_end
         else:
-            sibling = children[i+1][0]
-            #if next sibling does not have lineno, add it
-            if not hasattr(sibling, "lineno"):
-                setattr(sibling, "lineno", node.lineno)
+            sibling = children[i+1]
+            sibling_lineno = getattr(sibling, "lineno", lineno)
 
             #set child's lineno_end to next sibling's lineno-1
             #unless that would make it less than child's lineno
-            setattr(child, "lineno_end", max(child.lineno, sibling.lineno - 1))
+            childinfo.lineno_end = max(childinfo.lineno, sibling_lineno - 1)
 
-def ast_name_node(**props):
+def ast_name_node(nodes, srcmodule=None, **props):
     """
     creates a name ast node with the property names and values
-    as specified in `props`
+    as specified in `props`, and src module `srcmodule`
     """
     node = ast.Name()
     for name, value in props.items():
         setattr(node, name, value)
+    if srcmodule:
+        set_src(nodes, node, srcmodule)
     return node
 
 def print_symtable(symtable):
@@ -373,46 +598,6 @@ def print_deptree(deptree):
     deptree.write() 
     print "*******************************************************"
 
-def resolve_scope(match, candidates):
-    """
-    Returns the candidate in `candidates` that matches `match`.
-    NOTE: candidate is an instance of scopemap
-    The algorithm is this:
-        -prune any invalid candidates, i.e. candidate must be a subset of match 
-        -if there are multiple left, then check lineno.
-        -else return sole candidate
-
-    e.g. #here we would need lineno check to resolve foo
-
-    def foo():
-        pdb.set_trace()
-    x = foo()
-    def foo():
-        return 11    
-
-    """
-    resolved = []
-    for candidate in candidates:
-        #zip iterates over min-length
-        #FIXME: Can match be smaller than candidate.scope?
-        #Consider the following case:
-        """
-        import pdb
-        def foo():
-            x = pdb
-            x.set_trace()
-        """
-        for scpnode, mtchnode in zip(candidate.scope, match):
-            if scpnode != mtchnode:
-                break
-        else:
-            resolved.append(candidate)
-
-    if len(resolved) == 1:
-        return resolved[0]
-    else: 
-        create_and_raise("UnableToResolveException", "Unabled to resolve, setup the lineno tracking")
-            
 def get_children(node):
     """
     Returns list of children of ast `node`
@@ -445,38 +630,58 @@ def resolve_attr_chain(node):
     return chain[::-1]
 
 
+def dst_path(dependency, chain, symtable):
+    """
+    Returns the path of the dependency on `chain`, i.e. a name followed by its
+    attributes, given the resolved scopemap `dependency` of the name
+    """
+    srcmodule = get_src(symtable.nodes, dependency.astnode)
+    if srcmodule and is_src(symtable.nodes, dependency.astnode):
+        #if node itself represents the module, then don't prepend module name    
+        return chain
+    elif srcmodule:
+        #dependency originates from another module
+        return precatenated(srcmodule, chain)
+    else:
+        #dependency is intra-module
+        return dependency.scope + chain
+
+def resolve_alias(alias, current, lineno, symtable):
+    """
+    Returns the path of the dependency on `alias`, i.e. the value of an
+    assignment, as a list of identifiers, loaded at `lineno` within the scopes
+    `current`, or None if it can't be resolved
+    """
+    dependency = symtable.lookup(alias[0], current, lineno)
+    if dependency is None:
+        return None
+    #the head is replaced by the node it resolves to, e.g. the import of the module
+    return dst_path(dependency, [dependency.astnode] + alias[1:], symtable)
+
 def process_name_node(node, scopestack, symtable):
     """
-    Processes Name astnode and returns `src` and `dst` dependency pair
+    Processes Name astnode and returns `src` and `dst` dependency pair,
+    or None if the name is unbound, e.g. a builtin
     """
     #there is a dependency from scope -> name 
     #we know a symbol was loaded, but since identifiers are non-unique, 
     #we must look up node in symtable and then resolve based on scopes
     current = scopestack.get_state()
-    candidates = symtable[unique_id(node)]
     
     #first check scopetail for existing assignment
-    key = concatenated(scopestack.get_state(), node) 
-    assn = get_assignment(scopestack.get_tail(), key)
-    if assn: 
-        return current, assn
-
-    dependency = resolve_scope(current, candidates)
-
-    srcmodule = get_src(dependency.astnode)
-    if srcmodule and is_src(dependency.astnode):
-        #if node itself represents the module, then don't prepend module name    
-        dst = [node]
-    elif srcmodule:
-        dst = [srcmodule, node]
+    alias = get_assignment(symtable.nodes, scopestack.get_tail(), unique_id(node))
+    if alias: 
+        dst = resolve_alias(alias, current, node.lineno, symtable)
     else:
-        dst = concatenated(dependency.scope, node)
+        dependency = symtable.lookup(unique_id(node), current, node.lineno)
+        dst = dependency and dst_path(dependency, [node], symtable)
 
-    return current, dst
+    return (current, dst) if dst else None
 
 def process_attribute_node(node, scopestack, symtable):
     """
-    Processes Attribute astnode and returns `src` and `dst` dependency pair
+    Processes Attribute astnode and returns `src` and `dst` dependency pair,
+    or None if the head of the attribute chain is unbound
     """
     #get the current scope
     current = scopestack.get_state()  
@@ -484,33 +689,17 @@ def process_attribute_node(node, scopestack, symtable):
     #therefore need to resolve it
     attr_chain = resolve_attr_chain(node)
 
-    #assignments are stored as: scope + identifier
-    key = concatenated(scopestack.get_state(), attr_chain[0])
-    assn = get_assignment(scopestack.get_tail(), key)
-    if assn: 
-        candidates = symtable[assn]  
+    #check scopetail for an assignment to the head of the chain
+    alias = get_assignment(symtable.nodes, scopestack.get_tail(), unique_id(attr_chain[0]))
+    if alias: 
+        dst = resolve_alias(alias + attr_chain[1:], current, node.lineno, symtable)
     else:
         #resolve the node based on the current scope
         #only the head of the attr chain needs to be defined
-        candidates = symtable[unique_id(attr_chain[0])]  
+        dependency = symtable.lookup(unique_id(attr_chain[0]), current, node.lineno)
+        dst = dependency and dst_path(dependency, attr_chain, symtable)
 
-    dependency = resolve_scope(current, candidates)
-
-    if assn:
-        #need to resolve the alias    
-        attr_chain[0] = dependency.astnode
-    
-    srcmodule = get_src(dependency.astnode)
-    if srcmodule and is_src(dependency.astnode):
-        dst = attr_chain    
-    elif srcmodule: 
-        #dependency originates from another module
-        dst = precatenated(srcmodule, attr_chain)
-    else:
-        #dependency is intra-module
-        dst = dependency.scope + attr_chain
-
-    return current, dst 
+    return (current, dst) if dst else None
 
 
 
@@ -518,191 +707,257 @@ def process_attribute_node(node, scopestack, symtable):
 ################    Main   #######################
 ##################################################
 
-def create_symbol_table(root):
+##### Symbol table handlers #####
+#Each handler adds the entries for one type of ast node to the symbol table.
+#Arguments:- node, its children, scopestack, symtable, and the path of the module
+
+def symtable_definition(node, children, scopestack, symtable, filepath):
+    "Handles ClassDef, FunctionDef and AsyncFunctionDef"
+    identifier = unique_id(node)
+    symtable[identifier] = scopemap(scope=scopestack.get_state(), astnode=node, lineno=node.lineno)
+
+def symtable_import(node, children, scopestack, symtable, filepath):
+    for name in node.names:
+        identifier = name.asname or name.name
+        #Set srcmodule property of ast node `name`
+        set_src(symtable.nodes, name, name.name)
+        set_is_src(symtable.nodes, name)
+        #symtable mapping should contain the node itself
+        symtable[identifier] = scopemap(scope=scopestack.get_state(), astnode=name, lineno=node.lineno)
+
+def symtable_import_from(node, children, scopestack, symtable, filepath):
+    if node.names[0].name == '*':
+        #exported names are determined statically, rather than by importing (executing) the module
+        exported = star_import_names(node.module, node.level, filepath)
+        if exported is None:
+            print "Error: local system does not have {}. Skipping!".format(node.module)
+        else:
+            for attr in exported:
+                symtable[attr] = scopemap(scope=scopestack.get_state(), 
+                                    astnode=ast_name_node(symtable.nodes, name=attr, srcmodule=node.module),
+                                    lineno=node.lineno)
+    else:
+        for name in node.names:
+            identifier = name.asname or name.name
+            set_src(symtable.nodes, name, node.module)
+            symtable[identifier] = scopemap(scope=scopestack.get_state(), astnode=name, lineno=node.lineno)
+
+def symtable_arguments(node, children, scopestack, symtable, filepath):
+    if node.vararg: 
+        symtable[node.vararg] = scopemap(scope=scopestack.get_state(), astnode=node)
+    if node.kwarg:
+        symtable[node.kwarg] = scopemap(scope=scopestack.get_state(), astnode=node)
+
+def symtable_name(node, children, scopestack, symtable, filepath):
+    #if a name is being loaded then it must already exist in symtable
+    if not is_load(children) and not has_global(symtable.nodes, scopestack.get_tail(), node.id):
+        symtable[node.id] = scopemap(scope=scopestack.get_state(), astnode=node, lineno=node.lineno)
+
+def symtable_global(node, children, scopestack, symtable, filepath):
+    #add a list global vars on node on the top of scope stack
+    #nonlocal could be handled in similar way
+    #FIXME: ensure this is correct
+    set_globals(symtable.nodes, scopestack.get_tail(), node.names)
+
+#Maps ast node class to its symbol table handler
+symtable_handlers = {
+    ast.ClassDef:    symtable_definition,
+    ast.FunctionDef: symtable_definition,
+    ast.Import:      symtable_import,
+    ast.ImportFrom:  symtable_import_from,
+    ast.arguments:   symtable_arguments,
+    ast.Name:        symtable_name,
+    ast.Global:      symtable_global,
+}
+if hasattr(ast, "AsyncFunctionDef"):
+    symtable_handlers[ast.AsyncFunctionDef] = symtable_definition
+
+##### Dependency handlers #####
+#Each handler resolves the dependency created by one type of ast node.
+#Arguments:- node, scopestack (as it was when node was walked), symtable
+#Returns the (src, dst) pair of lists of nodes, or None if node creates no dependency
+
+def dependency_name(node, scopestack, symtable):
+    return process_name_node(node, scopestack, symtable)
+
+def dependency_attribute(node, scopestack, symtable):
+    return process_attribute_node(node, scopestack, symtable)
+    #the whole subtree is resolved here    
+    #e.g. pdb.set_trace, is an Attribute node with children value (Name= pdb) and attr (str = 'set_trace')
+    #resolving the child Name node too could lead to redundant (incorrect) dependencies
+
+def dependency_assign(node, scopestack, symtable):
+    #Assigns consist of list of LHS values (targets), and a RHS types (value) 
+    
+    #resolve the value, as a list of identifiers
+    val_type = node.value.__class__
+    if val_type is ast.Name:
+        value = [node.value.id]
+    elif val_type is ast.Attribute:
+        value = map(unique_id, resolve_attr_chain(node.value))
+    else: 
+        create_and_raise("UnknownRHSException", 
+            "Unknown RHS, '{}' in Assign".format(val_type.__name__))
+
+    #resolve the target(s)
+    for target in node.targets:
+        target_type = target.__class__
+        if target_type is ast.Name:
+            #attach the value mapping to scopestack.get_tail() (scopetail)
+            #these will be automatically evicted when scopetail goes out of scope
+            #TODO: handles globals
+            set_assignment(symtable.nodes, scopestack.get_tail(), target.id, value)
+
+        elif target_type is ast.Attribute:
+            #only names are looked up as aliases, i.e. the heads of attribute chains
+            pass
+
+        else:
+            create_and_raise("UnknownLHSException", 
+                "Unknown LHS, '{}' in Assign".format(target_type.__name__))
+
+#Maps ast node class to its dependency handler
+dependency_handlers = {
+    ast.Name:      dependency_name,
+    ast.Attribute: dependency_attribute,
+    ast.Assign:    dependency_assign,
+}
+
+def create_symbol_table(root, filepath=None, events=None):
     """
     Creates a symbol table.
     Arguments:-
         root: root ast node to be analyzed (typically a module node).
+        filepath: path of the module; star-imports are resolved relative to it
+        events: if passed, a list that the nodes create_dependency_tree must process
+            (Name loads, Attributes, Assigns) are appended to, as 2-tuples of
+            (node, state of scopestack); this way the tree is walked only once
     """
 
     #symbol table
     #creates mapping from name to scopes
-    symtable = Multidict()
+    symtable = SymbolTable()
     
-    #stack of nodes
+    #stack of (node, depth) pairs
     nodes = Stack()
-    set_depth(root, 0)
-    nodes.push(root)
+    nodes.push((root, 0))
     
     #stack of scopes
     scopestack = Stack()
+    #depths of the nodes on scopestack
+    scopedepths = Stack()
+
+    #depth of the Attribute or Assign node whose subtree is resolved as a whole,
+    #i.e. nodes below it are not events
+    resolved_depth = None
+
+    filepath = filepath or root.name + ".py"
+
+    #number of nodes visited
+    visited = 0
 
     #Iterate over all children node
-    for node in nodes:
-        ntype = node_type(node)
+    for node, depth in nodes:
+        visited += 1
+        ntype = node.__class__
         
         #remove any scope nodes that have depth >= node 
-        scopestack.predpop(lambda scopenode: scopenode.depth >= node.depth)
+        while scopedepths and scopedepths.get_tail() >= depth:
+            scopedepths.pop()
+            scopestack.pop()
 
         children = get_children(node) 
+
+        if resolved_depth is not None and depth <= resolved_depth:
+            resolved_depth = None
+        if events is not None and resolved_depth is None and ntype in dependency_handlers:
+            if ntype is not ast.Name:
+                events.append((node, scopestack.get_state()))
+                resolved_depth = depth
+            elif is_load(children):
+                events.append((node, scopestack.get_state()))
+
         #add children to stack in reverse order
         for child in reversed(children):
-            #set depth on children nodes
-            set_depth(child, node.depth + 1)
-            nodes.push(child)
+            #depth of children nodes is tracked on the stack
+            nodes.push((child, depth + 1))
         #set lineno property of children
         #Not sure if there is a better way to scope objects, since 
         #objects can be redefined, i.e. def foo(): pass\n def foo():pass is valid Python
-        #set_lineno(node, children)
+        #set_lineno(symtable.nodes, node, children)
    
         #add entries to symbol table
-        if ntype == "ClassDef" or ntype == "FunctionDef":
-            identifier = unique_id(node)
-            symtable[identifier] = scopemap(scope=scopestack.get_state(), astnode=node)
-        
-        elif ntype == "Import":
-            for name in node.names:
-                identifier = name.asname or name.name
-                #Set srcmodule property of ast node `name`
-                set_src(name, name.name)
-                set_is_src(name)
-                #symtable mapping should contain the node itself
-                symtable[identifier] = scopemap(scope=scopestack.get_state(), astnode=name)
-        elif ntype == "ImportFrom":
-            if node.names[0].name == '*':
-                try:
-                    imported = importlib.import_module(node.module)
-                    #add all names in imported module, except those starting with '_'
-                    for attr in dir(imported):
-                        if attr[0] != '_':
-                            symtable[attr] = scopemap(scope=scopestack.get_state(), 
-                                                astnode=ast_name_node(name=attr, srcmodule=node.module))
-                except ImportError:
-                    print "Error: local system does not have {}. Skipping!".format(node.module)
-            else:
-                for name in node.names:
-                    identifier = name.asname or name.name
-                    set_src(name, node.module)
-                    symtable[identifier] = scopemap(scope=scopestack.get_state(), astnode=name)
-
-        elif ntype == "arguments":
-            if node.vararg: 
-                symtable[node.vararg] = scopemap(scope=scopestack.get_state(), astnode=node)
-            if node.kwarg:
-                symtable[node.kwarg] = scopemap(scope=scopestack.get_state(), astnode=node)
-
-        #if a name is being loaded then it must already exist in symtable
-        elif ntype == "Name" and not is_load(children) and not has_global(scopestack.get_tail(), node.id):
-            symtable[node.id] = scopemap(scope=scopestack.get_state(), astnode=node)
-    
-        elif ntype == "Global":    
-            #add a list global vars on node on the top of scope stack
-            #nonlocal could be handled in similar way
-            #FIXME: ensure this is correct
-            set_globals(scopestack.get_tail(), node.names)
+        handler = symtable_handlers.get(ntype)
+        if handler is not None:
+            handler(node, children, scopestack, symtable, filepath)
             
         #add any scoping nodes 
-        #Need to do this after ntype == '...' blocks otherwise scoping nodes
+        #Need to do this after the handlers otherwise scoping nodes
         #would show up in their own scope mapping. 
         if ntype in scoping_types: 
+            symtable.add_scope(node, parent=scopestack[-1] if scopestack else None)
             scopestack.push(node)
+            scopedepths.push(depth)
 
+    stats.count("nodes", visited)
+    stats.count("symbols", len(symtable))
     return symtable
 
-def create_dependency_tree(root, symtable):
+def iter_dependencies(root, symtable, events=None):
     """
-    Returns a map of all the dependencies.
+    Yields the dependencies as they are resolved, as (src, dst) pairs,
+    where each is a list of the identifiers along its path.
+
+    The nodes that create dependencies are recorded by create_symbol_table,
+    in the same pass that creates the symbol table; here they are resolved
+    against the finished table, in the order they occur.
 
-    Similar to create_symbol_table since scopes are some what
-    like dependencies, minus the hierarchical scope info.
+    Arguments:-
+        root: root ast node to be analyzed
+        symtable: the symbol table of root
+        events: the events recorded by create_symbol_table; if None, they are
+            recorded by walking root again
+    """
+    if events is None:
+        events = []
+        create_symbol_table(root, events=events)
+
+    for node, scopes in events:
+        #stack of scopes, as it was when node was walked
+        scopestack = Stack(scopes)
+        link = dependency_handlers[node.__class__](node, scopestack, symtable)
+        if link is not None:
+            src, dst = link
+            yield map(unique_id, src), map(unique_id, dst)
+
+def create_dependency_tree(root, symtable, events=None):
+    """
+    Returns a map of all the dependencies.
+    Arguments are as for iter_dependencies.
     """
-    
     deptree = DTree() 
-
-    #stack of nodes
-    nodes = Stack()
-    nodes.push(root)
-
-    #stack of scopes
-    scopestack = Stack()
-
-    #stack of assigned names
-    assignments = Stack()
-
-    for node in nodes:
-        ntype = node_type(node)
-
-        #remove stale scoping nodes
-        scopestack.predpop(lambda scopenode: scopenode.depth >= node.depth)
-
-        children = get_children(node) 
-
-        if ntype == "Name" and is_load(children):
-            src, dst = process_name_node(node, scopestack, symtable)
-            deptree.add_link(src=map(unique_id, src), dst=map(unique_id, dst))
-
-        elif ntype == "Attribute":
-            pdb.set_trace()
-            src, dst = process_attribute_node(node, scopestack, symtable)
-            deptree.add_link(src = map(unique_id, src), dst = map(unique_id, dst))
-            #don't need to add children since we resolved the whole subtree here    
-            #e.g. pdb.set_trace, is an Attribute node with children value (Name= pdb) and attr (str = 'set_trace')
-            #adding the child Name node could lead to redundant (incorrect) dependencies
-            continue            
-
-        elif ntype == "Assign":
-            #Assigns consist of list of LHS values (targets), and a RHS types (value) 
-            
-            #resolve the value
-            val_type = node_type(node.value)
-            if val_type == "Name":
-                value = node.value.id
-            elif val_type == "Attribute":
-                value = resolve_attr_chain(node.value)
-            else: 
-                create_and_raise("UnknownRHSException", 
-                    "Unknown RHS, '{}' in Assign".format(val_type))
-
-            #resolve the target(s)
-            for target in node.targets:
-                target_type = node_type(target)
-                if target_type == "Name":
-                    #the process func return a (src, dst) depenendency pair, ignore src since that's just the current context
-                    _, dependency = process_name_node(target, scopestack, symtable)
-
-                elif target_type == "Attribute":
-                    _, dependency = process_attribute_node(target, scopestack, symtable)
-
-                else:
-                    create_and_raise("UnknownLHSException", 
-                        "Unknown LHS, '{}' in Assign".format(target_type))
-
-                #attach the value mapping to scopestack.get_tail() (scopetail)
-                #these will be automatically evicted when scopetail goes out of scope
-                #TODO: handles globals
-
-                set_assignment(scopestack.get_tail(), dependency, value)
-
-            continue
-
-
-        #push nodes onto the stack; depth is already set from create_symbol_tree()
-        #needs to be done here (i.e. after specific ast type logic) since not all 
-        #children need to put on stack
-        nodes.pushmany(reversed(children))
-
-        if ntype in scoping_types: 
-            scopestack.push(node)
+    for src, dst in iter_dependencies(root, symtable, events):
+        deptree.add_link(src=src, dst=dst)
 
     return deptree
 
-def analyze(filepath):
+def analyze(filepath, report_stats=False, export=None, output='-'):
     """
     Analyze the module pointed by `filepath`
+    Arguments:-
+        filepath: path of the module
+        report_stats: if True, the time of each phase and the counters are printed
+        export: if passed, the format, i.e. "dot", "graphml" or "json",
+            the dependency tree is written to `output` in; the symbol table
+            isn't printed then, so the export can be piped
+        output: path of the file the export is written to, or '-' for stdout
     """
+    if report_stats:
+        stats.enable()
 
     #Get module as ast node
-    root = get_module(filepath)
+    with stats.timer("parse"):
+        root = get_module(filepath)
 
     #create symbol table
     #The symbol table creation must be a separate phase from dependency tree creation 
@@ -710,12 +965,24 @@ def analyze(filepath):
     #being defined.
     #The alternative approach would be to have one pass, and resolve symbols as 
     #soon as they become available; however, existing solution is closer to how Python works
-    symbol_table = create_symbol_table(root)
-    print_symtable(symbol_table)
+    #The nodes that create dependencies are recorded while the symbol table is created,
+    #and resolved afterwards, so the tree is only walked once
+    events = []
+    with stats.timer("symbol_table"):
+        symbol_table = create_symbol_table(root, filepath=filepath, events=events)
+    if not export:
+        print_symtable(symbol_table)
 
     #find dependencies
-    dependency_tree = create_dependency_tree(root, symbol_table)
+    with stats.timer("resolve"):
+        dependency_tree = create_dependency_tree(root, symbol_table, events)
     #print_deptree(dependency_tree)
+    if export:
+        export_deptree(dependency_tree, export, output)
+
+    if report_stats:
+        #kept out of an export written to stdout
+        print >>(sys.stderr if export and output == '-' else sys.stdout), stats.current.report()
 
 """
 How best to represent dependencies?
@@ -751,7 +1018,7 @@ Obviously this can't catch monkey typing etc., but
 hopefully that isn't a big concern if most code bases
 
 4) Above example, does bar depend on pdb or requests?
-    -to resolve the above issue __hash__, __eq__ of Vertex should consider lineno
+    -to resolve the above issue the DTree index should consider lineno
 
 5) Nodes (vertices) should have ptrs to parents?
 
@@ -767,5 +1034,5 @@ Here, first need to resolve y, then resolve x
 
 
 if __name__ == "__main__":
-    analyze('test.py')
+    analyze(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test.py'))
 
@@ -0,0 +1,95 @@
+"""
+Exporters of the dependency tree (DTree) to DOT, GraphML and JSON.
+
+Each exporter visits the vertices, and then the dependencies, exactly
+once, in id order, and writes each as it is visited, so memory use
+doesn't grow with the size of the tree. The root is not written; its
+children are the top-level vertices.
+"""
+import json
+import sys
+from xml.sax.saxutils import escape
+
+
+def dot_string(value):
+    "Returns `value` as a quoted DOT string"
+    return '"{}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+def write_dot(deptree, fileptr):
+    """
+    Writes `deptree` to `fileptr` in the DOT format. Parent-child edges
+    are dotted, and dependency edges are solid.
+    """
+    fileptr.write("digraph deptree {\n")
+    root = deptree.ROOT
+    for vertex in deptree.vertices():
+        fileptr.write("  n{} [label={}];\n".format(vertex, dot_string(deptree.value(vertex))))
+        parent = deptree.parents[vertex]
+        if parent != root:
+            fileptr.write("  n{} -> n{} [style=dotted];\n".format(parent, vertex))
+    for src, dst in deptree.links():
+        fileptr.write("  n{} -> n{};\n".format(src, dst))
+    fileptr.write("}\n")
+
+def write_graphml(deptree, fileptr):
+    """
+    Writes `deptree` to `fileptr` in the GraphML format. Vertices have a `value`,
+    and edges have a `kind`, i.e. "child" or "dependency".
+    """
+    fileptr.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                  '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+                  '  <key id="value" for="node" attr.name="value" attr.type="string"/>\n'
+                  '  <key id="kind" for="edge" attr.name="kind" attr.type="string"/>\n'
+                  '  <graph id="deptree" edgedefault="directed">\n')
+    root = deptree.ROOT
+    for vertex in deptree.vertices():
+        fileptr.write('    <node id="n{}"><data key="value">{}</data></node>\n'.format(
+            vertex, escape(str(deptree.value(vertex)))))
+        parent = deptree.parents[vertex]
+        if parent != root:
+            fileptr.write('    <edge source="n{}" target="n{}"><data key="kind">child</data></edge>\n'.format(
+                parent, vertex))
+    for src, dst in deptree.links():
+        fileptr.write('    <edge source="n{}" target="n{}"><data key="kind">dependency</data></edge>\n'.format(
+            src, dst))
+    fileptr.write('  </graph>\n</graphml>\n')
+
+def write_json(deptree, fileptr):
+    """
+    Writes `deptree` to `fileptr` as a JSON object of
+    "vertices", i.e. list of {"id", "value", "parent"}, where the parent of
+    top-level vertices is null, and "dependencies", i.e. list of [src id, dst id]
+    """
+    encode = json.JSONEncoder().encode
+    root = deptree.ROOT
+    fileptr.write('{"vertices": [')
+    separator = "\n"
+    for vertex in deptree.vertices():
+        parent = deptree.parents[vertex]
+        fileptr.write('{}{{"id": {}, "value": {}, "parent": {}}}'.format(
+            separator, vertex, encode(deptree.value(vertex)), "null" if parent == root else parent))
+        separator = ",\n"
+    fileptr.write('],\n"dependencies": [')
+    separator = "\n"
+    for src, dst in deptree.links():
+        fileptr.write("{}[{}, {}]".format(separator, src, dst))
+        separator = ",\n"
+    fileptr.write("]}\n")
+
+#Maps format name to its exporter
+EXPORTERS = {
+    "dot": write_dot,
+    "graphml": write_graphml,
+    "json": write_json,
+}
+
+def export(deptree, fmt, output):
+    """
+    Writes `deptree` in the format `fmt`, i.e. one of EXPORTERS, to `output`,
+    a file path, or '-' for stdout
+    """
+    if output == '-':
+        EXPORTERS[fmt](deptree, sys.stdout)
+        return
+    with open(output, "w") as fileptr:
+        EXPORTERS[fmt](deptree, fileptr)
@@ -0,0 +1,73 @@
+"""
+Helpers that write packages of modules to analyze into temp directories
+"""
+import os
+import shutil
+import tempfile
+
+from datastructures import DTable
+from take3.analyze import DTree, create_symbol_table, create_dependency_tree
+from take3.utils import get_module
+
+#A package whose modules import each other relatively, forming a cycle:
+#pkg.a -> pkg.b through a star-import, and pkg.b -> pkg.a
+RELATIVE_CYCLE = {
+    "pkg/__init__.py": "",
+    "pkg/a.py": "from .b import *\n\ndef f():\n    return g()\n",
+    "pkg/b.py": "from . import a\nfrom .a import f\n\ndef g():\n    return 1\n\ndef h():\n    return f()\n",
+}
+
+
+def dependency_table(*rows):
+    "Returns a DTable of (src, dest, lineno) `rows`, as if they were resolved"
+    table = DTable()
+    for src, dest, lineno in rows:
+        table.add(src, dest, lineno)
+    return table
+
+def sample_tree():
+    "Returns a take3 DTree of mod.foo -> pdb.set_trace and mod.bar -> mod.foo"
+    tree = DTree()
+    tree.add_link(["mod", "foo"], ["pdb", "set_trace"])
+    tree.add_link(["mod", "bar"], ["mod", "foo"])
+    return tree
+
+def take3_dependencies(source):
+    """
+    Returns the sorted list of (src, dst) dotted paths of the dependencies
+    take3 finds in module `source`, named mod
+    """
+    with TempPackage({"mod.py": source}) as directory:
+        path = os.path.join(directory, "mod.py")
+        root = get_module(path)
+        events = []
+        symbol_table = create_symbol_table(root, filepath=path, events=events)
+        tree = create_dependency_tree(root, symbol_table, events)
+    return sorted(('.'.join(tree.path(src)), '.'.join(tree.path(dst))) for src, dst in tree.links())
+
+def write_files(directory, files):
+    """
+    Writes `files`, i.e. dict of path relative to `directory` -> contents
+    """
+    for relpath, contents in files.items():
+        path = os.path.join(directory, *relpath.split("/"))
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "w") as fileptr:
+            fileptr.write(contents)
+
+class TempPackage(object):
+    """
+    Context manager that writes `files` to a temp directory,
+    returns the directory and removes it on exit
+    """
+    def __init__(self, files):
+        self.files = files
+
+    def __enter__(self):
+        self.directory = tempfile.mkdtemp()
+        write_files(self.directory, self.files)
+        return self.directory
+
+    def __exit__(self, *exc_info):
+        shutil.rmtree(self.directory)
@@ -0,0 +1,98 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import resolver
+import stats
+from analyze import analyze_module
+from cache import ModuleCache
+
+#2020-01-01
+OLD_MTIME = 1577836800
+
+
+class ModuleCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.base = os.path.join(self.directory, "base.py")
+        self.mod = os.path.join(self.directory, "mod.py")
+        with open(self.base, "w") as fileptr:
+            fileptr.write("def foo():\n    pass\n")
+        with open(self.mod, "w") as fileptr:
+            fileptr.write("from base import *\n\ndef bar():\n    return foo()\n")
+        for path in (self.base, self.mod):
+            os.utime(path, (OLD_MTIME, OLD_MTIME))
+        self.cache = ModuleCache(os.path.join(self.directory, "cache"))
+
+    def tearDown(self):
+        stats.disable()
+        shutil.rmtree(self.directory)
+
+    def test_hit_keeps_source_mtimes(self):
+        analyze_module(self.mod, module_name="mod", cache=self.cache)
+        for _ in range(2):
+            current = stats.enable()
+            analyze_module(self.mod, module_name="mod", cache=self.cache)
+            self.assertEqual(current.counters.get("cache_hits"), 1)
+        self.assertEqual(os.stat(self.base).st_mtime, OLD_MTIME)
+        self.assertEqual(os.stat(self.mod).st_mtime, OLD_MTIME)
+
+    def test_hit_prints_as_fresh(self):
+        #enough names that the order of the loaded entry differs from the order they were bound in
+        with open(self.mod, "a") as fileptr:
+            fileptr.write("".join("\ndef f{}():\n    return bar()\n".format(i) for i in range(50)))
+        fresh = analyze_module(self.mod, module_name="mod", cache=self.cache)
+        cached = analyze_module(self.mod, module_name="mod", cache=self.cache)
+        self.assertEqual(map(repr, cached), map(repr, fresh))
+
+    def test_prune(self):
+        analyze_module(self.mod, module_name="mod", cache=self.cache)
+        analyze_module(self.base, module_name="base", cache=self.cache)
+        mod_key = self.cache.key("mod", open(self.mod).read())
+        base_key = self.cache.key("base", open(self.base).read())
+        self.assertEqual(self.cache.prune(), 0)
+
+        #entries older than max_age are evicted
+        os.utime(self.cache.path(mod_key), (OLD_MTIME, OLD_MTIME))
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(mod_key))
+        self.assertIsNotNone(self.cache.get(base_key))
+
+        #then the least recently used, until the cache fits in max_size
+        analyze_module(self.mod, module_name="mod", cache=self.cache)
+        now = os.stat(self.cache.path(mod_key)).st_mtime
+        os.utime(self.cache.path(base_key), (now - 60, now - 60))
+        self.cache.max_size = os.path.getsize(self.cache.path(mod_key))
+        self.assertEqual(self.cache.prune(), 1)
+        self.assertIsNone(self.cache.get(base_key))
+        #reading an entry marks it as recently used
+        self.assertIsNotNone(self.cache.get(mod_key))
+        self.assertGreaterEqual(os.stat(self.cache.path(mod_key)).st_mtime, now)
+        self.assertEqual(os.listdir(self.cache.directory), [mod_key + ".json"])
+
+    def test_missing_star_import_created(self):
+        with open(self.mod, "w") as fileptr:
+            fileptr.write("from helper import *\n\ndef bar():\n    return baz()\n")
+        stderr, sys.stderr = sys.stderr, StringIO()
+        self.addCleanup(setattr, sys, "stderr", stderr)
+        analyze_module(self.mod, module_name="mod", cache=self.cache)
+        current = stats.enable()
+        _, dependency_table = analyze_module(self.mod, module_name="mod", cache=self.cache)
+        self.assertEqual(current.counters.get("cache_hits"), 1)
+        self.assertEqual(list(dependency_table), [])
+
+        #the entry is stale once the star-imported module exists, e.g. in the next run
+        with open(os.path.join(self.directory, "helper.py"), "w") as fileptr:
+            fileptr.write("def baz():\n    pass\n")
+        resolver.default.refresh()
+        current = stats.enable()
+        _, dependency_table = analyze_module(self.mod, module_name="mod", cache=self.cache)
+        self.assertIsNone(current.counters.get("cache_hits"))
+        self.assertEqual(list(dependency_table), [("mod.bar", "helper.baz")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import json
+import unittest
+from StringIO import StringIO
+
+from closure import Closure, module_closure, symbol_closure, strongly_connected_components
+from graph import DependencyGraph
+from tests.fixtures import dependency_table
+
+
+class ClosureTest(unittest.TestCase):
+    def test_chain_and_cycle(self):
+        #a -> b -> c <-> d
+        closure = Closure(list("abcd"), [[1], [2], [3], [2]])
+        self.assertEqual(sorted(closure.dependencies("a")), ["b", "c", "d"])
+        self.assertTrue(closure.depends("c", "c"))
+        self.assertFalse(closure.depends("b", "a"))
+        self.assertFalse(closure.depends("a", "a"))
+        self.assertEqual(closure.cycles(), [["c", "d"]])
+
+    def test_self_loop(self):
+        closure = Closure(list("ab"), [[0, 1], []])
+        self.assertTrue(closure.depends("a", "a"))
+        self.assertEqual(closure.cycles(), [])
+
+    def test_unknown_names(self):
+        closure = Closure(list("ab"), [[1], []])
+        self.assertFalse(closure.depends("a", "z"))
+        self.assertFalse(closure.depends("z", "a"))
+        self.assertEqual(closure.dependencies("z"), [])
+
+    def test_deep_chain(self):
+        #deeper than the recursion limit, so the SCC pass must be iterative
+        size = 5000
+        names = ["v{}".format(i) for i in range(size)]
+        closure = Closure(names, [[i + 1] for i in range(size - 1)] + [[]])
+        self.assertTrue(closure.depends("v0", "v4999"))
+        self.assertFalse(closure.depends("v4999", "v0"))
+        self.assertEqual(len(closure.dependencies("v1")), size - 2)
+
+    def test_components_in_reverse_topological_order(self):
+        #a -> {b, c} -> d
+        components, component = strongly_connected_components(4, [[1, 2], [3], [3], []])
+        self.assertEqual(components[0], [3])
+        self.assertEqual(components[-1], [0])
+        self.assertEqual(len(set(component)), 4)
+
+    def test_module_closure(self):
+        graph = DependencyGraph()
+        graph.add_module("app", "app.py", dependency_table(("app.main", "lib.parse", 3),
+                                                           ("app.main", "os.path.join", 4)))
+        graph.add_module("lib", "lib.py", dependency_table(("lib.parse", "lib.util.split", 2)))
+        graph.add_module("lib.util", "lib/util.py", dependency_table(("lib.util.split", "re.split", 2)))
+
+        closure = module_closure(graph)
+        self.assertEqual(closure.names, ["app", "lib", "lib.util"])
+        self.assertTrue(closure.depends("app", "lib.util"))
+        self.assertFalse(closure.depends("lib", "app"))
+
+        closure = module_closure(graph, external=True)
+        self.assertEqual(sorted(closure.dependencies("app")), ["lib", "lib.util", "os", "re"])
+
+    def test_symbol_closure_export(self):
+        graph = DependencyGraph()
+        graph.add_module("app", "app.py", dependency_table(("app.main", "app.run", 3), ("app.run", "lib.parse", 5)))
+        output = StringIO()
+        symbol_closure(graph).write_json(output)
+        self.assertEqual(json.loads(output.getvalue()), {
+            "app.main": ["app.run", "lib.parse"],
+            "app.run": ["lib.parse"],
+            "lib.parse": [],
+        })
+
+
+if __name__ == '__main__':
+    unittest.main()
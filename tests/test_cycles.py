@@ -0,0 +1,42 @@
+import unittest
+
+from cycles import find_cycles, module_cycles, symbol_cycles
+from graph import DependencyGraph
+from tests.fixtures import dependency_table
+
+
+class CyclesTest(unittest.TestCase):
+    def test_witness_is_shortest(self):
+        cycles = find_cycles(list("abcd"), [[1], [2, 0], [3], [1]])
+        self.assertEqual(cycles, [(["a", "b", "c", "d"], ["a", "b", "a"])])
+
+    def test_self_loops_and_acyclic(self):
+        self.assertEqual(find_cycles(list("abc"), [[0, 1], [2], []]), [])
+
+    def test_largest_first(self):
+        #{a, b} and {c, d, e}, joined by a -> c
+        cycles = find_cycles(list("abcde"), [[1, 2], [0], [3], [4], [2]])
+        self.assertEqual(cycles, [(["c", "d", "e"], ["c", "d", "e", "c"]),
+                                  (["a", "b"], ["a", "b", "a"])])
+
+    def test_long_cycle(self):
+        #deeper than the recursion limit
+        size = 5000
+        names = ["v{:04}".format(i) for i in range(size)]
+        cycles = find_cycles(names, [[(i + 1) % size] for i in range(size)])
+        self.assertEqual(len(cycles), 1)
+        members, witness = cycles[0]
+        self.assertEqual(len(members), size)
+        self.assertEqual(witness, names + ["v0000"])
+
+    def test_module_and_symbol_cycles(self):
+        graph = DependencyGraph()
+        graph.add_module("a", "a.py", dependency_table(("a.f", "b.g", 2), ("a.h", "a.f", 5)))
+        graph.add_module("b", "b.py", dependency_table(("b.g", "a.h", 3), ("b.k", "os.sep", 4)))
+        graph.add_module("c", "c.py", dependency_table(("c.main", "a.f", 2)))
+        self.assertEqual(module_cycles(graph), [(["a", "b"], ["a", "b", "a"])])
+        self.assertEqual(symbol_cycles(graph), [(["a.f", "a.h", "b.g"], ["a.f", "b.g", "a.h", "a.f"])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+
+from graph import DependencyGraph
+from project import analyze_project
+from tests.fixtures import TempPackage, dependency_table
+
+#json's __init__ imports its submodules relatively
+FILES = {
+    "json/__init__.py": "from .decoder import JSONDecoder\n\ndef loads(s):\n    return JSONDecoder(s)\n",
+    "json/decoder.py": "class JSONDecoder(object):\n    def decode(self, s):\n        return s\n",
+    "user.py": "from json import loads\n\ndef main():\n    return loads('1')\n",
+}
+
+
+class DependentsTest(unittest.TestCase):
+    def setUp(self):
+        #app.main -> app.run -> lib.parse -> lib.read, and tool.check -> lib.parse
+        self.graph = DependencyGraph()
+        self.graph.add_module("lib", "lib.py", dependency_table(("lib.parse", "lib.read", 2)))
+        self.graph.add_module("app", "app.py", dependency_table(("app.main", "app.run", 5),
+                                                               ("app.run", "lib.parse", 8)))
+        self.graph.add_module("tool", "tool.py", dependency_table(("tool.check", "lib.parse", 3)))
+
+    def test_direct_dependents(self):
+        self.assertEqual(self.graph.direct_dependents("lib.parse"), frozenset(["app.run", "tool.check"]))
+        self.assertEqual(self.graph.direct_dependents("app.main"), frozenset())
+        self.assertEqual(self.graph.direct_dependents("unknown.name"), frozenset())
+
+    def test_depth(self):
+        self.assertEqual(self.graph.transitive_dependents("lib.read"),
+                         frozenset(["lib.parse", "app.run", "tool.check", "app.main"]))
+        self.assertEqual(self.graph.transitive_dependents("lib.read", depth=2),
+                         frozenset(["lib.parse", "app.run", "tool.check"]))
+        self.assertEqual(self.graph.transitive_dependencies("app.main", depth=1), frozenset(["app.run"]))
+        self.assertEqual(self.graph.transitive_dependencies("app.main"),
+                         frozenset(["app.run", "lib.parse", "lib.read"]))
+        self.assertEqual(self.graph.transitive_dependencies("app.main", depth=0), frozenset())
+
+    def test_memo_is_invalidated(self):
+        first = self.graph.transitive_dependents("lib.read")
+        self.assertIs(self.graph.transitive_dependents("lib.read"), first)
+
+        self.graph.add_edge(self.graph.names.intern("cli.run"), self.graph.names.intern("app.main"))
+        self.assertIn("cli.run", self.graph.transitive_dependents("lib.read"))
+
+        #the edge into app.main isn't one of app's edges, so it stays
+        self.graph.remove_module("app")
+        self.assertEqual(self.graph.transitive_dependents("lib.read"), frozenset(["lib.parse", "tool.check"]))
+        self.assertEqual(self.graph.transitive_dependencies("cli.run"), frozenset(["app.main"]))
+
+    def test_module_dependents(self):
+        self.assertEqual(self.graph.dependents("lib"), set(["app", "tool"]))
+        self.assertEqual(self.graph.dependents("app"), set())
+
+    def test_relative_importer(self):
+        with TempPackage(FILES) as directory:
+            graph, errors = analyze_project(directory, processes=1)
+        self.assertEqual(errors, {})
+        self.assertEqual(graph.dependents("json.decoder"), set(["json"]))
+        self.assertEqual(graph.transitive_dependents("json.decoder.JSONDecoder"),
+                         frozenset(["json.loads", "user.main"]))
+
+
+if __name__ == '__main__':
+    unittest.main()
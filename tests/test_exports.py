@@ -0,0 +1,44 @@
+import os
+import unittest
+
+import exports
+from exports import module_exports, star_import_names
+from tests.fixtures import TempPackage
+
+FILES = {
+    "listed.py": "__all__ = ['foo']\n__all__ += ['_bar']\n\ndef foo():\n    pass\n\ndef _bar():\n    pass\n\ndef baz():\n    pass\n",
+    "public.py": "import os\nfrom listed import *\n\ntry:\n    import json\nexcept ImportError:\n    json = None\n\n_private = 1\n",
+    #a and b star-import each other
+    "a.py": "from b import *\n\ndef fa():\n    pass\n",
+    "b.py": "from a import *\n\ndef fb():\n    pass\n",
+}
+
+
+class ExportsTest(unittest.TestCase):
+    def setUp(self):
+        package = TempPackage(FILES)
+        self.directory = os.path.abspath(package.__enter__())
+        self.addCleanup(package.__exit__, None, None, None)
+        self.addCleanup(exports._exports.clear)
+
+    def path(self, name):
+        return os.path.join(self.directory, name + ".py")
+
+    def test_dunder_all(self):
+        self.assertEqual(module_exports(self.path("listed")), ["foo", "_bar"])
+
+    def test_public_names(self):
+        self.assertEqual(module_exports(self.path("public")), ["foo", "json", "os"])
+        self.assertEqual(star_import_names("public", 0, self.path("a"), "a"), ["foo", "json", "os"])
+        self.assertIsNone(star_import_names("missing", 0, self.path("a"), "a"))
+
+    def test_star_import_cycle(self):
+        self.assertEqual(module_exports(self.path("a")), ["fa", "fb"])
+        #b was resolved while a was, without a's names; that partial result isn't memoized
+        self.assertNotIn(self.path("b"), exports._exports)
+        self.assertEqual(module_exports(self.path("b")), ["fa", "fb"])
+        self.assertEqual(module_exports(self.path("a")), ["fa", "fb"])
+
+
+if __name__ == '__main__':
+    unittest.main()
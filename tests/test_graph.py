@@ -0,0 +1,51 @@
+import unittest
+
+from graph import DependencyGraph
+from project import analyze_project
+from tests.fixtures import RELATIVE_CYCLE, TempPackage, dependency_table
+
+
+class RelativeImportTest(unittest.TestCase):
+    def test_dests_are_qualified(self):
+        with TempPackage(RELATIVE_CYCLE) as directory:
+            graph, errors = analyze_project(directory, processes=1)
+        self.assertEqual(errors, {})
+        edges = set(graph.edges())
+        self.assertIn(("pkg.a.f", "pkg.b.g"), edges)
+        self.assertIn(("pkg.b.h", "pkg.a.f"), edges)
+        for _, dest in edges:
+            self.assertFalse(dest.startswith("."), dest)
+
+
+class DependencyGraphTest(unittest.TestCase):
+    def test_keeps_edges_only(self):
+        graph = DependencyGraph()
+        graph.add_module("mod", "mod.py", dependency_table(("mod.f", "os.path.join", 3), ("mod.g", "mod.f", 5)))
+        result = graph.modules["mod"]
+        self.assertEqual(result._fields, ("path", "edges", "lines"))
+        self.assertIsNone(result.lines)
+        self.assertEqual([graph.names.to_str(ident) for ident in result.edges],
+                         ["mod.f", "os.path.join", "mod.g", "mod.f"])
+        self.assertEqual(graph.module_edges("mod"), set([("mod.f", "os.path.join"), ("mod.g", "mod.f")]))
+
+    def test_lines(self):
+        graph = DependencyGraph(lines=True)
+        graph.add_module("mod", "mod.py", dependency_table(("mod.f", "os.path.join", 3), ("mod.g", "mod.f", 5)))
+        self.assertEqual(list(graph.module_rows("mod")),
+                         [("mod.f", "os.path.join", 3), ("mod.g", "mod.f", 5)])
+
+    def test_replacing_module(self):
+        graph = DependencyGraph()
+        graph.add_module("mod", "mod.py", dependency_table(("mod.f", "os.path.join", 3)))
+        graph.add_module("user", "user.py", dependency_table(("user.main", "mod.f", 2)))
+        graph.add_module("mod", "mod.py", dependency_table(("mod.f", "sys.exit", 3)))
+        self.assertEqual(set(graph.edges()), set([("mod.f", "sys.exit"), ("user.main", "mod.f")]))
+        self.assertEqual(graph.dependents("mod"), set(["user"]))
+        self.assertEqual(graph.dependents("os"), set())
+        graph.remove_module("user")
+        self.assertEqual(graph.dependents("mod"), set())
+        self.assertEqual(len(graph), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from StringIO import StringIO
+
+import analyze
+from graph import DependencyGraph
+from graphfile import GraphFile, save_graph, is_graph_file
+from tests.fixtures import dependency_table
+
+
+class GraphFileTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "deps.graph")
+
+        self.graph = DependencyGraph(lines=True)
+        self.graph.add_module("app", "app.py", dependency_table(("app.main", "lib.parse", 3),
+                                                                ("app.main", "app.run", 4),
+                                                                ("app.run", "lib.parse", 8)))
+        self.graph.add_module("lib", "lib.py", dependency_table(("lib.parse", "re.split", 2)))
+        self.assertEqual(save_graph(self.graph, self.path), 4)
+
+    def test_round_trip(self):
+        self.assertTrue(is_graph_file(self.path))
+        with GraphFile(self.path) as graph:
+            self.assertEqual(len(graph), 4)
+            self.assertEqual([graph.name(ident) for ident in range(graph.size)],
+                             ["app.main", "app.run", "lib.parse", "re.split"])
+            self.assertEqual(graph.find("lib.parse"), 2)
+            self.assertIsNone(graph.find("lib"))
+            self.assertEqual(graph.dependencies("app.main"), [("app.run", 4), ("lib.parse", 3)])
+            self.assertEqual(graph.dependents("lib.parse"), [("app.main", 3), ("app.run", 8)])
+            self.assertEqual(graph.dependencies("re.split"), [])
+            for name in ["app.main", "app.run", "lib.parse", "re.split", "missing"]:
+                for depth in [None, 1]:
+                    self.assertEqual(graph.transitive_dependencies(name, depth=depth),
+                                     self.graph.transitive_dependencies(name, depth=depth))
+                    self.assertEqual(graph.transitive_dependents(name, depth=depth),
+                                     self.graph.transitive_dependents(name, depth=depth))
+
+    def test_requires_lines(self):
+        self.assertRaises(ValueError, save_graph, DependencyGraph(), self.path)
+
+    def test_query_closes_file(self):
+        opened = []
+        original = analyze.GraphFile
+        def record(path):
+            opened.append(original(path))
+            return opened[-1]
+        analyze.GraphFile = record
+        self.addCleanup(setattr, analyze, "GraphFile", original)
+
+        stdout, sys.stdout = sys.stdout, StringIO()
+        try:
+            analyze.query(self.path, dependencies="app.main")
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(output, "dependencies of app.main are \n['app.run', 'lib.parse', 're.split']\n")
+        #a closed mmap can't be read from
+        self.assertRaises(ValueError, opened[0].name, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
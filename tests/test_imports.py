@@ -0,0 +1,34 @@
+import unittest
+
+from imports import absolute_name, scan_imports
+
+SOURCE = '''"""
+Usage:
+import os
+from p import m
+"""
+import sys
+message = "import fake"  # from here import """
+def f():
+    \'\'\'
+    import nope
+    \'\'\'
+    from .sub import (x,
+        y)
+'''
+
+
+class ScanImportsTest(unittest.TestCase):
+    def test_strings_are_skipped(self):
+        imports = scan_imports(SOURCE, "p.m", False, known=set(["p.sub"]))
+        self.assertEqual(imports, [("sys", 6), ("p.sub", 12), ("p.sub", 12)])
+
+    def test_absolute_name(self):
+        self.assertEqual(absolute_name(".decoder", "json", True), "json.decoder")
+        self.assertEqual(absolute_name("..a", "pkg.sub.b", False), "pkg.a")
+        self.assertEqual(absolute_name(".", "pkg.mod", False), "pkg")
+        self.assertEqual(absolute_name("os", "pkg.mod", False), "os")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from datastructures import Interner, DTable
+
+
+class InternerTest(unittest.TestCase):
+    def test_round_trip(self):
+        names = Interner()
+        for dotted in ["pkg", "pkg.mod.foo", "pkg.mod", "os.path.join", "mod"]:
+            self.assertEqual(names.to_str(names.intern(dotted)), dotted)
+        #interning again returns the same id, and the prefixes share ids
+        self.assertEqual(names.intern("pkg.mod.foo"), names.intern("pkg.mod.foo"))
+        self.assertEqual(len(names), 7)
+
+    def test_find_and_ancestors(self):
+        names = Interner()
+        foo = names.intern("pkg.mod.foo")
+        self.assertEqual(names.find("pkg.mod.foo"), foo)
+        self.assertIsNone(names.find("pkg.other"))
+        self.assertIsNone(names.find("foo"))
+        self.assertEqual([names.to_str(ident) for ident in names.ancestors(foo)],
+                         ["pkg.mod.foo", "pkg.mod", "pkg"])
+
+    def test_qualify(self):
+        names = Interner()
+        mod = names.intern("pkg.mod")
+        self.assertEqual(names.qualify(mod, "foo"), names.intern("pkg.mod.foo"))
+        self.assertEqual(names.to_str(names.qualify(Interner.ROOT, "os")), "os")
+
+    def test_translate(self):
+        other = Interner()
+        ids = [other.intern(dotted) for dotted in ["b.x", "a.y", "a.y.z"]]
+        names = Interner()
+        names.intern("a.q")
+        memo = {}
+        translated = [names.translate(other, ident, memo) for ident in ids]
+        self.assertEqual([names.to_str(ident) for ident in translated], ["b.x", "a.y", "a.y.z"])
+        self.assertEqual(names.find("a.y"), translated[1])
+        #translated ids, including those of the prefixes, are memoized
+        self.assertEqual(memo[other.find("a")], names.find("a"))
+
+
+class DTableTest(unittest.TestCase):
+    def test_columns(self):
+        table = DTable()
+        table.add("mod.foo", "pdb.set_trace", 3)
+        table.add("mod.bar", "mod.foo", 7)
+        self.assertEqual(len(table), 2)
+        self.assertEqual(list(table.rows()), [("mod.foo", "pdb.set_trace", 3), ("mod.bar", "mod.foo", 7)])
+        self.assertEqual(list(table), [("mod.foo", "pdb.set_trace"), ("mod.bar", "mod.foo")])
+        #the columns hold ids in the table's interner
+        names = table.names
+        self.assertEqual(list(table.edges()), [(names.find("mod.foo"), names.find("pdb.set_trace"), 3),
+                                               (names.find("mod.bar"), names.find("mod.foo"), 7)])
+        self.assertEqual(table.src.typecode, "i")
+        self.assertEqual(list(table.lines), [3, 7])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+from tests.fixtures import TempPackage
+
+ANALYZE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "analyze.py")
+
+#Enough dependencies that their JSON lines overflow the pipe's buffer
+MODULES = dict(("mod{}.py".format(i),
+                "from os.path import join\n\ndef f(a):\n" + "    join(a)\n" * 20)
+               for i in range(100))
+
+
+class JsonLinesTest(unittest.TestCase):
+    def read_first_line(self, directory, processes):
+        "Returns the first line of the --jsonl output, and the stderr and exit code once the pipe is closed"
+        process = subprocess.Popen([sys.executable, ANALYZE, directory, "--jsonl", "-",
+                                    "--processes", str(processes)],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        line = process.stdout.readline()
+        process.stdout.close()
+        stderr = process.stderr.read()
+        return line, stderr, process.wait()
+
+    def test_reader_closing_early(self):
+        with TempPackage(MODULES) as directory:
+            for processes in (1, 2):
+                line, stderr, returncode = self.read_first_line(directory, processes)
+                self.assertEqual(json.loads(line)["src"].split(".")[-1], "f")
+                self.assertEqual(stderr, "")
+                self.assertEqual(returncode, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+import os
+import sys
+import unittest
+from StringIO import StringIO
+
+import lazy
+from analyze import query, lazy_query
+from tests.fixtures import TempPackage
+
+#app.main reaches pkg.base.foo through pkg.star, which star-imports it; other is unreachable
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/base.py": "from os.path import join\n\ndef foo():\n    return join('a')\n",
+    "pkg/star.py": "from .base import *\n\ndef bar():\n    return foo()\n",
+    "app.py": "from pkg.star import bar\n\ndef main():\n    return bar()\n",
+    "other.py": "from app import main\n\ndef run():\n    return main()\n",
+}
+
+
+def output_of(function, *args, **kw):
+    "Returns what `function` prints"
+    stdout, sys.stdout = sys.stdout, StringIO()
+    try:
+        function(*args, **kw)
+        return sys.stdout.getvalue()
+    finally:
+        sys.stdout = stdout
+
+
+class LazyTest(unittest.TestCase):
+    def setUp(self):
+        self.analyzed = []
+        analyze_module = lazy.analyze_module
+        def record(path, module_name=None, cache=None):
+            self.analyzed.append(module_name)
+            return analyze_module(path, module_name=module_name, cache=cache)
+        lazy.analyze_module = record
+        self.addCleanup(setattr, lazy, "analyze_module", analyze_module)
+
+        package = TempPackage(FILES)
+        self.directory = package.__enter__()
+        self.addCleanup(package.__exit__, None, None, None)
+
+    def test_output_matches_query(self):
+        for depth in [None, 1, 2]:
+            output = output_of(lazy_query, self.directory, "app.main", depth=depth)
+            self.assertEqual(output, output_of(query, self.directory, dependencies="app.main",
+                                               depth=depth, processes=1))
+        self.assertEqual(output_of(lazy_query, self.directory, "app.main"),
+                         "dependencies of app.main are \n"
+                         "['os.path.join', 'pkg.base.foo', 'pkg.star.bar']\n")
+
+    def test_only_reachable_modules(self):
+        analyzer = lazy.LazyAnalyzer(self.directory)
+        self.assertEqual(analyzer.transitive_dependencies("app.main"),
+                         frozenset(["pkg.star.bar", "pkg.base.foo", "os.path.join"]))
+        self.assertEqual(self.analyzed, ["app", "pkg.star", "pkg.base"])
+        self.assertEqual(analyzer.errors, {})
+
+    def test_package_root(self):
+        #names are relative to the directory containing a package root
+        analyzer = lazy.LazyAnalyzer(os.path.join(self.directory, "pkg"))
+        self.assertEqual(analyzer.transitive_dependencies("pkg.star.bar"), frozenset(["pkg.base.foo", "os.path.join"]))
+        #modules outside the root aren't analyzed
+        self.assertEqual(analyzer.dependencies("app.main"), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
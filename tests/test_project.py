@@ -0,0 +1,39 @@
+import multiprocessing
+import multiprocessing.pool
+import unittest
+
+import project
+from tests.fixtures import TempPackage
+
+#Enough modules that the workers can't have analyzed them all by the first result
+MODULES = dict(("mod{}.py".format(i), "def f():\n    return {}\n".format(i)) for i in range(200))
+
+
+class IterResultsTest(unittest.TestCase):
+    def setUp(self):
+        self.pools = []
+        Pool = multiprocessing.Pool
+        def record(*args, **kw):
+            pool = Pool(*args, **kw)
+            self.pools.append(pool)
+            return pool
+        multiprocessing.Pool = record
+        self.addCleanup(setattr, multiprocessing, "Pool", Pool)
+
+    def test_stopping_early_terminates_pool(self):
+        with TempPackage(MODULES) as directory:
+            results = project.iter_results(directory, processes=2)
+            next(results)
+            results.close()
+        self.assertEqual(len(self.pools), 1)
+        self.assertEqual(self.pools[0]._state, multiprocessing.pool.TERMINATE)
+
+    def test_completion_closes_pool(self):
+        with TempPackage(MODULES) as directory:
+            results = list(project.iter_results(directory, processes=2))
+        self.assertEqual(len(results), len(MODULES))
+        self.assertEqual(self.pools[0]._state, multiprocessing.pool.CLOSE)
+
+
+if __name__ == '__main__':
+    unittest.main()
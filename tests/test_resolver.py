@@ -0,0 +1,83 @@
+import os
+import unittest
+
+import resolver
+from resolver import ModuleResolver, list_directory, MODULE, PACKAGE, NAMESPACE
+from tests.fixtures import TempPackage, write_files
+
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/mod.py": "",
+    "pkg.py": "",
+    "ns/portion.py": "",
+    "mod.py": "",
+    "mod/data.txt": "",
+}
+
+
+class ResolverTest(unittest.TestCase):
+    def setUp(self):
+        package = TempPackage(FILES)
+        self.directory = os.path.abspath(package.__enter__())
+        self.addCleanup(package.__exit__, None, None, None)
+
+    def path(self, *parts):
+        return os.path.join(self.directory, *parts)
+
+    def test_package_over_module(self):
+        expected = {
+            "pkg": (PACKAGE, self.path("pkg", "__init__.py")),
+            "ns": (NAMESPACE, self.path("ns")),
+            "mod": (MODULE, self.path("mod.py")),
+        }
+        self.assertEqual(list_directory(self.directory), expected)
+
+        #whichever order the directory is listed in
+        listdir = os.listdir
+        resolver.os.listdir = lambda directory: list(reversed(sorted(listdir(directory))))
+        try:
+            self.assertEqual(list_directory(self.directory), expected)
+            resolver.os.listdir = lambda directory: sorted(listdir(directory))
+            self.assertEqual(list_directory(self.directory), expected)
+        finally:
+            resolver.os.listdir = listdir
+
+        names = ModuleResolver([self.directory])
+        self.assertEqual(names.find("pkg"), self.path("pkg", "__init__.py"))
+        self.assertEqual(names.find("pkg.mod"), self.path("pkg", "mod.py"))
+        self.assertEqual(names.locate("pkg.mod.foo"), ("pkg.mod", self.path("pkg", "mod.py")))
+
+    def test_namespace_packages(self):
+        with TempPackage({"ns/other.py": "", "ns/portion.py": ""}) as other:
+            other = os.path.abspath(other)
+            names = ModuleResolver([self.directory, other])
+            self.assertEqual(names.find_spec("ns"), (NAMESPACE, [self.path("ns"), os.path.join(other, "ns")]))
+            #a namespace package has no source, but its portions are searched in order
+            self.assertIsNone(names.find("ns"))
+            self.assertEqual(names.find("ns.portion"), self.path("ns", "portion.py"))
+            self.assertEqual(names.find("ns.other"), os.path.join(other, "ns", "other.py"))
+            self.assertEqual(names.locate("ns.other.name"), ("ns.other", os.path.join(other, "ns", "other.py")))
+
+        #a module in a later root takes precedence over a namespace package
+        with TempPackage({"ns.py": ""}) as other:
+            other = os.path.abspath(other)
+            names = ModuleResolver([self.directory, other])
+            self.assertEqual(names.find_spec("ns"), (MODULE, [os.path.join(other, "ns.py")]))
+
+    def test_memo_and_refresh(self):
+        names = ModuleResolver([self.directory])
+        self.assertIsNone(names.find("new"))
+        self.assertEqual(names.refresh(), 0)
+
+        write_files(self.directory, {"new.py": ""})
+        #the memoized result is kept until the listing is refreshed
+        self.assertIsNone(names.find("new"))
+        mtime = os.stat(self.directory).st_mtime
+        os.utime(self.directory, (mtime + 1, mtime + 1))
+        self.assertEqual(names.refresh(), 1)
+        self.assertEqual(names.find("new"), self.path("new.py"))
+        self.assertEqual(names.memo[((self.directory,), "new")], self.path("new.py"))
+
+
+if __name__ == '__main__':
+    unittest.main()
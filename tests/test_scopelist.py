@@ -0,0 +1,73 @@
+import unittest
+
+from datastructures import ScopeList, Scopes, STable, LookupCounts
+
+
+def scope(lineno, lineno_end, scopes=0):
+    return Scopes(lineno, lineno_end, scopes, None, None)
+
+
+class ScopeListTest(unittest.TestCase):
+    def test_find_at_boundaries(self):
+        scopes = ScopeList([scope(3, 7)])
+        self.assertEqual(scopes.find(3), scope(3, 7))
+        self.assertEqual(scopes.find(7), scope(3, 7))
+        self.assertIsNone(scopes.find(2))
+        self.assertIsNone(scopes.find(8))
+
+    def test_find_in_gaps(self):
+        scopes = ScopeList([scope(1, 2), scope(5, 6), scope(9, 12)])
+        self.assertEqual(scopes.find(2), scope(1, 2))
+        self.assertIsNone(scopes.find(3))
+        self.assertIsNone(scopes.find(7))
+        self.assertEqual(scopes.find(10), scope(9, 12))
+        self.assertIsNone(scopes.find(13))
+
+    def test_nested_scopes(self):
+        #a module (1-20), a class in it (4-15) and a method in the class (6-9);
+        #the first scope that contains a line is the outermost one
+        scopes = ScopeList()
+        scopes.add(scope(6, 9, 2))
+        scopes.add(scope(1, 20, 0))
+        scopes.add(scope(4, 15, 1))
+        self.assertEqual([value.scopes for value in scopes], [0, 1, 2])
+        self.assertEqual(scopes.find(7).scopes, 0)
+        self.assertEqual(scopes.find(20).scopes, 0)
+
+        #a later scope that ends before an earlier one, e.g. a function after a nested class
+        scopes = ScopeList([scope(1, 3, 0), scope(2, 10, 1), scope(4, 5, 2)])
+        self.assertEqual(scopes.find(4).scopes, 1)
+        self.assertEqual(scopes.find(10).scopes, 1)
+
+    def test_add_keeps_order_and_skips_duplicates(self):
+        scopes = ScopeList()
+        for value in [scope(9, 12), scope(1, 2), scope(5, 6), scope(1, 2, 3), scope(5, 8)]:
+            scopes.add(value)
+        self.assertEqual(list(scopes), [scope(1, 2), scope(5, 6), scope(5, 8), scope(9, 12)])
+        self.assertEqual(scopes.keys, [(1, 2), (5, 6), (5, 8), (9, 12)])
+
+    def test_add_after_find(self):
+        scopes = ScopeList([scope(1, 2)])
+        self.assertIsNone(scopes.find(5))
+        #the index is rebuilt after an insertion
+        scopes.add(scope(4, 6))
+        self.assertEqual(scopes.find(5), scope(4, 6))
+
+    def test_counts(self):
+        counts = LookupCounts()
+        ScopeList([scope(1, 2), scope(5, 6), scope(9, 12)]).find(10, counts)
+        #bisecting 3 ends probes 2 of them, then the scope found is checked
+        self.assertEqual(counts.candidates, 3)
+
+    def test_stable(self):
+        table = STable()
+        table["x"] = scope(5, 6)
+        table["x"] = scope(1, 2)
+        table["y"] = scope(1, 2)
+        self.assertIsInstance(table["x"], ScopeList)
+        self.assertEqual(list(table["x"]), [scope(1, 2), scope(5, 6)])
+        self.assertEqual(table["x"].find(6), scope(5, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
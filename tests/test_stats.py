@@ -0,0 +1,68 @@
+import os
+import shutil
+import tempfile
+import unittest
+from bisect import bisect_left
+
+import stats
+from analyze import analyze_module
+from datastructures import bisect_probes
+
+#f loads g and x, g loads len, a builtin, and y; each of g, x and y has a single scope
+SOURCE = "import os\n\ndef f(x):\n    return g(x)\n\ndef g(y):\n    return len(y)\n"
+
+
+class Probed(object):
+    "A value that counts how often bisect compares it"
+    probes = 0
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        Probed.probes += 1
+        return self.value < other
+
+
+class StatsTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "mod.py")
+        with open(self.path, "w") as fileptr:
+            fileptr.write(SOURCE)
+
+    def tearDown(self):
+        stats.disable()
+        shutil.rmtree(self.directory)
+
+    def test_lookup_counters(self):
+        current = stats.enable()
+        analyze_module(self.path, module_name="mod")
+        self.assertEqual(current.counters["lookups"], 4)
+        self.assertEqual(current.counters["unresolved"], 1)
+        #a bisection probe and the check of the scope it finds, for each of g, x and y
+        self.assertEqual(current.counters["candidates"], 6)
+        self.assertEqual(current.counters["modules"], 1)
+        self.assertIn("candidates per lookup        1.50", current.report())
+
+    def test_counters_are_merged(self):
+        current = stats.enable()
+        other = stats.Stats()
+        other.count("lookups", 3)
+        other.add_time("parse", 0.5)
+        current.count("lookups", 2)
+        current.merge(other.state())
+        self.assertEqual(current.counters["lookups"], 5)
+        self.assertEqual(current.seconds["parse"], 0.5)
+
+    def test_bisect_probes(self):
+        for size in range(12):
+            values = [Probed(value) for value in range(0, 2 * size, 2)]
+            for target in range(-1, 2 * size + 1):
+                Probed.probes = 0
+                index = bisect_left(values, target)
+                self.assertEqual(bisect_probes(size, index), Probed.probes)
+
+
+if __name__ == '__main__':
+    unittest.main()
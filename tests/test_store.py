@@ -0,0 +1,89 @@
+import os
+import sys
+import unittest
+from StringIO import StringIO
+
+import project
+from analyze import update_store
+from store import DependencyStore
+from tests.fixtures import TempPackage
+
+#pkg.star star-imports pkg.base relatively, app imports from it, and other is unrelated
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/base.py": "def foo():\n    return 1\n",
+    "pkg/star.py": "from .base import *\n\ndef bar():\n    return foo()\n",
+    "app.py": "from pkg.base import foo\n\ndef main():\n    return foo()\n",
+    "other.py": "def run():\n    return len('')\n",
+}
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        self.analyzed = []
+        analyze_module = project.analyze_module
+        def record(path, module_name=None, cache=None, source=None):
+            self.analyzed.append(module_name)
+            return analyze_module(path, module_name=module_name, cache=cache, source=source)
+        project.analyze_module = record
+        self.addCleanup(setattr, project, "analyze_module", analyze_module)
+
+        package = TempPackage(FILES)
+        self.directory = os.path.abspath(package.__enter__())
+        self.addCleanup(package.__exit__, None, None, None)
+        self.path = os.path.join(self.directory, "deps.db")
+        self.update()
+
+    def update(self):
+        "Updates the store, and returns the names of the modules analyzed and its report"
+        del self.analyzed[:]
+        stderr, sys.stderr = sys.stderr, StringIO()
+        try:
+            update_store(self.directory, self.path, processes=1)
+            report = sys.stderr.getvalue()
+        finally:
+            sys.stderr = stderr
+        return sorted(self.analyzed), report
+
+    def write(self, relpath, contents):
+        with open(os.path.join(self.directory, *relpath.split("/")), "w") as fileptr:
+            fileptr.write(contents)
+
+    def test_queries(self):
+        with DependencyStore(self.path) as store:
+            self.assertEqual(store.dependencies("app.main"), [("pkg.base.foo", 4)])
+            self.assertEqual(sorted(store.dependents("pkg.base.foo")), [("app.main", 4), ("pkg.star.bar", 4)])
+            self.assertEqual(store.symbols_in_file(os.path.join(self.directory, "pkg", "base.py")),
+                             [("foo", 1, 2, "pkg.base")])
+            self.assertEqual(store.importers("pkg.base"),
+                             {os.path.join(self.directory, "app.py"): "app",
+                              os.path.join(self.directory, "pkg", "star.py"): "pkg.star"})
+            self.assertEqual(store.transitive_dependents("pkg.base.foo"), frozenset(["app.main", "pkg.star.bar"]))
+            self.assertEqual(store.transitive_dependencies("app.main", depth=1), frozenset(["pkg.base.foo"]))
+
+    def test_unchanged(self):
+        self.assertEqual(self.update(), ([], "Updated 0 modules and removed 0 in {}\n".format(self.path)))
+
+    def test_changed_module_and_its_importers(self):
+        self.write("pkg/base.py", "def foo():\n    return 1\n\ndef baz():\n    return foo()\n")
+        analyzed, _ = self.update()
+        self.assertEqual(analyzed, ["app", "pkg.base", "pkg.star"])
+        with DependencyStore(self.path) as store:
+            self.assertEqual(sorted(store.dependents("pkg.base.foo")),
+                             [("app.main", 4), ("pkg.base.baz", 5), ("pkg.star.bar", 4)])
+            #the star-import binds the new name in pkg.star
+            symbols = [symbol[0] for symbol in store.symbols_in_file(os.path.join(self.directory, "pkg", "star.py"))]
+            self.assertIn("baz", symbols)
+
+    def test_deleted_module(self):
+        os.remove(os.path.join(self.directory, "app.py"))
+        analyzed, report = self.update()
+        self.assertEqual(analyzed, [])
+        self.assertIn("removed 1", report)
+        with DependencyStore(self.path) as store:
+            self.assertEqual(store.dependencies("app.main"), [])
+            self.assertNotIn(os.path.join(self.directory, "app.py"), store.stamps())
+
+
+if __name__ == '__main__':
+    unittest.main()
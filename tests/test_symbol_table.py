@@ -0,0 +1,75 @@
+import ast
+import unittest
+
+from analyze import create_symbol_table, find_dependencies
+from utils import get_module
+
+#g is called before it is defined, and self, m and y are bound in nested scopes;
+#a scope ends on the line before its next sibling starts
+SOURCE = """\
+x = 1
+
+class C(object):
+    def m(self):
+        return g(x)
+
+def g(y):
+    return len(y)
+
+print x
+"""
+
+
+def parse(source, name="mod"):
+    root = get_module("mod.py", source=source)
+    root.name = name
+    return root
+
+
+class SymbolTableTest(unittest.TestCase):
+    def test_nested_scopes(self):
+        symbol_table = create_symbol_table(parse(SOURCE))
+        to_str = symbol_table.names.to_str
+        scopes = dict((name, [(scope.lineno, scope.lineno_end, to_str(scope.scopes)) for scope in symbol_table[name]])
+                      for name in symbol_table)
+        self.assertEqual(scopes, {
+            "x": [(1, 10, "mod")],
+            "C": [(1, 10, "mod")],
+            "m": [(3, 6, "mod.C")],
+            "self": [(4, 6, "mod.C.m")],
+            "g": [(1, 10, "mod")],
+            "y": [(7, 9, "mod.g")],
+        })
+
+    def test_references_resolved_after_the_pass(self):
+        references = []
+        symbol_table = create_symbol_table(parse(SOURCE), references=references)
+        #the loads are recorded as they are walked, before g is defined
+        self.assertIn((symbol_table.names.find("mod.C.m"), "g", 5), references)
+
+        dependencies = find_dependencies(None, symbol_table, references)
+        self.assertEqual(sorted(dependencies.rows()), [
+            ("mod", "mod.x", 10),
+            ("mod.C.m", "mod.g", 5),
+            ("mod.C.m", "mod.x", 5),
+            ("mod.g", "mod.g.y", 8),
+        ])
+
+    def test_walks_root_without_tables(self):
+        root = parse(SOURCE)
+        references = []
+        symbol_table = create_symbol_table(root, references=references)
+        self.assertEqual(sorted(find_dependencies(parse(SOURCE)).rows()),
+                         sorted(find_dependencies(None, symbol_table, references).rows()))
+
+    def test_ast_not_modified(self):
+        #the metadata of the walk is kept in NodeInfo side tables, not set on the nodes
+        root = parse(SOURCE)
+        before = [(node, dict(node.__dict__)) for node in ast.walk(root)]
+        create_symbol_table(root, references=[])
+        for node, attributes in before:
+            self.assertEqual(node.__dict__, attributes)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+
+from tests.fixtures import take3_dependencies
+
+
+class AliasTest(unittest.TestCase):
+    def test_chain_of_aliases(self):
+        source = "import pdb\n\ndef foo():\n    x = pdb\n    y = x\n    y.set_trace()\n"
+        self.assertEqual(take3_dependencies(source), [("mod.foo", "pdb.set_trace")])
+
+    def test_attribute_alias(self):
+        source = "import os\n\ndef foo():\n    p = os.path\n    p.join()\n"
+        self.assertEqual(take3_dependencies(source), [("mod.foo", "os.path.join")])
+
+    def test_aliases_are_per_scope(self):
+        source = ("import os\nimport sys\n\ndef foo():\n    x = os\n    x.getcwd()\n\n"
+                  "def bar():\n    x = sys\n    x.exit()\n")
+        self.assertEqual(take3_dependencies(source), [("mod.bar", "sys.exit"), ("mod.foo", "os.getcwd")])
+
+
+if __name__ == '__main__':
+    unittest.main()
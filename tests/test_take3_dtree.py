@@ -0,0 +1,56 @@
+import unittest
+
+from take3.analyze import DTree, build_csr
+from tests.fixtures import sample_tree
+
+
+class DTreeTest(unittest.TestCase):
+    def test_prefixes_are_shared(self):
+        tree = DTree()
+        foo = tree.add_path(["pkg", "mod", "foo"])
+        bar = tree.add_path(["pkg", "mod", "bar"])
+        self.assertEqual(tree.add_path(["pkg", "mod", "foo"]), foo)
+        mod = tree.add_path(["pkg", "mod"])
+        self.assertEqual(tree.parents[foo], mod)
+        self.assertEqual(list(tree.children(mod)), [foo, bar])
+        self.assertEqual(tree.path(bar), ["pkg", "mod", "bar"])
+        #the same value under another parent is another vertex
+        other = tree.add_path(["other", "mod"])
+        self.assertNotEqual(other, mod)
+        self.assertEqual(tree.value(other), tree.value(mod))
+        self.assertEqual(len(tree), 6)
+
+    def test_index_is_rebuilt_after_adding(self):
+        tree = DTree()
+        mod = tree.add_path(["mod"])
+        self.assertEqual(list(tree.children(mod)), [])
+        foo = tree.add_path(["mod", "foo"])
+        self.assertEqual(list(tree.children(mod)), [foo])
+
+    def test_dependencies_and_dependents(self):
+        tree = sample_tree()
+        foo, bar = tree.add_path(["mod", "foo"]), tree.add_path(["mod", "bar"])
+        set_trace = tree.add_path(["pdb", "set_trace"])
+        #duplicate links are dropped
+        tree.add_link(["mod", "bar"], ["mod", "foo"])
+        self.assertEqual(list(tree.dependencies(bar)), [foo])
+        self.assertEqual(list(tree.dependencies(foo)), [set_trace])
+        self.assertEqual(list(tree.dependents(foo)), [bar])
+        self.assertEqual(list(tree.links()), [(foo, set_trace), (bar, foo)])
+
+    def test_traversals(self):
+        tree = sample_tree()
+        values = lambda order: [(tree.value(vertex), depth) for vertex, depth in order]
+        self.assertEqual(values(tree.bfs()),
+                         [(None, 0), ("mod", 1), ("pdb", 1), ("foo", 2), ("bar", 2), ("set_trace", 2)])
+        self.assertEqual(values(tree.dfs()),
+                         [(None, 0), ("mod", 1), ("foo", 2), ("bar", 2), ("pdb", 1), ("set_trace", 2)])
+
+    def test_build_csr(self):
+        offsets, items = build_csr([2, 0, 2, 1], [10, 11, 12, 13], 3)
+        self.assertEqual(list(offsets), [0, 1, 2, 4])
+        self.assertEqual(list(items), [11, 13, 10, 12])
+
+
+if __name__ == '__main__':
+    unittest.main()
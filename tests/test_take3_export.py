@@ -0,0 +1,58 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from StringIO import StringIO
+from xml.etree import ElementTree
+
+from take3.export import EXPORTERS, export
+from tests.fixtures import sample_tree
+
+GRAPHML = "{http://graphml.graphdrawing.org/xmlns}"
+
+
+class ExportTest(unittest.TestCase):
+    def exported(self, fmt):
+        output = StringIO()
+        EXPORTERS[fmt](sample_tree(), output)
+        return output.getvalue()
+
+    def test_dot(self):
+        lines = self.exported("dot").splitlines()
+        self.assertEqual(lines[0], "digraph deptree {")
+        self.assertIn('  n2 [label="foo"];', lines)
+        self.assertIn("  n1 -> n2 [style=dotted];", lines)
+        self.assertIn("  n5 -> n2;", lines)
+        self.assertEqual(lines[-1], "}")
+
+    def test_graphml(self):
+        graph = ElementTree.fromstring(self.exported("graphml")).find(GRAPHML + "graph")
+        values = dict((node.get("id"), node.find(GRAPHML + "data").text)
+                      for node in graph.findall(GRAPHML + "node"))
+        self.assertEqual(values, {"n1": "mod", "n2": "foo", "n3": "pdb", "n4": "set_trace", "n5": "bar"})
+        edges = set((edge.get("source"), edge.get("target"), edge.find(GRAPHML + "data").text)
+                    for edge in graph.findall(GRAPHML + "edge"))
+        self.assertIn(("n1", "n2", "child"), edges)
+        self.assertIn(("n2", "n4", "dependency"), edges)
+        self.assertEqual(len(edges), 5)
+
+    def test_json(self):
+        exported = json.loads(self.exported("json"))
+        self.assertEqual(exported["vertices"][:2], [{"id": 1, "value": "mod", "parent": None},
+                                                    {"id": 2, "value": "foo", "parent": 1}])
+        self.assertEqual(exported["dependencies"], [[2, 4], [5, 2]])
+
+    def test_export_to_path(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "tree.json")
+            export(sample_tree(), "json", path)
+            with open(path) as fileptr:
+                self.assertEqual(fileptr.read(), self.exported("json"))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import ast
+import unittest
+
+from take3.analyze import Scope, scopemap
+from tests.fixtures import take3_dependencies
+
+
+class ScopeTest(unittest.TestCase):
+    def test_bindings_by_line(self):
+        scope = Scope(ast.Module(body=[]))
+        for lineno in (10, 2, 6):
+            scope.bind("x", scopemap(lineno=lineno))
+        self.assertEqual(scope.find("x", 7).lineno, 6)
+        self.assertEqual(scope.find("x", 10).lineno, 10)
+        #before the first binding, e.g. a call of a function defined below
+        self.assertEqual(scope.find("x", 1).lineno, 2)
+        self.assertIsNone(scope.find("y", 7))
+
+    def test_nesting(self):
+        source = ("def f():\n    return 1\n\n"
+                  "def g():\n    def f():\n        return 2\n    return f()\n\n"
+                  "class C(object):\n    def h(self):\n        return 3\n\n"
+                  "    def k(self):\n        return h()\n\n"
+                  "def outer():\n    def inner():\n        return g()\n    return inner()\n\n"
+                  "def early():\n    return late()\n\n"
+                  "def late():\n    return len([])\n")
+        self.assertEqual(take3_dependencies(source), [
+            ("mod.early", "mod.late"),
+            #the innermost binding of f
+            ("mod.g", "mod.g.f"),
+            ("mod.outer", "mod.outer.inner"),
+            #through the enclosing function's scope, to the module's
+            ("mod.outer.inner", "mod.g"),
+        ])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+import unittest
+
+import watch
+from tests.fixtures import TempPackage
+
+#pkg.star star-imports pkg.base relatively, app imports from it, and other is unrelated
+FILES = {
+    "pkg/__init__.py": "",
+    "pkg/base.py": "def foo():\n    return 1\n",
+    "pkg/star.py": "from .base import *\n\ndef bar():\n    return foo()\n",
+    "app.py": "from pkg.base import foo\n\ndef main():\n    return foo()\n",
+    "other.py": "def run():\n    return len('')\n",
+}
+
+ANALYZE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "analyze.py")
+
+
+class WatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.analyzed = []
+        analyze_module = watch.analyze_module
+        def record(path, module_name=None, cache=None):
+            self.analyzed.append(module_name)
+            return analyze_module(path, module_name=module_name, cache=cache)
+        watch.analyze_module = record
+        self.addCleanup(setattr, watch, "analyze_module", analyze_module)
+
+        package = TempPackage(FILES)
+        self.directory = package.__enter__()
+        self.addCleanup(package.__exit__, None, None, None)
+        self.watcher = watch.Watcher(self.directory, processes=1)
+
+    def write(self, relpath, contents):
+        with open(os.path.join(self.directory, *relpath.split("/")), "w") as fileptr:
+            fileptr.write(contents)
+
+    def test_unchanged(self):
+        self.assertEqual(self.watcher.poll(), (set(), set()))
+        self.assertEqual(self.analyzed, [])
+
+    def test_changed_module_and_its_dependents(self):
+        self.write("pkg/base.py", "def foo():\n    return helper()\n\ndef helper():\n    return 1\n")
+        added, removed = self.watcher.poll()
+        self.assertEqual(added, set([("pkg.base.foo", "pkg.base.helper")]))
+        self.assertEqual(removed, set())
+        self.assertEqual(sorted(self.analyzed), ["app", "pkg.base", "pkg.star"])
+
+    def test_star_imported_name_removed(self):
+        self.write("pkg/base.py", "def other():\n    return 1\n")
+        added, removed = self.watcher.poll()
+        self.assertEqual(added, set())
+        self.assertIn(("pkg.star.bar", "pkg.base.foo"), removed)
+
+    def test_added_and_deleted_modules(self):
+        self.write("new.py", "from pkg.star import bar\n\ndef go():\n    return bar()\n")
+        os.remove(os.path.join(self.directory, "app.py"))
+        added, removed = self.watcher.poll()
+        self.assertEqual(added, set([("new.go", "pkg.star.bar")]))
+        self.assertEqual(removed, set([("app.main", "pkg.base.foo")]))
+        self.assertEqual(self.analyzed, ["new"])
+        self.assertNotIn("app", self.watcher.graph.modules)
+
+    def test_file_rejected(self):
+        process = subprocess.Popen([sys.executable, ANALYZE, os.path.join(self.directory, "app.py"), "--watch"],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        self.assertEqual(process.returncode, 2)
+        self.assertEqual(stdout, "")
+        self.assertIn("--watch requires a directory", stderr)
+
+
+if __name__ == '__main__':
+    unittest.main()
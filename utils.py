@@ -1,7 +1,25 @@
 import pprint
 import ast
 
-def get_module(filepath):
+def read_source(filepath):
+    """
+    Returns the contents of the file at `filepath`, as a single string
+    """
+    with open(filepath, "r") as f:
+        return f.read()
+
+def count_lines(source):
+    """
+    Returns the number of lines of `source`, as readlines would,
+    without splitting it into a list of lines
+    """
+    count = source.count("\n")
+    if source and not source.endswith("\n"):
+        #the last line has no newline
+        count += 1
+    return count
+
+def get_module(filepath, source=None):
     """
     Returns a AST node object corresponding to argument file.
     In addition sets `lineno` and `lineno_end` for starting and 
@@ -9,17 +27,17 @@ def get_module(filepath):
     
     Arguments:- filepath
         name of file to converted
+    source:- the contents of the file, if they have already been read
 
     Return: AST node object
     """
-    with open(filepath, "r") as f:
-        lines = f.readlines()
-        src  = "".join(lines)
-    
-    node = ast.parse(src)
+    if source is None:
+        source = read_source(filepath)
+
+    node = ast.parse(source)
     #Sets the start and end line numbers
     node.lineno = 1
-    node.lineno_end = len(lines)
+    node.lineno_end = count_lines(source)
 
     return node
 
@@ -30,6 +48,15 @@ def pretty_print(self_map):
 #Returns type of AST node
 node_type = lambda node: node.__class__.__name__
 
+#Names of the scopes created by nodes without a name
+anonymous_scopes = {
+    "Lambda": "<lambda>",
+    "GeneratorExp": "<genexpr>",
+    "ListComp": "<listcomp>",
+    "SetComp": "<setcomp>",
+    "DictComp": "<dictcomp>",
+}
+
 def unique_id(node):
     """
     Returns progressively less informative identifiers
@@ -52,6 +79,8 @@ def unique_id(node):
         identifier = node.module
     elif ntype == 'Module':
         identifier = node.name
+    elif ntype in anonymous_scopes:
+        identifier = anonymous_scopes[ntype]
     else:
         identifier = getattr(node, "name", 
                 getattr(node, "id",
@@ -0,0 +1,108 @@
+"""
+This module implements watch mode, i.e. a long running analysis of a
+directory, that re-analyzes only the modules that change.
+"""
+import os
+import time
+
+import resolver
+from analyze import analyze_module
+from project import analyze_project, discover_modules, module_name
+
+#Seconds between checks for modified modules
+POLL_INTERVAL = 0.5
+
+
+def snapshot(root):
+    """
+    Returns dict mapping path of each module under `root`
+    to its (mtime, size) stamp
+    """
+    stamps = {}
+    for path in discover_modules(root):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            #removed since it was discovered
+            continue
+        stamps[path] = (stat.st_mtime, stat.st_size)
+    return stamps
+
+
+class Watcher(object):
+    """
+    Keeps the dependency graph of the modules under `root` up to date.
+
+    When a module changes, it is re-analyzed along with the modules whose
+    edges point into it, since e.g. the names a star-import binds depend
+    on the imported module. All other modules keep their results.
+    """
+    def __init__(self, root, processes=None, cache=None):
+        self.root = root
+        self.cache = cache
+        self.stamps = snapshot(root)
+        self.graph, self.errors = analyze_project(root, processes=processes, cache=cache)
+
+    def poll(self):
+        """
+        Re-analyzes the modules that were modified, added or removed since
+        the last poll, and their dependents.
+        Returns 2-tuple of sets of (src, dest) pairs, i.e. (added edges, removed edges)
+        """
+        stamps = snapshot(self.root)
+        changed = [path for path, stamp in stamps.items() if self.stamps.get(path) != stamp]
+        deleted = [path for path in self.stamps if path not in stamps]
+        self.stamps = stamps
+
+        if not changed and not deleted:
+            return set(), set()
+        #modules may have been added or removed, which changes what imports resolve to
+        resolver.default.refresh()
+
+        #module name -> path, for all modules to re-analyze
+        affected = {}
+        for path in changed:
+            affected[module_name(self.root, path)] = path
+        for path in deleted:
+            affected[module_name(self.root, path)] = None
+            self.errors.pop(path, None)
+        for name in list(affected):
+            for dependent in self.graph.dependents(name):
+                affected.setdefault(dependent, self.graph.modules[dependent].path)
+
+        before = set()
+        for name in affected:
+            before |= self.graph.module_edges(name)
+
+        for name, path in affected.items():
+            if name in self.graph.modules:
+                self.graph.remove_module(name)
+            if path is None:
+                continue
+            self.errors.pop(path, None)
+            try:
+                _, dependency_table = analyze_module(path, module_name=name, cache=self.cache)
+            except Exception as error:
+                self.errors[path] = "{}: {}".format(error.__class__.__name__, error)
+                continue
+            self.graph.add_module(name, path, dependency_table)
+
+        after = set()
+        for name in affected:
+            after |= self.graph.module_edges(name)
+
+        return after - before, before - after
+
+    def run(self, callback, interval=POLL_INTERVAL):
+        """
+        Polls for changes every `interval` seconds until interrupted,
+        calling `callback(added, removed)` with each non-empty delta
+        """
+        try:
+            while True:
+                added, removed = self.poll()
+                if added or removed:
+                    callback(added, removed)
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass